@@ -0,0 +1,46 @@
+import json
+
+from django.contrib import admin
+from django.http import FileResponse, Http404, HttpResponse
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from .profiling import get_profile_path, list_profiles, to_folded
+
+
+def profile_list(request):
+    return TemplateResponse(request, 'admin/profiles.html', {
+        **admin.site.each_context(request),
+        'title': 'Профили запросов',
+        'profiles': list_profiles(),
+    })
+
+
+def profile_download(request, profile_id):
+    """Профиль в JSON или, с ?format=folded, стеки для flamegraph."""
+    path = get_profile_path(profile_id)
+    if path is None:
+        raise Http404('Профиль не найден.')
+    if request.GET.get('format') == 'folded':
+        response = HttpResponse(
+            to_folded(json.loads(path.read_text())),
+            content_type='text/plain; charset=utf-8',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{profile_id}.folded"'
+        )
+        return response
+    return FileResponse(
+        path.open('rb'), as_attachment=True, filename=path.name,
+        content_type='application/json',
+    )
+
+
+profile_urls = [
+    path('', admin.site.admin_view(profile_list), name='profile-list'),
+    path(
+        '<str:profile_id>/',
+        admin.site.admin_view(profile_download),
+        name='profile-download',
+    ),
+]
@@ -0,0 +1,117 @@
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+RESPONSE_CACHE_TIMEOUT = 10 * 60
+LOCK_TIMEOUT = 30
+LOCK_WAIT = 2
+POLL_INTERVAL = 0.05
+
+# Теги записей кэша. Записи помечаются рецептами и авторами, которые
+# в них попали, и фильтрами, которые определяют состав списка.
+ALL_RECIPES = 'recipes'
+CATALOG = 'catalog'
+# Списки с фильтром или сортировкой по времени приготовления: рецепт
+# может войти в такой список после изменения, не попав в него раньше.
+COOKING_TIME = 'cooking-time'
+# Списки с сортировкой по популярности: порядок меняется с каждым
+# добавлением в избранное, даже если сами рецепты не изменились.
+POPULARITY = 'popularity'
+
+
+def recipe_tag(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def user_tag(user_id):
+    return f'user:{user_id}'
+
+
+def author_tag(author_id):
+    return f'author:{author_id}'
+
+
+def slug_tag(slug):
+    return f'tag:{slug}'
+
+
+def cart_tag(user_id):
+    return f'cart:{user_id}'
+
+
+def follows_tag(user_id):
+    return f'follows:{user_id}'
+
+
+def get_cache_key(request):
+    """
+    Ключ ответа: путь и параметры запроса в каноническом виде,
+    чтобы ?b=1&a=2 и ?a=2&b=1 попадали в одну запись.
+    """
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values if value != ''
+    )
+    return f'response:{request.path}?{urlencode(params)}'
+
+
+def version_key(tag):
+    return f'response-tag:{tag}'
+
+
+def get_versions(tags):
+    """
+    Текущие версии тегов. Версия - время последней инвалидации,
+    у тега, который еще не инвалидировался, она равна нулю.
+    Версии читаются при каждом попадании в кэш, поэтому вытесняются
+    позже записей, которые на них ссылаются.
+    """
+    keys = {version_key(tag): tag for tag in tags}
+    versions = cache.get_many(keys)
+    return {tag: versions.get(key, 0) for key, tag in keys.items()}
+
+
+def is_fresh(entry):
+    return entry is not None and get_versions(entry['versions']) == (
+        entry['versions']
+    )
+
+
+def invalidate(*tags):
+    """Помечает устаревшими все записи с любым из тегов."""
+    now = time.time()
+    cache.set_many({version_key(tag): now for tag in set(tags)}, None)
+
+
+def invalidate_on_commit(*tags):
+    transaction.on_commit(lambda: invalidate(*tags))
+
+
+def wait_for(key):
+    """Ждет, пока запись пересчитывает другой процесс."""
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if is_fresh(entry):
+            return entry
+    return None
+
+
+def store(key, response, tags, started):
+    """
+    Сохраняет ответ. Если тег инвалидирован уже после начала расчета,
+    ответ мог быть собран из старых данных и не сохраняется.
+    """
+    versions = get_versions(tags)
+    if any(version >= started for version in versions.values()):
+        return
+    cache.set(key, {
+        'data': response.data,
+        'status': response.status_code,
+        'versions': versions,
+    }, getattr(settings, 'RESPONSE_CACHE_TIMEOUT', RESPONSE_CACHE_TIMEOUT))
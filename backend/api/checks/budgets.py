@@ -0,0 +1,300 @@
+import json
+import re
+from itertools import product
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.urls import router
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeActivity,
+                            RecipeIngredient, ShoppingCart, Tag)
+from recipes.trending import truncate_hour
+from users.models import Follow
+
+User = get_user_model()
+
+BUDGETS_FILE = Path(__file__).resolve().parents[1] / 'query_budgets.json'
+
+# Наборы данных: (авторов, рецептов у автора, тегов и ингредиентов
+# в рецепте). Количество запросов не должно зависеть от набора.
+SIZES = {
+    'small': (2, 3, 2),
+    'large': (6, 12, 4),
+}
+# Размеры страницы, от которых количество запросов тоже не зависит.
+LIMITS = (2, 15)
+
+ANONYMOUS = 'anonymous'
+READER = 'user'
+AUTHOR = 'author'
+ROLES = (ANONYMOUS, READER, AUTHOR)
+
+# (имя маршрута, pk, метод, параметры запроса, тело, роли).
+# Подставляются: recipe - рецепт автора, author - автор, other - другой
+# автор, tag и ingredient - первые тег и ингредиент, tags и ingredients
+# - все теги и ингредиенты набора, limit - размер страницы. Значение
+# тела, которое целиком состоит из подстановки, заменяется значением
+# как есть: списком или числом.
+# Создание рецепта не проверяется: оно сохраняет файл изображения.
+ROUTES = (
+    ('tag-list', None, 'get', '', None, ROLES),
+    ('tag-detail', '{tag}', 'get', '', None, ROLES),
+    ('ingredient-list', None, 'get', '', None, ROLES),
+    ('ingredient-list', None, 'get', 'name=ing', None, ROLES),
+    ('ingredient-detail', '{ingredient}', 'get', '', None, ROLES),
+    ('recipe-list', None, 'get', 'limit={limit}', None, ROLES),
+    ('recipe-list', None, 'get', 'limit={limit}&compound=1', None, ROLES),
+    ('recipe-list', None, 'get', 'limit={limit}&fields=id,name', None, ROLES),
+    ('recipe-list', None, 'get', 'limit={limit}&tags=tag-0', None, ROLES),
+    (
+        'recipe-list', None, 'get',
+        'limit={limit}&tags=tag-0&ordering=fastest', None, ROLES,
+    ),
+    (
+        'recipe-list', None, 'get',
+        'limit={limit}&ordering=popular&cooking_time_max=30', None, ROLES,
+    ),
+    (
+        'recipe-list', None, 'get', 'limit={limit}&author={author}', None,
+        ROLES,
+    ),
+    (
+        'recipe-list', None, 'get', 'limit={limit}&is_favorited=1', None,
+        ROLES,
+    ),
+    (
+        'recipe-list', None, 'get', 'limit={limit}&is_in_shopping_cart=1',
+        None, ROLES,
+    ),
+    ('recipe-detail', '{recipe}', 'get', '', None, ROLES),
+    (
+        'recipe-detail', '{recipe}', 'patch', '', {
+            'tags': '{tags}', 'ingredients': '{ingredients}',
+            'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 5,
+        },
+        (AUTHOR,),
+    ),
+    ('recipe-detail', '{recipe}', 'delete', '', None, (AUTHOR,)),
+    ('recipe-trending', None, 'get', '', None, ROLES),
+    ('recipe-favorite', '{recipe}', 'post', '', None, (AUTHOR,)),
+    ('recipe-favorite', '{recipe}', 'delete', '', None, (READER,)),
+    ('recipe-shopping-cart', '{recipe}', 'post', '', None, (AUTHOR,)),
+    ('recipe-shopping-cart', '{recipe}', 'delete', '', None, (READER,)),
+    ('recipe-download-shopping-cart', None, 'get', '', None, (READER,)),
+    ('users-list', None, 'get', 'limit={limit}', None, ROLES),
+    ('users-detail', '{author}', 'get', '', None, ROLES),
+    ('users-me', None, 'get', '', None, (READER, AUTHOR)),
+    (
+        'users-subscriptions', None, 'get', 'limit={limit}&recipes_limit=3',
+        None, (READER,),
+    ),
+    ('users-suggestions', None, 'get', '', None, (READER, AUTHOR)),
+    ('users-subscribe', '{other}', 'post', '', None, (AUTHOR,)),
+    ('users-subscribe', '{author}', 'delete', '', None, (READER,)),
+    ('sync-list', None, 'get', '', None, (READER, AUTHOR)),
+    ('event-ticket-list', None, 'post', '', None, (READER,)),
+    ('bootstrap-list', None, 'get', 'limit={limit}', None, ROLES),
+    ('bootstrap-list', None, 'get', 'sections=me,tags', None, (READER,)),
+)
+
+# Маршруты, которые не проверяются, и причина.
+SKIPPED = {
+    'api-root': 'static response',
+    'recipe-export': 'streams relations per chunk by design',
+    'users-activation': 'account flow, sends email',
+    'users-resend-activation': 'account flow, sends email',
+    'users-reset-password': 'account flow, sends email',
+    'users-reset-password-confirm': 'account flow, sends email',
+    'users-reset-username': 'account flow, sends email',
+    'users-reset-username-confirm': 'account flow, sends email',
+    'users-set-password': 'single user update, password hashing',
+    'users-set-username': 'single user update',
+}
+
+
+def seed(authors_count, recipes_count, relations_count):
+    """
+    Создает авторов с рецептами и читателя, который подписан на всех
+    авторов, а их рецепты добавил в избранное и в список покупок.
+    Возвращает пользователей по ролям и значения для подстановки.
+    """
+    tags = Tag.objects.bulk_create(
+        Tag(name=f'Тег {i}', slug=f'tag-{i}', color='#49B64E')
+        for i in range(relations_count)
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'ing {i}', measurement_unit='г')
+        for i in range(relations_count)
+    )
+    users = User.objects.bulk_create(
+        User(
+            username=f'budget{i}', email=f'budget{i}@example.com',
+            first_name='Имя', last_name='Фамилия', password='!'
+        )
+        for i in range(authors_count + 1)
+    )
+    reader, authors = users[0], users[1:]
+    recipes = Recipe.objects.bulk_create(
+        Recipe(
+            author=author, name=f'Рецепт {i}', text='Описание',
+            cooking_time=i + 1, image='foodgram_backend/images/budget.png',
+            favorite_count=1,
+        )
+        for author in authors for i in range(recipes_count)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe=recipe, tag=tag)
+        for recipe in recipes for tag in tags
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+        for recipe in recipes for ingredient in ingredients
+    )
+    for model in (Favorite, ShoppingCart):
+        model.objects.bulk_create(
+            model(user=reader, recipe=recipe) for recipe in recipes
+        )
+    RecipeActivity.objects.bulk_create(
+        RecipeActivity(
+            recipe=recipe, hour=truncate_hour(timezone.now()), favorites=1
+        )
+        for recipe in recipes
+    )
+    Follow.objects.bulk_create(
+        Follow(user=reader, author=author) for author in authors
+    )
+    return {READER: reader, AUTHOR: authors[0]}, {
+        'recipe': recipes[0].pk,
+        'author': authors[0].pk,
+        'other': authors[1].pk,
+        'tag': tags[0].pk,
+        'ingredient': ingredients[0].pk,
+        'tags': [tag.pk for tag in tags],
+        'ingredients': [
+            {'id': ingredient.pk, 'amount': 2} for ingredient in ingredients
+        ],
+    }
+
+
+PLACEHOLDER = re.compile(r'\{(\w+)\}')
+
+
+def fill(value, context):
+    if isinstance(value, str):
+        match = PLACEHOLDER.fullmatch(value)
+        if match:
+            return context[match[1]]
+        value = value.format(**context)
+        return int(value) if value.isdigit() else value
+    if isinstance(value, list):
+        return [fill(item, context) for item in value]
+    if isinstance(value, dict):
+        return {key: fill(item, context) for key, item in value.items()}
+    return value
+
+
+def route_key(name, method, query, role):
+    """Ключ бюджета: подстановки в параметрах заменены на N."""
+    label = f'{name}?{PLACEHOLDER.sub("N", query)}' if query else name
+    return f'{method.upper()} {label} [{role}]'
+
+
+def measure(users, context, route, role, limit):
+    """SQL запросов, которые выполняет один вызов маршрута."""
+    name, pk, method, query, data, _ = route
+    client = APIClient()
+    if role != ANONYMOUS:
+        client.force_authenticate(users[role])
+    url = reverse(f'api:{name}', args=[fill(pk, context)] if pk else None)
+    if query:
+        url = f'{url}?{fill(query, {**context, "limit": limit})}'
+    cache.clear()
+    with transaction.atomic():
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(client, method)(
+                url, fill(data, context), format='json'
+            )
+            if hasattr(response, 'streaming_content'):
+                b''.join(response.streaming_content)
+        transaction.set_rollback(True)
+    assert response.status_code < 500, (
+        f'{method.upper()} {url}: {response.status_code}'
+    )
+    return [query['sql'] for query in queries.captured_queries]
+
+
+def get_missing_routes():
+    """Маршруты API, которых нет ни в ROUTES, ни в SKIPPED."""
+    names = {name for name, *_ in ROUTES}
+    return sorted({
+        pattern.name for pattern in router.urls
+        if pattern.name not in names and pattern.name not in SKIPPED
+    })
+
+
+def measure_routes():
+    """
+    Вызывает все маршруты на наборах данных SIZES со страницами
+    LIMITS в откатываемой транзакции. Возвращает ключ маршрута ->
+    список пар (набор данных, SQL запросов).
+    """
+    measured = {}
+    # Сид моложе задержки синхронизации, без нее /api/sync/ пуст.
+    for size, counts in SIZES.items():
+        with transaction.atomic(), override_settings(SYNC_COMMIT_GRACE=0):
+            users, context = seed(*counts)
+            for route in ROUTES:
+                name, _, method, query, _, roles = route
+                limits = LIMITS if '{limit}' in query else (None,)
+                for role, limit in product(roles, limits):
+                    measured.setdefault(
+                        route_key(name, method, query, role), []
+                    ).append((f'{size}, limit={limit}', measure(
+                        users, context, route, role, limit
+                    )))
+            transaction.set_rollback(True)
+    return measured
+
+
+def read_budgets():
+    if not BUDGETS_FILE.exists():
+        return {}
+    return json.loads(BUDGETS_FILE.read_text())
+
+
+def write_budgets(measured):
+    BUDGETS_FILE.write_text(json.dumps({
+        key: max(len(sql) for _, sql in runs)
+        for key, runs in measured.items()
+    }, indent=4, ensure_ascii=False) + '\n')
+
+
+def find_problems(runs, budget):
+    """
+    Нарушения для одного маршрута: число запросов зависит от данных
+    или больше бюджета. Возвращает (нарушения, набор данных с
+    наибольшим числом запросов, его SQL).
+    """
+    counts = {run: len(sql) for run, sql in runs}
+    worst, sql = max(runs, key=lambda run: len(run[1]))
+    problems = []
+    if len(set(counts.values())) > 1:
+        problems.append(f'depends on data: {counts}')
+    if budget is None:
+        problems.append('no budget')
+    elif len(sql) > budget:
+        problems.append(f'{len(sql)} queries, budget {budget}')
+    return problems, worst, sql
+
+
+def format_queries(worst, sql):
+    return f'Queries ({worst}):\n' + '\n'.join(
+        f'  {number}. {statement}'
+        for number, statement in enumerate(sql, 1)
+    )
@@ -0,0 +1,157 @@
+import json
+
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef, Q, Sum
+from django.utils import timezone
+
+from api.filters import ORDERINGS
+from api.live import REPLAY_LIMIT, replay_queryset
+from api.sync import after, get_sections
+from recipes.models import (Favorite, Recipe, RecipeIngredient, ShoppingCart,
+                            Tag)
+from users.models import Follow
+
+User = get_user_model()
+
+
+def get_plans(user_id, author_id, tag_ids):
+    """
+    Основные запросы эндпоинтов: имя -> (queryset, таблицы, которые
+    должны читаться по индексу, нужна ли сортировка по индексу).
+    """
+    sections = get_sections(user_id)
+    moment = timezone.now() - timedelta(days=1)
+
+    def sync_page(name, tables):
+        queryset, field, value = sections[name]
+        index = list(sections).index(name)
+        return (
+            queryset.filter(
+                Q(**{f'{field}__lte': timezone.now()})
+                & after((moment, index, 0), index, field)
+            ).order_by(field, 'pk').values_list(field, 'pk', value)[:201],
+            tables, False,
+        )
+
+    return {
+        'recipe list': (
+            Recipe.objects.order_by('-pub_date')[:6],
+            ('recipes_recipe',), True,
+        ),
+        'recipe list by author': (
+            Recipe.objects.filter(author_id=author_id)
+            .order_by('-pub_date')[:6],
+            ('recipes_recipe',), True,
+        ),
+        **{
+            f'recipe list by tag, ordering={name}': (
+                Recipe.objects.filter(Exists(
+                    Recipe.tags.through.objects.filter(
+                        recipe_id=OuterRef('pk'), tag_id__in=tag_ids
+                    )
+                )).order_by(*ordering)[:6],
+                ('recipes_recipe',), True,
+            )
+            for name, ordering in ORDERINGS.items()
+        },
+        'is_favorited filter': (
+            Recipe.objects.filter(pk__in=Favorite.objects.filter(
+                user_id=user_id
+            ).values('recipe_id')).order_by('-pub_date')[:6],
+            ('recipes_favorite',), False,
+        ),
+        'is_in_shopping_cart filter': (
+            Recipe.objects.filter(pk__in=ShoppingCart.objects.filter(
+                user_id=user_id
+            ).values('recipe_id')).order_by('-pub_date')[:6],
+            ('recipes_shoppingcart',), False,
+        ),
+        'viewer flags': (
+            Recipe.objects.annotate(is_favorited=Exists(
+                Favorite.objects.filter(
+                    user_id=user_id, recipe=OuterRef('pk')
+                )
+            )).order_by('-pub_date')[:6],
+            ('recipes_recipe', 'recipes_favorite'), True,
+        ),
+        'shopping list': (
+            RecipeIngredient.objects.filter(
+                recipe__shopping_cart__user_id=user_id
+            )
+            .values('ingredient__name', 'ingredient__measurement_unit')
+            .annotate(sum_total=Sum('amount')),
+            ('recipes_shoppingcart', 'recipes_recipeingredient'), False,
+        ),
+        'subscriptions': (
+            Follow.objects.filter(user_id=user_id).values('author_id'),
+            ('users_follow',), False,
+        ),
+        'followers': (
+            Follow.objects.filter(author_id=author_id).values('user_id'),
+            ('users_follow',), False,
+        ),
+        'is_subscribed': (
+            Follow.objects.filter(user_id=user_id, author_id=author_id),
+            ('users_follow',), False,
+        ),
+        'sync recipes': sync_page('recipes', (
+            'recipes_favorite', 'recipes_shoppingcart', 'users_follow',
+        )),
+        'sync followed recipes': sync_page('followed_recipes', (
+            'users_follow', 'recipes_recipe',
+        )),
+        'sync favorites': sync_page('favorites', ('recipes_favorite',)),
+        'sync subscriptions': sync_page('subscriptions', ('users_follow',)),
+        'live events replay': (
+            replay_queryset(user_id, 0)[:REPLAY_LIMIT + 1],
+            ('api_outboxevent',), True,
+        ),
+    }
+
+
+def walk(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from walk(child)
+
+
+def find_problems(queryset, tables, ordered):
+    """Последовательные чтения таблиц tables и явные сортировки в плане."""
+    plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+    for node in walk(plan):
+        if (
+            node['Node Type'] == 'Seq Scan'
+            and node.get('Relation Name') in tables
+        ):
+            yield f'sequential scan on {node["Relation Name"]}'
+        if ordered and node['Node Type'] in ('Sort', 'Incremental Sort'):
+            yield 'explicit sort'
+
+
+def check_plans():
+    """
+    Планы основных запросов с выключенным последовательным чтением
+    на текущей базе PostgreSQL с данными. Возвращает имя запроса ->
+    (нарушения, текстовый план).
+    """
+    user = User.objects.order_by('pk').first()
+    author = Recipe.objects.values_list('author_id', flat=True).first()
+    tag_ids = list(Tag.objects.values_list('pk', flat=True)[:2])
+    assert user is not None and author is not None, (
+        'Seed the database with users and recipes.'
+    )
+    results = {}
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        for name, (queryset, tables, ordered) in get_plans(
+            user.pk, author, tag_ids
+        ).items():
+            problems = sorted(set(find_problems(queryset, tables, ordered)))
+            results[name] = (
+                problems, queryset.explain() if problems else ''
+            )
+    return results
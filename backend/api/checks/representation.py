@@ -0,0 +1,159 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import ORJSONRenderer
+from api.representation import REFERENCE
+from api.serializers import (CompoundRecipeListSerializer,
+                             CustomUserSerializer, RecipeListSerializer,
+                             ShortRecipeSerializer)
+from api.views import annotate_subscribed, prepare_recipes
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Follow
+
+User = get_user_model()
+
+# Символы случайных строк: кириллица, экранируемые в JSON символы,
+# разделители строк, которые рендерер экранирует отдельно, и эмодзи.
+ALPHABET = 'abcxyzабвгдеёжя 0189"\\/<>&\'\n\t  🍲é'
+# Размер данных для замера скорости: (авторов, рецептов у автора,
+# тегов и ингредиентов в рецепте).
+BENCH_SIZE = (10, 10, 6)
+
+
+def random_text(rng, length=12):
+    return ''.join(rng.choice(ALPHABET) for _ in range(rng.randint(1, length)))
+
+
+def seed(rng, authors_count, recipes_count, relations_count):
+    """
+    Создает случайные теги, ингредиенты, авторов с рецептами и
+    читателя со случайными избранным, списком покупок и подписками.
+    """
+    tags = Tag.objects.bulk_create(
+        Tag(
+            name=f'{random_text(rng)} {i}', slug=f'tag-{i}',
+            color='#{:06x}'.format(rng.randrange(1 << 24))
+        )
+        for i in range(relations_count)
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(name=f'{random_text(rng)} {i}', measurement_unit=(
+            random_text(rng, 3)
+        ))
+        for i in range(relations_count)
+    )
+    users = User.objects.bulk_create(
+        User(
+            username=f'check{i}', email=f'check{i}@example.com',
+            first_name=random_text(rng), last_name=random_text(rng),
+            password='!'
+        )
+        for i in range(authors_count + 1)
+    )
+    reader, authors = users[0], users[1:]
+    recipes = Recipe.objects.bulk_create(
+        Recipe(
+            author=author, name=random_text(rng), text=random_text(rng, 60),
+            cooking_time=rng.randint(1, 32000),
+            image=rng.choice((
+                '', 'foodgram_backend/images/ab/plain.png',
+                f'foodgram_backend/images/{random_text(rng, 6)}.jpg',
+            )),
+            image_width=rng.choice((None, rng.randint(1, 4000))),
+            image_height=rng.choice((None, rng.randint(1, 4000))),
+            image_placeholder=rng.choice(('', random_text(rng, 40))),
+        )
+        for author in authors for _ in range(recipes_count)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe=recipe, tag=tag)
+        for recipe in recipes
+        for tag in rng.sample(tags, rng.randint(0, len(tags)))
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(
+            recipe=recipe, ingredient=ingredient,
+            amount=rng.randint(1, 32000)
+        )
+        for recipe in recipes
+        for ingredient in rng.sample(
+            ingredients, rng.randint(0, len(ingredients))
+        )
+    )
+    for model in (Favorite, ShoppingCart):
+        model.objects.bulk_create(
+            model(user=reader, recipe=recipe)
+            for recipe in recipes if rng.random() < 0.5
+        )
+    Follow.objects.bulk_create(
+        Follow(user=reader, author=author)
+        for author in authors if rng.random() < 0.5
+    )
+    return reader
+
+
+def get_request(user):
+    request = Request(APIRequestFactory().get('/api/recipes/'))
+    request.user = user
+    return request
+
+
+def serialize(serializer_class, objects, request, fields, reference):
+    """Данные сериализатора с полями fields, как их отдает view."""
+    serializer = serializer_class(objects, many=True, context={
+        'request': request, REFERENCE: reference
+    })
+    child_fields = serializer.child.fields
+    for name in set(child_fields) - fields:
+        child_fields.pop(name)
+    return serializer.data
+
+
+def get_cases(user, rng, subsets):
+    """(имя, класс сериализатора, объекты, поля) для пользователя."""
+    all_fields = set(RecipeListSerializer.Meta.fields)
+    field_sets = [all_fields] + [
+        set(rng.sample(sorted(all_fields), rng.randint(1, len(all_fields))))
+        for _ in range(subsets)
+    ]
+    for fields in field_sets:
+        recipes = list(prepare_recipes(Recipe.objects.all(), user, fields))
+        yield 'recipes', RecipeListSerializer, recipes, fields
+        yield 'compound', CompoundRecipeListSerializer, recipes, fields
+    yield 'short', ShortRecipeSerializer, list(Recipe.objects.all()), set(
+        ShortRecipeSerializer.Meta.fields
+    )
+    yield 'users', CustomUserSerializer, list(
+        annotate_subscribed(User.objects.all(), user)
+    ), set(CustomUserSerializer.Meta.fields)
+
+
+def check_parity(rng):
+    """
+    Создает случайные данные и сравнивает JSON штатного пути DRF и
+    скомпилированного для анонима и читателя. При расхождении
+    поднимает AssertionError с обоими вариантами.
+    """
+    renderer = ORJSONRenderer()
+    reader = seed(
+        rng, rng.randint(1, 4), rng.randint(0, 4), rng.randint(0, 4)
+    )
+    for user in (AnonymousUser(), reader):
+        request = get_request(user)
+        for name, serializer_class, objects, fields in get_cases(
+            user, rng, subsets=3
+        ):
+            expected, actual = (
+                renderer.render(serialize(
+                    serializer_class, objects, request, fields, reference
+                ))
+                for reference in (True, False)
+            )
+            assert expected == actual, (
+                f'{name} for {user}, fields {sorted(fields)}:\n'
+                f'DRF:      {expected.decode()}\n'
+                f'compiled: {actual.decode()}'
+            )
@@ -0,0 +1,64 @@
+import threading
+import time
+
+from api.cache import version_key
+
+COMPUTE_TIME = 0.2
+TIMEOUT = 60
+TAG = 'check'
+
+
+class Counter:
+    """Вычисление, которое считает свои вызовы."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def __call__(self):
+        with self.lock:
+            self.calls += 1
+            value = self.calls
+        time.sleep(COMPUTE_TIME)
+        return value, [TAG]
+
+
+def run_threads(flight, key, compute, threads):
+    barrier = threading.Barrier(threads)
+    results = []
+
+    def worker():
+        barrier.wait()
+        results.append(flight.get(key, compute, TIMEOUT))
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return results
+
+
+def run_scenarios(flight, threads):
+    """
+    Холодный ключ, инвалидированный ключ и ранний пересчет из threads
+    потоков одновременно. Возвращает список (сценарий, результаты,
+    ожидаемые результаты) и сохраненное в конце значение: каждое
+    значение должно считаться ровно один раз.
+    """
+    key = f'single-flight-check:{time.time_ns()}'
+    compute = Counter()
+    scenarios = []
+    results = run_threads(flight, key, compute, threads)
+    scenarios.append(('cold', results, [1] * threads))
+    flight.cache.set(version_key(TAG), time.time(), None)
+    results = run_threads(flight, key, compute, threads)
+    scenarios.append(('invalidated', results, [2] * threads))
+    entry = flight.cache.get(key)
+    entry['expires'] = time.time()
+    flight.cache.set(key, entry, TIMEOUT)
+    results = run_threads(flight, key, compute, threads)
+    scenarios.append(('early refresh', sorted(results), [2] * (
+        threads - 1
+    ) + [3]))
+    return scenarios, flight.cache.get(key)['value']
@@ -0,0 +1,149 @@
+import functools
+import hashlib
+import json
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import cache as response_cache
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+
+def get_request_hash(request):
+    data = request.data
+    if hasattr(data, 'lists'):
+        data = dict(data.lists())
+    payload = json.dumps(
+        [request.method, request.get_full_path(), data],
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def get_key_ttl():
+    return timedelta(seconds=getattr(
+        settings, 'IDEMPOTENCY_KEY_TTL', IDEMPOTENCY_KEY_TTL
+    ))
+
+
+def purge_idempotency_keys():
+    """Удаляет ключи старше IDEMPOTENCY_KEY_TTL."""
+    deleted, _ = IdempotencyKey.objects.filter(
+        created__lt=timezone.now() - get_key_ttl()
+    ).delete()
+    return deleted
+
+
+def idempotent(handler):
+    """
+    Поддержка заголовка Idempotency-Key для изменяющих запросов.
+    Повторный запрос с тем же ключом получает сохраненный ответ
+    без повторного выполнения. Одновременные запросы с одним ключом
+    выполняются по очереди за счет блокировки записи ключа.
+    Просроченные ключи удаляет команда purge_idempotency_keys.
+    """
+    max_length = IdempotencyKey._meta.get_field('key').max_length
+
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if not key or not request.user.is_authenticated:
+            return handler(self, request, *args, **kwargs)
+        if len(key) > max_length:
+            return Response(
+                {'errors': f'Ключ длиннее {max_length} символов.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        request_hash = get_request_hash(request)
+        expired = timezone.now() - get_key_ttl()
+        with transaction.atomic():
+            record, created = (
+                IdempotencyKey.objects.select_for_update().get_or_create(
+                    user=request.user, key=key,
+                    defaults={'request_hash': request_hash},
+                )
+            )
+            # Новый, просроченный или незавершенный ключ: запрос
+            # выполняется.
+            if (
+                created or record.created < expired
+                or record.status_code is None
+            ):
+                record.request_hash = request_hash
+                record.created = timezone.now()
+            elif record.request_hash != request_hash:
+                return Response(
+                    {'errors': 'Ключ уже использован для другого запроса.'},
+                    status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                )
+            else:
+                response = Response(
+                    record.response_data, status=record.status_code
+                )
+                response['Idempotent-Replayed'] = 'true'
+                return response
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code >= status.HTTP_500_INTERNAL_SERVER_ERROR:
+                record.delete()
+                return response
+            record.status_code = response.status_code
+            record.response_data = response.data
+            record.save()
+        return response
+    return wrapper
+
+
+def cache_anonymous(handler):
+    """
+    Кэш ответов для анонимных запросов. Для анонима признаки
+    избранного и подписок всегда ложны, поэтому ответ зависит только
+    от пути и параметров. Запись помечается тегами из
+    view.get_cache_tags() и устаревает при их инвалидации.
+    Пересчитывает запись один процесс: остальные отдают устаревшую
+    запись или ждут новую.
+    """
+    def replay(entry, state):
+        response = Response(entry['data'], status=entry['status'])
+        response['X-Cache'] = state
+        return response
+
+    @functools.wraps(handler)
+    def wrapper(self, request, *args, **kwargs):
+        if (
+            request.user.is_authenticated
+            or request.accepted_renderer.format != 'json'
+        ):
+            return handler(self, request, *args, **kwargs)
+        key = response_cache.get_cache_key(request)
+        entry = cache.get(key)
+        if response_cache.is_fresh(entry):
+            return replay(entry, 'HIT')
+        lock = f'{key}:lock'
+        if not cache.add(lock, 1, response_cache.LOCK_TIMEOUT):
+            if entry is not None:
+                return replay(entry, 'STALE')
+            entry = response_cache.wait_for(key)
+            if entry is not None:
+                return replay(entry, 'HIT')
+            return handler(self, request, *args, **kwargs)
+        try:
+            started = time.time()
+            response = handler(self, request, *args, **kwargs)
+            if response.status_code == status.HTTP_200_OK:
+                response_cache.store(
+                    key, response, self.get_cache_tags(), started
+                )
+            response['X-Cache'] = 'MISS'
+            return response
+        finally:
+            cache.delete(lock)
+    return wrapper
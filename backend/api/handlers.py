@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from recipes.models import Recipe
+from .cache import (ALL_RECIPES, COOKING_TIME, POPULARITY, author_tag,
+                    cart_tag, follows_tag, invalidate, recipe_tag, slug_tag)
+from .outbox import (FOLLOW_ADDED, FOLLOW_REMOVED, RECIPE_CREATED,
+                     RECIPE_DELETED, RECIPE_UPDATED, handler)
+
+# Кэши, которые видит только один процесс: инвалидация из процесса
+# consume_outbox не доходит до воркеров с такими кэшами.
+PROCESS_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+CART_ADDED = 'shoppingcart.added'
+CART_REMOVED = 'shoppingcart.removed'
+FAVORITE_ADDED = 'favorite.added'
+FAVORITE_REMOVED = 'favorite.removed'
+
+
+@handler(RECIPE_CREATED, RECIPE_UPDATED, RECIPE_DELETED)
+def invalidate_recipe(event):
+    """
+    Сигналы инвалидируют кэш после коммита в процессе запроса и
+    теряют инвалидацию, если процесс упал сразу после коммита.
+    Обработчик повторяет ее по событию, которое записано в той же
+    транзакции.
+    """
+    recipe_id = event.payload['recipe_id']
+    invalidate(
+        ALL_RECIPES, COOKING_TIME,
+        recipe_tag(recipe_id),
+        author_tag(event.payload['author_id']),
+        *(slug_tag(slug) for slug in Recipe.tags.through.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('tag__slug', flat=True)),
+    )
+
+
+@handler(CART_ADDED, CART_REMOVED)
+def invalidate_cart(event):
+    invalidate(cart_tag(event.payload['user_id']))
+
+
+@handler(FAVORITE_ADDED, FAVORITE_REMOVED)
+def invalidate_popularity(event):
+    invalidate(POPULARITY)
+
+
+@handler(FOLLOW_ADDED, FOLLOW_REMOVED)
+def invalidate_follows(event):
+    invalidate(follows_tag(event.payload['user_id']))
+
+
+@register(Tags.caches, 'outbox', deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Обработчики outbox инвалидируют кэш из отдельного процесса."""
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in PROCESS_CACHE_BACKENDS:
+        return []
+    return [Error(
+        f'Кэш {backend} не общий для процессов, обработчики outbox '
+        'не смогут инвалидировать ответы воркеров.',
+        hint='Задайте REDIS_URL.',
+        id='api.E001',
+    )]
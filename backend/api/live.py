@@ -0,0 +1,437 @@
+import asyncio
+import json
+import logging
+import secrets
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from rest_framework.authtoken.models import Token
+
+from .models import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+LIVE_EVENTS_BROKER = 'api.live.LocalBroker'
+LIVE_EVENTS_HEARTBEAT = 15
+LIVE_EVENTS_MAX_CONNECTIONS = 500
+# Подключений одного пользователя на воркер: вкладки и устройства.
+LIVE_EVENTS_MAX_USER_CONNECTIONS = 5
+LIVE_EVENTS_QUEUE_SIZE = 100
+LIVE_EVENTS_RETRY = 3000
+LIVE_EVENTS_TICKET_TTL = 30
+LIVE_EVENTS_CHANNEL = 'live-events'
+# Паузы перед переподключением слушателя Redis, секунды: удваиваются
+# после каждой неудачи до максимума.
+LIVE_EVENTS_RECONNECT_DELAY = 1
+LIVE_EVENTS_MAX_RECONNECT_DELAY = 60
+REPLAY_LIMIT = 500
+# События outbox, которые пересылаются устройствам пользователя user_id.
+LIVE_EVENT_TYPES = (
+    'favorite.added', 'favorite.removed',
+    'shoppingcart.added', 'shoppingcart.removed',
+    'follow.added', 'follow.removed',
+)
+RESET = 'reset'
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+class Subscription:
+    """Очередь событий одного подключения."""
+
+    def __init__(self, user_id, loop):
+        self.user_id = user_id
+        self.loop = loop
+        self.queue = asyncio.Queue(
+            get_setting('LIVE_EVENTS_QUEUE_SIZE', LIVE_EVENTS_QUEUE_SIZE)
+        )
+        self.overflowed = False
+        self.expired = False
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def expire(self):
+        """
+        Закрывает поток: события могли потеряться, клиент
+        переподключится с Last-Event-ID и получит их из outbox.
+        """
+        self.expired = True
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+
+class Broker:
+    """
+    Интерфейс рассылки событий. publish вызывается из потока
+    запроса после коммита, подписки живут в цикле событий ASGI.
+    Брокер выбирается настройкой LIVE_EVENTS_BROKER.
+    """
+
+    def publish(self, event):
+        raise NotImplementedError
+
+    def subscribe(self, user_id):
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription):
+        raise NotImplementedError
+
+
+class LocalBroker(Broker):
+    """
+    Рассылка внутри процесса. Доходят события, записанные этим же
+    воркером; для нескольких воркеров нужен RedisBroker.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = {}
+
+    def publish(self, event):
+        with self.lock:
+            subscriptions = list(
+                self.subscriptions.get(event['user_id'], ())
+            )
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.put, event)
+
+    def subscribe(self, user_id):
+        subscription = Subscription(user_id, asyncio.get_running_loop())
+        with self.lock:
+            self.subscriptions.setdefault(user_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscriptions.get(subscription.user_id)
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.subscriptions[subscription.user_id]
+
+    def expire_all(self):
+        with self.lock:
+            subscriptions = [
+                subscription
+                for group in self.subscriptions.values()
+                for subscription in group
+            ]
+        for subscription in subscriptions:
+            subscription.loop.call_soon_threadsafe(subscription.expire)
+
+
+class RedisBroker(LocalBroker):
+    """
+    Рассылка между воркерами через pub/sub Redis (LIVE_EVENTS_REDIS_URL).
+    publish отправляет событие в канал, а поток-слушатель каждого
+    воркера раздает его своим подключениям. Слушатель запускается при
+    первой подписке: воркеры без подключений канал не читают.
+    При ошибке Redis слушатель переподключается с растущей паузой,
+    а открытые потоки закрываются: пропущенные за это время события
+    клиенты получат из outbox по Last-Event-ID.
+    """
+
+    def __init__(self):
+        import redis
+
+        super().__init__()
+        self.errors = redis.RedisError
+        self.redis = redis.Redis.from_url(settings.LIVE_EVENTS_REDIS_URL)
+        self.channel = get_setting('LIVE_EVENTS_CHANNEL', LIVE_EVENTS_CHANNEL)
+        self.listener = None
+
+    def publish(self, event):
+        self.redis.publish(self.channel, json.dumps(event))
+
+    def subscribe(self, user_id):
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(
+                    target=self.listen, name='live-events', daemon=True
+                )
+                self.listener.start()
+        return super().subscribe(user_id)
+
+    def listen(self):
+        delay = get_setting(
+            'LIVE_EVENTS_RECONNECT_DELAY', LIVE_EVENTS_RECONNECT_DELAY
+        )
+        max_delay = get_setting(
+            'LIVE_EVENTS_MAX_RECONNECT_DELAY',
+            LIVE_EVENTS_MAX_RECONNECT_DELAY,
+        )
+        pause = delay
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                pause = delay
+                for message in pubsub.listen():
+                    super().publish(json.loads(message['data']))
+            except self.errors as error:
+                logger.warning(
+                    'Live events listener lost Redis: %s. '
+                    'Reconnecting in %s s.', error, pause,
+                )
+            finally:
+                pubsub.close()
+            self.expire_all()
+            time.sleep(pause)
+            pause = min(pause * 2, max_delay)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(
+        get_setting('LIVE_EVENTS_BROKER', LIVE_EVENTS_BROKER)
+    )()
+
+
+def to_live_event(event):
+    return {
+        'id': event.pk,
+        'type': event.event_type,
+        'user_id': event.payload.get('user_id'),
+        'data': event.payload,
+    }
+
+
+def notify(event):
+    """Передает брокеру событие outbox, если оно для устройств."""
+    if event.event_type in LIVE_EVENT_TYPES:
+        get_broker().publish(to_live_event(event))
+
+
+def replay_queryset(user_id, last_event_id):
+    """События пользователя после last_event_id по индексу (user_id, id)."""
+    return OutboxEvent.objects.filter(
+        user_id=user_id, pk__gt=last_event_id,
+        event_type__in=LIVE_EVENT_TYPES,
+    ).order_by('pk')
+
+
+def replay(user_id, last_event_id):
+    """
+    События пользователя после last_event_id из outbox. Если нужные
+    события уже удалены или их слишком много, возвращает None:
+    клиенту нужна полная синхронизация через /api/sync/.
+    """
+    oldest = OutboxEvent.objects.values_list('pk', flat=True).first()
+    if oldest is not None and oldest > last_event_id + 1:
+        return None
+    events = list(
+        replay_queryset(user_id, last_event_id)[:REPLAY_LIMIT + 1]
+    )
+    if len(events) > REPLAY_LIMIT:
+        return None
+    return [to_live_event(event) for event in events]
+
+
+def get_user_id(token):
+    return Token.objects.filter(
+        key=token, user__is_active=True
+    ).values_list('user_id', flat=True).first()
+
+
+def ticket_key(ticket):
+    return f'live-ticket:{ticket}'
+
+
+def issue_ticket(user_id):
+    """
+    Одноразовый билет для подключения к потоку: EventSource не умеет
+    передавать заголовки, а постоянный токен в адресе попадает в
+    журналы сервера и историю браузера.
+    """
+    ticket = secrets.token_urlsafe(32)
+    cache.set(
+        ticket_key(ticket), user_id,
+        get_setting('LIVE_EVENTS_TICKET_TTL', LIVE_EVENTS_TICKET_TTL),
+    )
+    return ticket
+
+
+def consume_ticket(ticket):
+    """
+    Пользователь билета или None. Билет удаляется при первом
+    использовании: из двух одновременных подключений пройдет одно.
+    """
+    key = ticket_key(ticket)
+    user_id = cache.get(key)
+    if user_id is None or not cache.delete(key):
+        return None
+    return user_id
+
+
+def format_event(event):
+    if event['type'] == RESET:
+        return f'event: {RESET}\ndata: {{}}\n\n'.encode()
+    data = json.dumps(event['data'], ensure_ascii=False)
+    return (
+        f'id: {event["id"]}\nevent: {event["type"]}\ndata: {data}\n\n'
+    ).encode()
+
+
+class EventStream:
+    """
+    ASGI-приложение /api/events/: поток server-sent events с
+    изменениями избранного, списка покупок и подписок пользователя.
+    Авторизация токеном в заголовке Authorization или одноразовым
+    билетом ?ticket= из POST /api/events/ticket/.
+    Заголовок Last-Event-ID продолжает поток с пропущенного события.
+    """
+
+    def __init__(self):
+        self.connections = 0
+        self.user_connections = Counter()
+
+    async def respond(self, send, status, body, headers=()):
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'), *headers
+            ],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': json.dumps({'errors': body}, ensure_ascii=False).encode(),
+        })
+
+    def get_user_id(self, scope):
+        headers = dict(scope['headers'])
+        authorization = headers.get(b'authorization', b'').decode()
+        if authorization.startswith('Token '):
+            return get_user_id(authorization[len('Token '):].strip())
+        query = parse_qs(scope['query_string'].decode())
+        ticket = query.get('ticket', [None])[0]
+        return consume_ticket(ticket) if ticket else None
+
+    def get_last_event_id(self, scope):
+        value = dict(scope['headers']).get(b'last-event-id', b'')
+        try:
+            return int(value)
+        except ValueError:
+            return None
+
+    async def __call__(self, scope, receive, send):
+        user_id = await sync_to_async(self.get_user_id)(scope)
+        if user_id is None:
+            return await self.respond(
+                send, 401, 'Учетные данные не были предоставлены.'
+            )
+        limit = get_setting(
+            'LIVE_EVENTS_MAX_CONNECTIONS', LIVE_EVENTS_MAX_CONNECTIONS
+        )
+        if self.connections >= limit:
+            return await self.respond(
+                send, 503, 'Слишком много подключений.',
+                [(b'retry-after', b'30')],
+            )
+        user_limit = get_setting(
+            'LIVE_EVENTS_MAX_USER_CONNECTIONS',
+            LIVE_EVENTS_MAX_USER_CONNECTIONS,
+        )
+        if self.user_connections[user_id] >= user_limit:
+            return await self.respond(
+                send, 429, 'Слишком много подключений пользователя.',
+                [(b'retry-after', b'30')],
+            )
+        self.connections += 1
+        self.user_connections[user_id] += 1
+        broker = get_broker()
+        subscription = broker.subscribe(user_id)
+        try:
+            await self.stream(scope, receive, send, user_id, subscription)
+        finally:
+            broker.unsubscribe(subscription)
+            self.connections -= 1
+            self.user_connections[user_id] -= 1
+            if not self.user_connections[user_id]:
+                del self.user_connections[user_id]
+
+    async def stream(self, scope, receive, send, user_id, subscription):
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        retry = get_setting('LIVE_EVENTS_RETRY', LIVE_EVENTS_RETRY)
+        await send({
+            'type': 'http.response.body',
+            'body': f'retry: {retry}\n\n'.encode(),
+            'more_body': True,
+        })
+        last_event_id = self.get_last_event_id(scope)
+        if last_event_id is not None:
+            events = await sync_to_async(replay)(user_id, last_event_id)
+            for event in events or [{'type': RESET}]:
+                last_event_id = event.get('id', last_event_id)
+                await send({
+                    'type': 'http.response.body',
+                    'body': format_event(event),
+                    'more_body': True,
+                })
+        heartbeat = get_setting(
+            'LIVE_EVENTS_HEARTBEAT', LIVE_EVENTS_HEARTBEAT
+        )
+        disconnect = asyncio.ensure_future(self.wait_disconnect(receive))
+        try:
+            while not disconnect.done():
+                if subscription.expired:
+                    await send({'type': 'http.response.body', 'body': b''})
+                    return
+                if subscription.overflowed:
+                    await send({
+                        'type': 'http.response.body',
+                        'body': format_event({'type': RESET}),
+                    })
+                    return
+                get = asyncio.ensure_future(subscription.queue.get())
+                done, _ = await asyncio.wait(
+                    (get, disconnect), timeout=heartbeat,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if get not in done:
+                    get.cancel()
+                    body = b': ping\n\n'
+                else:
+                    event = get.result()
+                    if event is None:
+                        continue
+                    if last_event_id is not None and (
+                        event['id'] <= last_event_id
+                    ):
+                        continue
+                    body = format_event(event)
+                if disconnect.done():
+                    return
+                await send({
+                    'type': 'http.response.body',
+                    'body': body,
+                    'more_body': True,
+                })
+        finally:
+            disconnect.cancel()
+
+    async def wait_disconnect(self, receive):
+        while (await receive())['type'] != 'http.disconnect':
+            pass
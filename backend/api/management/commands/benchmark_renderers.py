@@ -0,0 +1,84 @@
+import random
+import timeit
+
+from django.core.management import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.middleware import COMPRESSORS
+from api.renderers import ORJSONRenderer
+
+TEXT = 'Нарежьте овощи, обжарьте 5 минут & подавайте "горячим". '
+
+
+def recipe(rng, pk):
+    """Рецепт в том виде, в каком его отдает RecipeListSerializer."""
+    return {
+        'id': pk,
+        'tags': [
+            {'id': tag, 'name': f'Тег {tag}', 'color': '#49B64E',
+             'slug': f'tag-{tag}'}
+            for tag in rng.sample(range(10), 3)
+        ],
+        'author': {
+            'email': f'author{pk % 50}@example.com', 'id': pk % 50,
+            'username': f'author{pk % 50}', 'first_name': 'Имя',
+            'last_name': 'Фамилия', 'is_subscribed': rng.random() < 0.5,
+        },
+        'ingredients': [
+            {'id': item, 'name': f'ингредиент {item}',
+             'measurement_unit': 'г', 'amount': rng.randint(1, 500)}
+            for item in rng.sample(range(2000), 8)
+        ],
+        'is_favorited': rng.random() < 0.5,
+        'is_in_shopping_cart': rng.random() < 0.5,
+        'name': f'Рецепт {pk}',
+        'image': f'http://localhost/media/recipes/images/{pk:064x}.jpg',
+        'text': TEXT * rng.randint(1, 10),
+        'cooking_time': rng.randint(1, 300),
+    }
+
+
+class Command(BaseCommand):
+    help = """
+        Renders a recipe list payload with DRF's JSONRenderer and with
+        ORJSONRenderer, checks that the bytes are identical and prints
+        render times and compressed sizes.
+        """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=600,
+            help='Number of recipes in the payload.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Timing repetitions, the best one is reported.',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(0)
+        data = {
+            'count': options['recipes'],
+            'results': [recipe(rng, pk) for pk in range(options['recipes'])],
+        }
+        rendered = {}
+        for renderer in (JSONRenderer(), ORJSONRenderer()):
+            name = type(renderer).__name__
+            rendered[name] = renderer.render(data)
+            best = min(timeit.repeat(
+                lambda: renderer.render(data),
+                number=1, repeat=options['repeat'],
+            ))
+            self.stdout.write(f'{name}: {best * 1000:.2f} ms')
+        if len(set(rendered.values())) != 1:
+            raise CommandError('Renderers produced different bytes.')
+        body = rendered['ORJSONRenderer']
+        self.stdout.write(f'payload: {len(body) / 1024:.1f} KB')
+        for encoding, compressor_class in COMPRESSORS.items():
+            compressor = compressor_class()
+            size = len(compressor.compress(body) + compressor.finish())
+            self.stdout.write(f'{encoding}: {size / 1024:.1f} KB')
@@ -0,0 +1,54 @@
+from django.core.management import BaseCommand, CommandError
+
+from api.checks.budgets import (BUDGETS_FILE, find_problems, format_queries,
+                                get_missing_routes, measure_routes,
+                                read_budgets, write_budgets)
+
+
+class Command(BaseCommand):
+    help = """
+        Calls every API route as an anonymous user, a reader and the
+        author on two seeded data sets and two page sizes inside a
+        rolled back transaction. Fails if the number of SQL queries
+        depends on the data or page size, or exceeds the budget stored
+        in api/query_budgets.json, and prints the offending SQL.
+        The same check runs in api.tests.test_query_budgets.
+        """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--update',
+            action='store_true',
+            help='Write measured counts to the budgets file.',
+        )
+
+    def handle(self, *args, **options):
+        missing = get_missing_routes()
+        if missing:
+            raise CommandError(
+                f'No query budget for routes: {", ".join(missing)}.'
+            )
+        try:
+            measured = measure_routes()
+        except AssertionError as error:
+            raise CommandError(error)
+        if options['update']:
+            write_budgets(measured)
+            self.stdout.write(f'Budgets written to {BUDGETS_FILE}.')
+        budgets = read_budgets()
+        failed = []
+        for key, runs in measured.items():
+            problems, worst, sql = find_problems(runs, budgets.get(key))
+            if not problems:
+                self.stdout.write(f'{key}: {len(sql)}')
+                continue
+            failed.append(key)
+            self.stdout.write(self.style.ERROR(
+                f'{key}: {"; ".join(problems)}\n'
+                + format_queries(worst, sql)
+            ))
+        if failed:
+            raise CommandError(
+                f'Query budget exceeded for {len(failed)} routes.'
+            )
+        self.stdout.write(self.style.SUCCESS('All routes within budget.'))
@@ -0,0 +1,37 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import connection
+
+from api.checks.plans import check_plans
+
+
+class Command(BaseCommand):
+    help = """
+        Runs EXPLAIN for the main query of every API endpoint with
+        sequential scans disabled and fails if a table that should be
+        read through an index is still scanned sequentially, or if an
+        ordered query needs an explicit sort. Requires PostgreSQL and
+        a seeded database. The same check runs in
+        api.tests.test_query_plans on a seeded test database.
+        """
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Query plans are checked on PostgreSQL only.')
+        try:
+            results = check_plans()
+        except AssertionError as error:
+            raise CommandError(error)
+        failed = []
+        for name, (problems, plan) in results.items():
+            if problems:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(
+                    f'{name}: {", ".join(problems)}\n{plan}'
+                ))
+            else:
+                self.stdout.write(f'{name}: ok')
+        if failed:
+            raise CommandError(
+                f'Unexpected plans for: {", ".join(failed)}.'
+            )
+        self.stdout.write(self.style.SUCCESS('All query plans use indexes.'))
@@ -0,0 +1,79 @@
+import random
+import timeit
+
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from api.checks.representation import (BENCH_SIZE, check_parity, get_cases,
+                                       get_request, seed, serialize)
+
+
+class Command(BaseCommand):
+    help = """
+        Checks that the compiled read path of the API serializers
+        renders byte-identical JSON to the regular DRF path on randomly
+        generated recipes, users and sparse field sets, then measures
+        both paths on a larger data set. The parity check also runs in
+        api.tests.test_representation.
+        """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=20,
+            help='Number of random data sets to compare.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='Random seed, to reproduce a failure.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timing repetitions, the best one is reported.',
+        )
+
+    def benchmark(self, rng, repeat):
+        reader = seed(rng, *BENCH_SIZE)
+        request = get_request(reader)
+        for name, serializer_class, objects, fields in get_cases(
+            reader, rng, subsets=0
+        ):
+            timings = [
+                min(timeit.repeat(
+                    lambda: serialize(
+                        serializer_class, objects, request, fields, reference
+                    ),
+                    number=1, repeat=repeat,
+                )) * 1000
+                for reference in (True, False)
+            ]
+            self.stdout.write(
+                f'{name} ({len(objects)} objects): '
+                f'DRF {timings[0]:.2f} ms, compiled {timings[1]:.2f} ms, '
+                f'x{timings[0] / timings[1]:.1f}'
+            )
+
+    def handle(self, *args, **options):
+        seed_value = options['seed']
+        if seed_value is None:
+            seed_value = random.randrange(1 << 32)
+        self.stdout.write(f'Seed {seed_value}.')
+        rng = random.Random(seed_value)
+        for _ in range(options['runs']):
+            with transaction.atomic():
+                try:
+                    check_parity(rng)
+                except AssertionError as error:
+                    raise CommandError(error)
+                transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS(
+            f'{options["runs"]} random data sets render identically.'
+        ))
+        with transaction.atomic():
+            self.benchmark(rng, options['repeat'])
+            transaction.set_rollback(True)
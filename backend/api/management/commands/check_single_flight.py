@@ -0,0 +1,48 @@
+import tempfile
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import BaseCommand, CommandError
+
+from api.checks.single_flight import run_scenarios
+from api.singleflight import SingleFlight
+
+
+class Command(BaseCommand):
+    help = """
+        Runs concurrent threads against SingleFlight on the local-memory
+        and file cache backends and checks that a cold key, an
+        invalidated key and an early refresh are computed exactly once.
+        The same scenarios run in api.tests.test_single_flight.
+        """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=16,
+            help='Number of concurrent threads.',
+        )
+
+    def check_backend(self, name, flight, threads):
+        scenarios, stored = run_scenarios(flight, threads)
+        for scenario, results, expected in scenarios:
+            if results != expected:
+                raise CommandError(
+                    f'{name}, {scenario}: got {results}, '
+                    f'expected {expected}.'
+                )
+            self.stdout.write(f'{name}, {scenario}: ok')
+        if stored != 3:
+            raise CommandError(f'{name}: refreshed value was not stored.')
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        self.check_backend('locmem', SingleFlight(LocMemCache(
+            'single-flight-check', {}
+        )), threads)
+        with tempfile.TemporaryDirectory() as directory:
+            self.check_backend('file', SingleFlight(
+                FileBasedCache(directory, {})
+            ), threads)
+        self.stdout.write(self.style.SUCCESS('Single flight checks passed.'))
@@ -0,0 +1,69 @@
+import time
+
+from django.core.management import BaseCommand
+
+from api.outbox import BATCH_SIZE, DEFAULT_CONSUMER, consume, purge
+
+# Как часто в режиме --watch удаляются доставленные события.
+PURGE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = """
+        Delivers outbox events to the registered in-process handlers
+        in order, at least once. The position of every consumer is
+        stored, so the command can be stopped and restarted at any time.
+        With --purge, events delivered to every consumer and older than
+        OUTBOX_RETENTION are deleted, every minute in --watch mode.
+        Handlers invalidate the shared cache, so a process-local cache
+        backend is an error.
+        """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--consumer', default=DEFAULT_CONSUMER,
+            help='Name of the consumer whose position is stored.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='Number of events delivered in one transaction.'
+        )
+        parser.add_argument(
+            '--watch', type=float, metavar='SECONDS',
+            help='Keep polling for new events with the given interval.'
+        )
+        parser.add_argument(
+            '--purge', action='store_true',
+            help='Delete events delivered to every consumer and older '
+                 'than OUTBOX_RETENTION.'
+        )
+
+    def purge(self):
+        self.stdout.write(
+            self.style.SUCCESS(f'{purge()} events were purged.')
+        )
+
+    def handle(self, *args, **options):
+        if not options['skip_checks']:
+            self.check(tags=['outbox'], include_deployment_checks=True)
+        total = 0
+        purged = time.monotonic()
+        while True:
+            delivered = consume(options['consumer'], options['batch_size'])
+            total += delivered
+            if delivered:
+                continue
+            if options['watch'] is None:
+                break
+            if (
+                options['purge']
+                and time.monotonic() - purged >= PURGE_INTERVAL
+            ):
+                self.purge()
+                purged = time.monotonic()
+            time.sleep(options['watch'])
+        self.stdout.write(
+            self.style.SUCCESS(f'{total} events were delivered.')
+        )
+        if options['purge']:
+            self.purge()
@@ -0,0 +1,15 @@
+from django.core.management import BaseCommand
+
+from api.decorators import purge_idempotency_keys
+
+
+class Command(BaseCommand):
+    help = """
+        Deletes Idempotency-Key records older than IDEMPOTENCY_KEY_TTL.
+        Run it periodically, e.g. hourly.
+        """
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(
+            f'{purge_idempotency_keys()} idempotency keys were purged.'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management import BaseCommand
+
+from api.sync import purge_tombstones
+
+
+class Command(BaseCommand):
+    help = """
+        Deletes deletion records older than SYNC_TOMBSTONE_TTL. Clients
+        with an older sync token get 410 and run a full sync.
+        """
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(
+            f'{purge_tombstones()} tombstones were purged.'
+        ))
@@ -0,0 +1,83 @@
+from django.core.management import BaseCommand
+
+from api.querylog import locked_log, read_entries
+
+SORT_KEYS = {
+    'total': lambda entry: entry['total'],
+    'max': lambda entry: entry['max'],
+    'count': lambda entry: entry['count'],
+    'mean': lambda entry: entry['total'] / entry['count'],
+}
+
+
+def top(counter, limit=3):
+    return ', '.join(
+        f'{name} ({count})' for name, count in counter.most_common(limit)
+    ) or '-'
+
+
+class Command(BaseCommand):
+    help = """
+        Prints the worst SQL query fingerprints recorded by
+        QueryLogMiddleware, with call counts, total, mean and max time,
+        and the views and serializer methods that issued them.
+        """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sort',
+            choices=SORT_KEYS,
+            default='total',
+            help='Order by total, max or mean time, or by count.',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Number of fingerprints to print.',
+        )
+        parser.add_argument(
+            '--min-time',
+            type=float,
+            default=0,
+            help='Skip fingerprints whose max time is below this, in ms.',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Delete the log after printing it.',
+        )
+
+    def handle(self, *args, **options):
+        if options['reset']:
+            # Удаляется ровно то, что прочитано: воркер не допишет
+            # счетчики между чтением и удалением.
+            with locked_log() as path:
+                data = read_entries(path)
+                path.unlink(missing_ok=True)
+        else:
+            data = read_entries()
+        entries = [
+            (sql, entry) for sql, entry in data.items()
+            if entry['max'] >= options['min_time']
+        ]
+        entries.sort(
+            key=lambda item: SORT_KEYS[options['sort']](item[1]),
+            reverse=True,
+        )
+        if not entries:
+            self.stdout.write('No queries recorded.')
+        for number, (sql, entry) in enumerate(
+            entries[:options['limit']], 1
+        ):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{number}. {entry["count"]} calls, '
+                f'total {entry["total"]:.1f} ms, '
+                f'mean {entry["total"] / entry["count"]:.2f} ms, '
+                f'max {entry["max"]:.1f} ms'
+            ))
+            self.stdout.write(f'   views: {top(entry["views"])}')
+            self.stdout.write(f'   serializers: {top(entry["sources"])}')
+            self.stdout.write(f'   {sql}')
+        if options['reset']:
+            self.stdout.write('Query log was reset.')
@@ -0,0 +1,246 @@
+import random
+import re
+import zlib
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from rest_framework.authentication import (TokenAuthentication,
+                                           get_authorization_header)
+from rest_framework.exceptions import AuthenticationFailed
+
+from .profiling import PROFILING_SAMPLE_RATE, Profile, save_profile
+from .querylog import record
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_MIN_SIZE = 1024
+# Сколько байт потокового ответа сжимается до сброса в сеть.
+COMPRESSION_BLOCK_SIZE = 16 * 1024
+
+
+class GzipCompressor:
+    def __init__(self):
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self.compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=5)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self):
+        self.compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self.compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+COMPRESSORS = {'gzip': GzipCompressor}
+if brotli is not None:
+    COMPRESSORS['br'] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS['zstd'] = ZstdCompressor
+
+# Порядок предпочтения сервера при равных весах у клиента.
+PREFERENCE = ('br', 'zstd', 'gzip')
+
+
+def negotiate_encoding(accept_encoding):
+    """Выбирает кодировку сжатия по заголовку Accept-Encoding."""
+    weights = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.strip().partition(';')
+        weight = 1.0
+        match = re.search(r'\bq=([^;\s]*)', params)
+        if match:
+            try:
+                weight = float(match.group(1))
+            except ValueError:
+                continue
+        weights[coding.strip().lower()] = weight
+    candidates = [
+        coding for coding in PREFERENCE
+        if coding in COMPRESSORS
+        and weights.get(coding, weights.get('*', 0)) > 0
+    ]
+    if not candidates:
+        return None
+    return max(
+        candidates,
+        key=lambda coding: weights.get(coding, weights.get('*', 0))
+    )
+
+
+def compress_sequence(sequence, compressor, block_size=COMPRESSION_BLOCK_SIZE):
+    """
+    Сжимает потоковый ответ по частям, не накапливая его в памяти.
+    Сжатое сбрасывается раз в block_size исходных байт: сброс после
+    каждой короткой части, например строки списка покупок, почти
+    отменяет сжатие.
+    """
+    pending = 0
+    for item in sequence:
+        data = compressor.compress(item)
+        pending += len(item)
+        if pending >= block_size:
+            data += compressor.flush()
+            pending = 0
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы gzip, brotli или zstd в зависимости от Accept-Encoding.
+    Обычные ответы меньше COMPRESSION_MIN_SIZE байт не сжимаются,
+    потоковые сжимаются по мере отдачи.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(
+            settings, 'COMPRESSION_MIN_SIZE', COMPRESSION_MIN_SIZE
+        )
+        self.block_size = getattr(
+            settings, 'COMPRESSION_BLOCK_SIZE', COMPRESSION_BLOCK_SIZE
+        )
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header('Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        coding = negotiate_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if coding is None:
+            return response
+        compressor = COMPRESSORS[coding]()
+        if response.streaming:
+            response.streaming_content = compress_sequence(
+                response.streaming_content, compressor, self.block_size
+            )
+            del response['Content-Length']
+        else:
+            if len(response.content) < self.min_size:
+                return response
+            content = (
+                compressor.compress(response.content) + compressor.finish()
+            )
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = coding
+        return response
+
+
+class ProfilingMiddleware:
+    """
+    Профилирует запрос сэмплером и сохраняет профиль с трассой SQL
+    в кольцевой буфер на диске. Профилируются запросы сотрудников
+    с заголовком X-Profile и доля PROFILING_SAMPLE_RATE всех запросов.
+    Идентификатор профиля возвращается в заголовке X-Profile-Id,
+    профили доступны в админке. С PROFILING_ENABLED = False
+    middleware отключается целиком.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(
+            settings, 'PROFILING_SAMPLE_RATE', PROFILING_SAMPLE_RATE
+        )
+
+    def is_staff(self, request):
+        """
+        С токеном в Authorization пользователь берется по токену, иначе
+        из сессии. Запрос без токена и без сессии не обращается к базе.
+        """
+        keyword, *_ = get_authorization_header(request).split() or [b'']
+        if keyword.lower() != TokenAuthentication.keyword.lower().encode():
+            user = getattr(request, 'user', None)
+            return user is not None and user.is_staff
+        try:
+            result = TokenAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return False
+        return result is not None and result[0].is_staff
+
+    def __call__(self, request):
+        if 'HTTP_X_PROFILE' in request.META:
+            requested = self.is_staff(request)
+        else:
+            requested = False
+        if not requested and not (
+            self.sample_rate and random.random() < self.sample_rate
+        ):
+            return self.get_response(request)
+        with Profile() as profile:
+            response = self.get_response(request)
+        profile_id = save_profile(profile.as_dict(
+            created=timezone.now().isoformat(timespec='seconds'),
+            method=request.method,
+            path=request.get_full_path(),
+            status=response.status_code,
+            requested=requested,
+        ))
+        if requested:
+            response['X-Profile-Id'] = profile_id
+        return response
+
+
+class QueryLogMiddleware:
+    """
+    Учитывает все SQL-запросы запроса в журнале api.querylog:
+    время по отпечаткам запросов, view и методы сериализаторов.
+    Включается настройкой QUERY_LOG_ENABLED.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_LOG_ENABLED', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with connection.execute_wrapper(partial(record, request)):
+            return self.get_response(request)
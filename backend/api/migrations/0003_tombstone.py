@@ -0,0 +1,80 @@
+# Generated by Django 4.1.4 on 2026-10-19 09:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("api", "0002_outbox"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("recipe", "Рецепт"),
+                            ("favorite", "Избранное"),
+                            ("shopping_cart", "Список покупок"),
+                            ("follow", "Подписка"),
+                        ],
+                        max_length=16,
+                        verbose_name="Что удалено",
+                    ),
+                ),
+                (
+                    "object_id",
+                    models.PositiveIntegerField(verbose_name="Рецепт или автор"),
+                ),
+                (
+                    "deleted",
+                    models.DateTimeField(
+                        auto_now_add=True, db_index=True, verbose_name="Дата удаления"
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tombstones",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Удаление",
+                "verbose_name_plural": "Удаления",
+                "ordering": ("deleted", "pk"),
+            },
+        ),
+        migrations.AddIndex(
+            model_name="tombstone",
+            index=models.Index(
+                fields=["user", "deleted"], name="tombstone_user_deleted_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tombstone",
+            index=models.Index(
+                fields=["kind", "deleted"], name="tombstone_kind_deleted_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.1.4 on 2026-10-19 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0003_tombstone"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboxcheckpoint",
+            name="gaps",
+            field=models.JSONField(
+                default=dict,
+                help_text="id событий до позиции, которые еще не были видны, и время, когда пропуск замечен.",
+                verbose_name="Пропущенные события",
+            ),
+        ),
+    ]
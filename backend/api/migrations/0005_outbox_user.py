@@ -0,0 +1,49 @@
+# Generated by Django 4.1.4 on 2026-10-19 11:01
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def fill_user_id(apps, schema_editor):
+    """
+    user_id событий, записанных до появления поля. Событий немного:
+    доставленные хранятся OUTBOX_RETENTION.
+    """
+    OutboxEvent = apps.get_model("api", "OutboxEvent")
+    events = []
+    for event in OutboxEvent.objects.filter(
+        payload__has_key="user_id"
+    ).only("pk", "payload").iterator():
+        event.user_id = event.payload["user_id"]
+        events.append(event)
+    OutboxEvent.objects.bulk_update(events, ["user_id"], BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0004_outbox_gaps"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="outboxevent",
+            name="user_id",
+            field=models.IntegerField(
+                blank=True,
+                help_text="user_id из данных события: по нему события повторно отправляются устройствам пользователя.",
+                null=True,
+                verbose_name="Пользователь",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="outboxevent",
+            index=models.Index(
+                condition=models.Q(("user_id__isnull", False)),
+                fields=["user_id", "id"],
+                name="outbox_user_idx",
+            ),
+        ),
+        migrations.RunPython(fill_user_id, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+from rest_framework import permissions
+
+
+class SparseFieldsMixin:
+    """
+    Поддержка параметров ?fields= и ?omit= для безопасных запросов.
+    Лишние поля убираются из сериализатора, а по get_sparse_fields
+    представление может не загружать их из базы.
+    """
+    fields_param = 'fields'
+    omit_param = 'omit'
+
+    def get_query_fields(self, param):
+        value = self.request.query_params.get(param, '')
+        return {field.strip() for field in value.split(',') if field.strip()}
+
+    def get_sparse_fields(self, available):
+        """Возвращает поля из available, которые запросил клиент."""
+        fields = set(available)
+        requested = self.get_query_fields(self.fields_param)
+        if requested:
+            fields &= requested
+        return fields - self.get_query_fields(self.omit_param)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.request.method in permissions.SAFE_METHODS:
+            fields = getattr(serializer, 'child', serializer).fields
+            for name in set(fields) - self.get_sparse_fields(fields):
+                fields.pop(name)
+        return serializer
@@ -0,0 +1,165 @@
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+User = get_user_model()
+
+
+class IdempotencyKey(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+        verbose_name='Пользователь',
+    )
+    key = models.CharField(
+        'Ключ',
+        max_length=255,
+    )
+    request_hash = models.CharField(
+        'Хеш запроса',
+        max_length=64,
+    )
+    status_code = models.PositiveSmallIntegerField(
+        'Код ответа',
+        null=True,
+    )
+    response_data = models.JSONField(
+        'Тело ответа',
+        encoder=DjangoJSONEncoder,
+        null=True,
+    )
+    created = models.DateTimeField(
+        'Дата создания',
+        auto_now_add=True,
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = 'Ключ идемпотентности'
+        verbose_name_plural = 'Ключи идемпотентности'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'key'], name='unique_idempotency_key'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.key}'
+
+
+class OutboxEvent(models.Model):
+    event_type = models.CharField(
+        'Тип события',
+        max_length=64,
+    )
+    payload = models.JSONField(
+        'Данные события',
+        encoder=DjangoJSONEncoder,
+        default=dict,
+    )
+    user_id = models.IntegerField(
+        'Пользователь',
+        null=True,
+        blank=True,
+        help_text='user_id из данных события: по нему события '
+                  'повторно отправляются устройствам пользователя.',
+    )
+    created = models.DateTimeField(
+        'Дата создания',
+        auto_now_add=True,
+    )
+
+    class Meta:
+        verbose_name = 'Событие'
+        verbose_name_plural = 'События'
+        ordering = ('pk',)
+        indexes = [
+            models.Index(
+                fields=['user_id', 'id'], name='outbox_user_idx',
+                condition=models.Q(user_id__isnull=False),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.pk}: {self.event_type}'
+
+
+class OutboxCheckpoint(models.Model):
+    consumer = models.CharField(
+        'Обработчик',
+        max_length=64,
+        unique=True,
+    )
+    last_event_id = models.BigIntegerField(
+        'Последнее обработанное событие',
+        default=0,
+    )
+    gaps = models.JSONField(
+        'Пропущенные события',
+        default=dict,
+        help_text='id событий до позиции, которые еще не были видны, '
+                  'и время, когда пропуск замечен.',
+    )
+    updated = models.DateTimeField(
+        'Дата обновления',
+        auto_now=True,
+    )
+
+    class Meta:
+        verbose_name = 'Позиция обработчика'
+        verbose_name_plural = 'Позиции обработчиков'
+
+    def __str__(self):
+        return f'{self.consumer}: {self.last_event_id}'
+
+
+class Tombstone(models.Model):
+    """Запись об удалении для синхронизации клиентов."""
+    RECIPE = 'recipe'
+    FAVORITE = 'favorite'
+    SHOPPING_CART = 'shopping_cart'
+    FOLLOW = 'follow'
+    KINDS = (
+        (RECIPE, 'Рецепт'),
+        (FAVORITE, 'Избранное'),
+        (SHOPPING_CART, 'Список покупок'),
+        (FOLLOW, 'Подписка'),
+    )
+
+    kind = models.CharField(
+        'Что удалено',
+        max_length=16,
+        choices=KINDS,
+    )
+    object_id = models.PositiveIntegerField(
+        'Рецепт или автор',
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='tombstones',
+        verbose_name='Пользователь',
+        null=True,
+    )
+    deleted = models.DateTimeField(
+        'Дата удаления',
+        auto_now_add=True,
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = 'Удаление'
+        verbose_name_plural = 'Удаления'
+        ordering = ('deleted', 'pk')
+        indexes = [
+            models.Index(
+                fields=['user', 'deleted'], name='tombstone_user_deleted_idx'
+            ),
+            models.Index(
+                fields=['kind', 'deleted'], name='tombstone_kind_deleted_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
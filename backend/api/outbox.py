@@ -0,0 +1,156 @@
+import time
+from collections import defaultdict
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .live import notify
+from .models import OutboxCheckpoint, OutboxEvent
+
+RECIPE_CREATED = 'recipe.created'
+RECIPE_UPDATED = 'recipe.updated'
+RECIPE_DELETED = 'recipe.deleted'
+FOLLOW_ADDED = 'follow.added'
+FOLLOW_REMOVED = 'follow.removed'
+DEFAULT_CONSUMER = 'default'
+BATCH_SIZE = 100
+# Сколько секунд ждать событие с пропущенным id. id выдаются при
+# вставке, а видны события после коммита, поэтому событие с меньшим id
+# может появиться позже событий с большими. Пропуск, который не
+# заполнился за это время, - откаченная транзакция.
+OUTBOX_GAP_TIMEOUT = 10 * 60
+# Сколько пропущенных id запоминается. Пропуск больше этого - не
+# незакоммиченные транзакции, а удаленные события; ждать имеет смысл
+# только id перед следующим событием.
+OUTBOX_MAX_GAPS = 1000
+# Сколько доставленные всем обработчикам события хранятся для
+# повторной отправки устройствам (api.live.replay).
+OUTBOX_RETENTION = timedelta(days=1)
+
+_handlers = defaultdict(list)
+
+
+def relation_event(model, action):
+    """Тип события для избранного и списка покупок: favorite.added и т.п."""
+    return f'{model._meta.model_name}.{action}'
+
+
+def publish(event_type, **payload):
+    """
+    Записывает событие в outbox.
+    Вызывается внутри транзакции, в которой сделаны сами изменения.
+    После коммита событие уходит подключенным устройствам (api.live).
+    """
+    event = OutboxEvent.objects.create(
+        event_type=event_type, payload=payload,
+        user_id=payload.get('user_id'),
+    )
+    transaction.on_commit(partial(notify, event))
+    return event
+
+
+def handler(*event_types):
+    """Регистрирует обработчик событий указанных типов."""
+    def register(func):
+        for event_type in event_types:
+            _handlers[event_type].append(func)
+        return func
+    return register
+
+
+def get_handlers(event_type):
+    return [*_handlers.get(event_type, ()), *_handlers.get('*', ())]
+
+
+def deliver(event):
+    with transaction.atomic():
+        for func in get_handlers(event.event_type):
+            func(event)
+
+
+def consume(consumer=DEFAULT_CONSUMER, batch_size=BATCH_SIZE):
+    """
+    Доставляет одну порцию событий обработчикам по порядку id.
+    Позиция сохраняется до последнего успешно обработанного события,
+    поэтому при сбое события доставляются повторно, но не теряются.
+
+    id, пропущенные до позиции, запоминаются в gaps: транзакция,
+    которая получила id раньше, могла закоммититься позже. Такие
+    события доставляются, когда появятся, то есть не по порядку.
+    Новый потребитель начинает с самого старого события в outbox.
+    Возвращает число доставленных событий.
+    """
+    timeout = getattr(settings, 'OUTBOX_GAP_TIMEOUT', OUTBOX_GAP_TIMEOUT)
+    max_gaps = getattr(settings, 'OUTBOX_MAX_GAPS', OUTBOX_MAX_GAPS)
+    with transaction.atomic():
+        checkpoint, created = (
+            OutboxCheckpoint.objects.select_for_update().get_or_create(
+                consumer=consumer
+            )
+        )
+        if created:
+            oldest = OutboxEvent.objects.order_by('pk').values_list(
+                'pk', flat=True
+            ).first()
+            checkpoint.last_event_id = oldest - 1 if oldest else 0
+        gaps = {int(pk): seen for pk, seen in checkpoint.gaps.items()}
+        known_gaps = set(gaps)
+        position = checkpoint.last_event_id
+        events = list(OutboxEvent.objects.filter(
+            Q(pk__gt=position) | Q(pk__in=gaps)
+        ).order_by('pk')[:batch_size])
+        now = time.time()
+        delivered = 0
+        error = None
+        for event in events:
+            try:
+                deliver(event)
+            except Exception as exc:
+                error = exc
+                break
+            if event.pk in gaps:
+                del gaps[event.pk]
+            else:
+                gaps.update(dict.fromkeys(
+                    range(max(position + 1, event.pk - max_gaps), event.pk),
+                    now,
+                ))
+                position = event.pk
+            delivered += 1
+        gaps = {
+            pk: gaps[pk] for pk in sorted(gaps)[-max_gaps:]
+            if now - gaps[pk] < timeout
+        }
+        if created or delivered or gaps.keys() != known_gaps:
+            checkpoint.last_event_id = position
+            checkpoint.gaps = gaps
+            checkpoint.save(
+                update_fields=('last_event_id', 'gaps', 'updated')
+            )
+    if error is not None:
+        raise error
+    return delivered
+
+
+def purge(retention=None):
+    """
+    Удаляет события, которые получили все обработчики и которые
+    старше retention. Без обработчиков события не удаляются.
+    """
+    if retention is None:
+        retention = getattr(settings, 'OUTBOX_RETENTION', OUTBOX_RETENTION)
+    checkpoints = list(OutboxCheckpoint.objects.values_list(
+        'last_event_id', 'gaps'
+    ))
+    if not checkpoints:
+        return 0
+    pending = {int(pk) for _, gaps in checkpoints for pk in gaps}
+    deleted, _ = OutboxEvent.objects.filter(
+        pk__lte=min(position for position, _ in checkpoints),
+        created__lt=timezone.now() - retention,
+    ).exclude(pk__in=pending).delete()
+    return deleted
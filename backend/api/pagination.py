@@ -1,7 +1,138 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from rest_framework.pagination import PageNumberPagination
 
+COUNT_CACHE_TIMEOUT = 60
+COUNT_ESTIMATE_THRESHOLD = 10000
+
+
+def estimate_count(queryset):
+    """Оценка числа строк планировщиком PostgreSQL или None."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def get_count(queryset):
+    """
+    Число объектов выборки и признак того, что оно приблизительное.
+    Результат кэшируется на COUNT_CACHE_TIMEOUT по тексту запроса без
+    аннотаций, поэтому одинаковые фильтры в любом порядке параметров
+    и для любого пользователя дают одну запись. Сначала считается
+    не больше COUNT_ESTIMATE_THRESHOLD + 1 строк: для небольших
+    выборок этого хватает на точное число. Только для выборок больше
+    порога берется оценка планировщика, а без нее - полный COUNT(*).
+    Признак кэшируется вместе с числом: точное число из кэша остается
+    точным.
+    """
+    if queryset.query.is_empty():
+        return 0, False
+    rows = queryset.order_by().values('pk')
+    key = 'page-count:{}:{}'.format(
+        queryset.model._meta.label_lower,
+        hashlib.sha1(str(rows.query).encode()).hexdigest(),
+    )
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+    threshold = getattr(
+        settings, 'COUNT_ESTIMATE_THRESHOLD', COUNT_ESTIMATE_THRESHOLD
+    )
+    count = rows[:threshold + 1].count()
+    approximate = False
+    if count > threshold:
+        estimate = estimate_count(queryset)
+        approximate = estimate is not None
+        # Оценка может быть меньше уже насчитанного: число не меньше
+        # порога, иначе следующие страницы пропадут из ответа.
+        count = max(estimate, count) if approximate else queryset.count()
+    cache.set(key, (count, approximate), getattr(
+        settings, 'COUNT_CACHE_TIMEOUT', COUNT_CACHE_TIMEOUT
+    ))
+    return count, approximate
+
+
+class ApproximatePage(Page):
+    """Страница, которая знает о следующей без точного числа объектов."""
+
+    def __init__(self, object_list, number, paginator, has_next):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+
+    def has_next(self):
+        return self._has_next
+
+
+class ApproximateCountPaginator(Paginator):
+    """
+    Paginator с числом объектов из get_count. Номер страницы не
+    сверяется с числом страниц, а наличие следующей страницы
+    определяется по лишней строке выборки.
+    """
+    approximate = False
+
+    @cached_property
+    def count(self):
+        count, self.approximate = get_count(self.object_list)
+        return count
+
+    def validate_number(self, number):
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('Номер страницы должен быть целым числом.')
+        if number < 1:
+            raise EmptyPage('Номер страницы меньше 1.')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not objects and number > 1:
+            raise EmptyPage('На этой странице нет результатов.')
+        return ApproximatePage(
+            objects[:self.per_page], number, self,
+            has_next=len(objects) > self.per_page,
+        )
+
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
     max_page_size = 15
+
+
+class ApproximateCountPagination(CustomPageNumberPagination):
+    """
+    Пагинация с дешевым count: кэшированным точным или оценкой
+    планировщика. В ответе count_approximate говорит, что число
+    может быть неточным. Для параметров из exact_count_params,
+    например фильтров по избранному, count всегда точный.
+    """
+    exact_count_params = ('is_favorited', 'is_in_shopping_cart')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if any(
+            request.query_params.get(param)
+            for param in self.exact_count_params
+        ):
+            self.django_paginator_class = Paginator
+        else:
+            self.django_paginator_class = ApproximateCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_approximate'] = getattr(
+            self.page.paginator, 'approximate', False
+        )
+        return response
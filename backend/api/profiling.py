@@ -0,0 +1,183 @@
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+
+PROFILING_INTERVAL = 0.005
+PROFILING_MAX_PROFILES = 50
+PROFILING_MAX_QUERIES = 1000
+PROFILING_SAMPLE_RATE = 0
+PROFILE_NAME_LENGTH = 40
+
+
+def get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def get_root():
+    return Path(get_setting(
+        'PROFILING_ROOT', Path(settings.BASE_DIR) / 'profiles'
+    ))
+
+
+def frame_label(frame):
+    code = frame.f_code
+    module = frame.f_globals.get('__name__', code.co_filename)
+    return f'{module}.{code.co_name}:{code.co_firstlineno}'
+
+
+class Sampler:
+    """
+    Статистический профилировщик потока, в котором создан: отдельный
+    поток каждые interval секунд снимает стек и считает одинаковые
+    стеки. Результат - стеки в свернутом формате flamegraph.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        stack = []
+        while frame is not None:
+            stack.append(frame_label(frame))
+            frame = frame.f_back
+        if stack:
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+
+class QueryTrace:
+    """Записывает SQL и время запросов, не больше limit запросов."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.queries = []
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            if len(self.queries) < self.limit:
+                self.queries.append({
+                    'sql': sql,
+                    'time': round((time.perf_counter() - started) * 1000, 3),
+                    'many': many,
+                })
+
+
+class Profile:
+    """Профиль одного запроса: стеки сэмплера и трасса SQL."""
+
+    def __init__(self):
+        self.sampler = Sampler(
+            get_setting('PROFILING_INTERVAL', PROFILING_INTERVAL)
+        )
+        self.trace = QueryTrace(
+            get_setting('PROFILING_MAX_QUERIES', PROFILING_MAX_QUERIES)
+        )
+        self.duration = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.wrapper = connection.execute_wrapper(self.trace)
+        self.wrapper.__enter__()
+        self.sampler.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.sampler.__exit__(*exc_info)
+        self.wrapper.__exit__(*exc_info)
+        self.duration = time.perf_counter() - self.started
+
+    def as_dict(self, **meta):
+        return {
+            **meta,
+            'duration': round(self.duration * 1000, 3),
+            'interval': self.sampler.interval,
+            'samples': sum(self.sampler.stacks.values()),
+            'query_count': self.trace.count,
+            'query_time': round(
+                sum(query['time'] for query in self.trace.queries), 3
+            ),
+            'stacks': dict(self.sampler.stacks.most_common()),
+            'queries': self.trace.queries,
+        }
+
+
+def save_profile(data):
+    """
+    Сохраняет профиль в каталог PROFILING_ROOT и удаляет самые старые,
+    если их больше PROFILING_MAX_PROFILES. Имя файла начинается
+    со времени, поэтому порядок имен - порядок записи.
+    Возвращает идентификатор профиля.
+    """
+    root = get_root()
+    root.mkdir(parents=True, exist_ok=True)
+    profile_id = f'{time.time_ns():020d}-{uuid.uuid4().hex[:8]}'
+    temporary = root / f'.{profile_id}.tmp'
+    temporary.write_text(json.dumps(data, ensure_ascii=False))
+    os.replace(temporary, root / f'{profile_id}.json')
+    limit = get_setting('PROFILING_MAX_PROFILES', PROFILING_MAX_PROFILES)
+    for path in sorted(root.glob('*.json'))[:-limit]:
+        path.unlink(missing_ok=True)
+    return profile_id
+
+
+def get_profile_path(profile_id):
+    """Путь к профилю или None, если такого профиля нет."""
+    if len(profile_id) > PROFILE_NAME_LENGTH or not all(
+        char.isalnum() or char == '-' for char in profile_id
+    ):
+        return None
+    path = get_root() / f'{profile_id}.json'
+    return path if path.exists() else None
+
+
+def list_profiles():
+    """Сводки сохраненных профилей, новые первыми."""
+    root = get_root()
+    if not root.exists():
+        return []
+    profiles = []
+    for path in sorted(root.glob('*.json'), reverse=True):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        data.pop('stacks', None)
+        data.pop('queries', None)
+        profiles.append({'id': path.stem, **data})
+    return profiles
+
+
+def to_folded(data):
+    """Стеки профиля в формате flamegraph.pl и speedscope."""
+    return ''.join(
+        f'{stack} {count}\n' for stack, count in data['stacks'].items()
+    )
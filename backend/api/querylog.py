@@ -0,0 +1,187 @@
+import atexit
+import fcntl
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from rest_framework.serializers import Field
+
+QUERY_LOG_FLUSH_INTERVAL = 60
+# Сколько разных view и методов сериализаторов хранится для запроса.
+MAX_ORIGINS = 10
+
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'(?<![\w."])-?\d+(?:\.\d+)?(?![\w"])')
+PLACEHOLDER = re.compile(r'%s|\$\d+')
+VALUES_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+VALUES_ROWS = re.compile(r'(\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+')
+SPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(sql):
+    """
+    Нормализованный текст запроса: литералы и параметры заменены на ?,
+    списки IN (...) и строки VALUES свернуты, пробелы схлопнуты.
+    Запросы, которые отличаются только значениями, дают один отпечаток.
+    """
+    sql = STRING.sub('?', sql)
+    sql = PLACEHOLDER.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    sql = VALUES_LIST.sub('(...)', sql)
+    sql = VALUES_ROWS.sub(r'\1', sql)
+    return SPACE.sub(' ', sql).strip()
+
+
+def get_source():
+    """
+    Метод сериализатора, из которого выполняется запрос: ближайший
+    по стеку метод объекта-поля DRF вне кода самого DRF.
+    """
+    frame = sys._getframe(2)
+    while frame is not None:
+        owner = frame.f_locals.get('self')
+        if isinstance(owner, Field) and not frame.f_globals.get(
+            '__name__', ''
+        ).startswith('rest_framework'):
+            return f'{type(owner).__name__}.{frame.f_code.co_name}'
+        frame = frame.f_back
+    return None
+
+
+def get_view(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name or match._func_path
+
+
+class QueryStats:
+    """
+    Накопленные в процессе счетчики по отпечаткам. Изменяются под
+    блокировкой, поэтому один объект обслуживает все потоки воркера.
+    Раз в QUERY_LOG_FLUSH_INTERVAL секунд и при выходе счетчики
+    добавляются в файл QUERY_LOG_FILE и обнуляются.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.flushed = time.monotonic()
+
+    def add(self, sql, duration, view, source):
+        key = fingerprint(sql)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = new_entry()
+            entry['count'] += 1
+            entry['total'] += duration
+            entry['max'] = max(entry['max'], duration)
+            for name, origin in (('views', view), ('sources', source)):
+                if origin is not None and (
+                    origin in entry[name] or len(entry[name]) < MAX_ORIGINS
+                ):
+                    entry[name][origin] += 1
+            due = time.monotonic() - self.flushed >= getattr(
+                settings, 'QUERY_LOG_FLUSH_INTERVAL',
+                QUERY_LOG_FLUSH_INTERVAL
+            )
+            if due:
+                entries, self.entries = self.entries, {}
+                self.flushed = time.monotonic()
+        if due:
+            write_entries(entries)
+
+    def flush(self):
+        with self.lock:
+            entries, self.entries = self.entries, {}
+            self.flushed = time.monotonic()
+        write_entries(entries)
+
+
+def new_entry():
+    return {
+        'count': 0, 'total': 0.0, 'max': 0.0,
+        'views': Counter(), 'sources': Counter(),
+    }
+
+
+def get_log_file():
+    return Path(settings.QUERY_LOG_FILE)
+
+
+def read_entries(path=None):
+    """Счетчики из файла: отпечаток -> count, total, max, views, sources."""
+    path = path or get_log_file()
+    try:
+        data = json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+    for entry in data.values():
+        entry['views'] = Counter(entry['views'])
+        entry['sources'] = Counter(entry['sources'])
+    return data
+
+
+def merge(target, entries):
+    for key, entry in entries.items():
+        current = target.setdefault(key, new_entry())
+        current['count'] += entry['count']
+        current['total'] += entry['total']
+        current['max'] = max(current['max'], entry['max'])
+        for name in ('views', 'sources'):
+            current[name].update(entry[name])
+            current[name] = Counter(
+                dict(current[name].most_common(MAX_ORIGINS))
+            )
+    return target
+
+
+@contextmanager
+def locked_log():
+    """
+    Блокировка flock файла журнала. Воркеры и slow_queries --reset
+    меняют один файл, поэтому чтение с последующей записью или
+    удалением идет только под ней.
+    """
+    path = get_log_file()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(f'{path}.lock', 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        yield path
+
+
+def write_entries(entries):
+    """Добавляет счетчики в файл."""
+    if not entries:
+        return
+    with locked_log() as path:
+        data = merge(read_entries(path), entries)
+        temporary = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+        temporary.write_text(json.dumps(data, ensure_ascii=False))
+        os.replace(temporary, path)
+
+
+stats = QueryStats()
+atexit.register(stats.flush)
+
+
+def record(request, execute, sql, params, many, context):
+    """execute_wrapper, который учитывает запрос в stats."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add(
+            sql, (time.perf_counter() - started) * 1000,
+            get_view(request), get_source(),
+        )
@@ -0,0 +1,35 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+LINE_SEPARATORS = (
+    ('\u2028'.encode(), b'\\u2028'),
+    ('\u2029'.encode(), b'\\u2029'),
+)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Рендерер JSON на orjson с тем же результатом, что у JSONRenderer.
+    Даты и время отдаются кодировщику DRF: orjson форматирует их
+    иначе. Decimal orjson не поддерживает и тоже отдает кодировщику,
+    UUID он пишет так же, как DRF. Ответ с отступами нужен для
+    отладки и рендерится штатно: у DRF другие разделители.
+    Единственное отличие - экспонента float: 1e-07 у json, 1e-7 у orjson.
+    """
+    default = JSONEncoder().default
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if self.get_indent(accepted_media_type, renderer_context):
+            return super().render(
+                data, accepted_media_type, renderer_context
+            )
+        ret = orjson.dumps(data, default=self.default, option=self.option)
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in ret:
+                ret = ret.replace(separator, escaped)
+        return ret
@@ -0,0 +1,126 @@
+from operator import attrgetter
+
+from django.db.models import Manager
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+
+# Ключ контекста, с которым сериализаторы работают штатным путем DRF.
+# Нужен для сравнения результатов в check_serializers.
+REFERENCE = 'reference_representation'
+
+
+def identity_field(field):
+    """
+    Поля, у которых to_representation не меняет значение из модели:
+    str() для строки и int() для целого числа ничего не делают.
+    """
+    return type(field).to_representation in (
+        serializers.CharField.to_representation,
+        serializers.IntegerField.to_representation,
+        serializers.ReadOnlyField.to_representation,
+    )
+
+
+def related_items(value):
+    return value.all() if isinstance(value, Manager) else value
+
+
+def compile_field(field):
+    """
+    Функция объект -> значение поля, повторяющая Serializer.
+    to_representation для поля field, или None, если поле
+    не поддерживается и сериализатор должен работать штатно.
+    """
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(field.parent, field.method_name)
+    if field.source == '*':
+        return None
+    get = attrgetter(field.source)
+    if isinstance(field, CompiledRepresentationMixin):
+        represent = field.to_representation
+        return lambda obj: (
+            None if (value := get(obj)) is None else represent(value)
+        )
+    if isinstance(field, serializers.ListSerializer):
+        if not isinstance(field.child, CompiledRepresentationMixin):
+            return None
+        represent = field.child.to_representation
+        return lambda obj: [
+            represent(item) for item in related_items(get(obj))
+        ]
+    if isinstance(field, ManyRelatedField):
+        if not (
+            type(field.child_relation) is PrimaryKeyRelatedField
+            and field.child_relation.pk_field is None
+        ):
+            return None
+        return lambda obj: [
+            item.pk for item in related_items(get(obj))
+        ] if obj.pk is not None else []
+    if type(field) is PrimaryKeyRelatedField and field.pk_field is None:
+        if len(field.source_attrs) != 1:
+            return None
+        name = field.source
+        return lambda obj: obj.serializable_value(name)
+    if (
+        isinstance(field, serializers.FileField)
+        and type(field).to_representation
+        is serializers.FileField.to_representation
+    ):
+        return compile_file_field(field)
+    if identity_field(field):
+        return get
+    return None
+
+
+def compile_file_field(field):
+    if not getattr(
+        field, 'use_url', serializers.api_settings.UPLOADED_FILES_USE_URL
+    ):
+        return None
+    get = attrgetter(field.source)
+    request = field.context.get('request')
+
+    def represent(obj):
+        value = get(obj)
+        if not value:
+            return None
+        url = value.url
+        if request is None:
+            return url
+        return request.build_absolute_uri(url)
+
+    return represent
+
+
+class CompiledRepresentationMixin:
+    """
+    Быстрое чтение для сериализаторов моделей. При первом вызове
+    to_representation для каждого оставшегося поля собирается функция,
+    которая берет значение из уже загруженного объекта, без
+    get_attribute и to_representation полей DRF на каждый объект.
+    Вложенные сериализаторы с этим mixin вызываются напрямую.
+    Если поле не поддерживается, сериализатор работает штатно.
+    Результат совпадает с результатом DRF байт в байт после рендеринга.
+    """
+
+    def get_representers(self):
+        representers = []
+        for field in self._readable_fields:
+            represent = compile_field(field)
+            if represent is None:
+                return None
+            representers.append((field.field_name, represent))
+        return representers
+
+    def to_representation(self, instance):
+        try:
+            representers = self._representers
+        except AttributeError:
+            representers = self._representers = (
+                None if self.context.get(REFERENCE)
+                else self.get_representers()
+            )
+        if representers is None:
+            return super().to_representation(instance)
+        return {name: represent(instance) for name, represent in representers}
@@ -1,8 +1,9 @@
 import base64
 
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from rest_framework import serializers, status
 from rest_framework.exceptions import ValidationError
@@ -13,7 +14,8 @@ from recipes.models import (
     RecipeIngredient,
     Tag
 )
-from users.models import Follow
+from .outbox import RECIPE_CREATED, RECIPE_UPDATED, publish
+from .representation import CompiledRepresentationMixin
 
 
 User = get_user_model()
@@ -47,7 +49,7 @@ class CustomMeSerializer(serializers.ModelSerializer):
         )
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(CompiledRepresentationMixin, UserSerializer):
     """Сериализатор для представления пользователя."""
     is_subscribed = serializers.SerializerMethodField()
 
@@ -67,6 +69,8 @@ class CustomUserSerializer(UserSerializer):
         Проверяет, подписан ли текущий пользователь
         на указанного пользователя.
         """
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.follower.filter(author=request.user).exists()
@@ -107,7 +111,7 @@ class CustomUserCreateSerializer(UserCreateSerializer):
         return super().validate(attrs)
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(CompiledRepresentationMixin, serializers.ModelSerializer):
     """Сериализатор для тегов."""
     class Meta:
         model = Tag
@@ -119,7 +123,9 @@ class TagSerializer(serializers.ModelSerializer):
         )
 
 
-class IngredientsRecipeSerializer(serializers.ModelSerializer):
+class IngredientsRecipeSerializer(
+    CompiledRepresentationMixin, serializers.ModelSerializer
+):
     """Сериализатор для ингредиентов рецепта."""
     name = serializers.ReadOnlyField(source='ingredient.name')
     measurement_unit = serializers.ReadOnlyField(
@@ -170,41 +176,17 @@ class SubscriptionSerializer(CustomUserSerializer):
 
     @staticmethod
     def get_recipes_count(obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return obj.recipes.count()
 
 
-class CreateSubscribeSerializer(serializers.ModelSerializer):
-    """Сериализатор для создания подписки."""
-    class Meta:
-        model = Follow
-        fields = (
-            'user',
-            'author'
-        )
-
-    def validate(self, data):
-        if self.context['request'].method == 'POST':
-            if self.context['request'].user == data['author']:
-                raise ValidationError(
-                    detail='Нельзя подписаться на себя.',
-                    code=status.HTTP_400_BAD_REQUEST
-                )
-            if self.context['request'].user.follower.filter(
-                author=data['author']
-            ).exists():
-                raise ValidationError(
-                    detail='Вы уже подписаны',
-                    code=status.HTTP_400_BAD_REQUEST
-                )
-        return data
-
-
 class RecipeCreateIngredientSerializer(serializers.ModelSerializer):
-    """Сериализатор для создания ингредиентов рецепта."""
-    id = serializers.PrimaryKeyRelatedField(
-        source='ingredient',
-        queryset=Ingredient.objects.all(),
-    )
+    """
+    Сериализатор для создания ингредиентов рецепта. Ингредиенты
+    рецепта проверяются одним запросом в RecipeSerializer.
+    """
+    id = serializers.IntegerField(source='ingredient_id')
     amount = serializers.IntegerField(
         min_value=MIN_NUMBERS,
         max_value=MAX_NUMBERS
@@ -225,10 +207,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     author = CustomUserSerializer(required=False)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
 
     class Meta:
         model = Recipe
@@ -259,39 +238,42 @@ class RecipeSerializer(serializers.ModelSerializer):
         return False
 
     @staticmethod
-    def validate_ingredients(values):
+    def get_existing(model, ids):
+        """Объекты model по ids одним запросом; ошибка, если их нет."""
+        objects = model.objects.in_bulk(ids)
+        missing = [pk for pk in ids if pk not in objects]
+        if missing:
+            raise serializers.ValidationError(
+                f'Недопустимые id: {", ".join(map(str, missing))}.'
+            )
+        return objects
+
+    def validate_ingredients(self, values):
         if not values:
             raise serializers.ValidationError(
                 'Необходимо указать хотя бы один ингредиент.',
             )
-        ingredients_set = set()
-        for value in values:
-            ingredient = (get_object_or_404
-                          (Ingredient, id=value['ingredient'].id)
-                          )
-            if ingredient in ingredients_set:
-                raise serializers.ValidationError(
-                    'Ингредиенты должны быть уникальными.'
-                )
-            ingredients_set.add(ingredient)
+        ids = [value['ingredient_id'] for value in values]
+        if len(set(ids)) != len(ids):
+            raise serializers.ValidationError(
+                'Ингредиенты должны быть уникальными.'
+            )
+        self.get_existing(Ingredient, ids)
         return values
 
-    @staticmethod
-    def validate_tags(values):
+    def validate_tags(self, values):
         if not values:
             raise (
                 serializers.ValidationError
                 ('Необходимо выбрать хотя бы один тег.')
             )
-        tags_set = set()
-        for tag in values:
-            if tag in tags_set:
-                raise (
-                    serializers.ValidationError
-                    ('Теги должны быть уникальными.')
-                )
-            tags_set.add(tag)
-        return values
+        if len(set(values)) != len(values):
+            raise (
+                serializers.ValidationError
+                ('Теги должны быть уникальными.')
+            )
+        tags = self.get_existing(Tag, values)
+        return [tags[pk] for pk in values]
 
     @staticmethod
     def ingredients_and_tags(validated_data):
@@ -304,25 +286,32 @@ class RecipeSerializer(serializers.ModelSerializer):
         RecipeIngredient.objects.bulk_create([
             RecipeIngredient(
                 recipe=obj,
-                ingredient_id=ingredient['ingredient'].id,
+                ingredient_id=ingredient['ingredient_id'],
                 amount=ingredient['amount'],
             )
             for ingredient in ingredients
         ])
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients, tags = self.ingredients_and_tags(validated_data)
         obj = Recipe.objects.create(**validated_data)
         obj.tags.set(tags)
         self.ingredients_create(ingredients, obj)
+        publish(RECIPE_CREATED, recipe_id=obj.pk, author_id=obj.author_id)
         return obj
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients, tags = self.ingredients_and_tags(validated_data)
         instance.tags.set(tags)
         instance.ingredients.clear()
         self.ingredients_create(ingredients, instance)
-        return super().update(instance, validated_data)
+        instance = super().update(instance, validated_data)
+        publish(
+            RECIPE_UPDATED, recipe_id=instance.pk, author_id=instance.author_id
+        )
+        return instance
 
     def validate(self, data):
         if 'ingredients' not in data:
@@ -338,12 +327,18 @@ class RecipeSerializer(serializers.ModelSerializer):
         return data
 
     def to_representation(self, instance):
+        prefetch_related_objects([instance], 'tags', Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        ))
         return RecipeListSerializer(
             instance, context={'request': self.context.get('request')}
         ).data
 
 
-class RecipeListSerializer(serializers.ModelSerializer):
+class RecipeListSerializer(
+    CompiledRepresentationMixin, serializers.ModelSerializer
+):
     tags = TagSerializer(many=True, read_only=True)
     author = CustomUserSerializer(
         read_only=True,
@@ -370,23 +365,39 @@ class RecipeListSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_width',
+            'image_height',
+            'image_placeholder',
             'text',
             'cooking_time'
         )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return request.user.favorite.filter(recipe=obj).exists()
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return request.user.shopping_cart.filter(recipe=obj).exists()
         return False
 
 
+class CompoundRecipeListSerializer(RecipeListSerializer):
+    """
+    Сериализатор рецепта для составного ответа:
+    автор и теги передаются идентификаторами.
+    """
+    tags = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    author = serializers.PrimaryKeyRelatedField(read_only=True)
+
+
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
@@ -397,12 +408,17 @@ class IngredientSerializer(serializers.ModelSerializer):
         )
 
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
+class ShortRecipeSerializer(
+    CompiledRepresentationMixin, serializers.ModelSerializer
+):
     class Meta:
         model = Recipe
         fields = (
             'id',
             'name',
             'image',
+            'image_width',
+            'image_height',
+            'image_placeholder',
             'cooking_time'
         )
@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from recipes.models import Ingredient, Recipe, Tag
+from .cache import (ALL_RECIPES, CATALOG, COOKING_TIME, author_tag,
+                    invalidate_on_commit, recipe_tag, slug_tag, user_tag)
+from .sync import add_tombstone
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_saved_recipe(sender, instance, created, **kwargs):
+    tags = [recipe_tag(instance.pk), COOKING_TIME]
+    if created:
+        tags += [ALL_RECIPES, author_tag(instance.author_id)]
+    invalidate_on_commit(*tags)
+
+
+@receiver(pre_delete, sender=Recipe)
+def invalidate_deleted_recipe(sender, instance, **kwargs):
+    invalidate_on_commit(
+        ALL_RECIPES,
+        recipe_tag(instance.pk),
+        author_tag(instance.author_id),
+        *(slug_tag(slug) for slug in instance.tags.values_list(
+            'slug', flat=True
+        )),
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def bury_deleted_recipe(sender, instance, **kwargs):
+    add_tombstone(Recipe, instance.pk)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(
+    sender, instance, action, reverse, pk_set, **kwargs
+):
+    if reverse:
+        if action == 'pre_clear':
+            invalidate_on_commit(CATALOG, slug_tag(instance.slug))
+        elif action in ('post_add', 'post_remove'):
+            invalidate_on_commit(
+                slug_tag(instance.slug), *(recipe_tag(pk) for pk in pk_set)
+            )
+        return
+    if action == 'pre_clear':
+        slugs = instance.tags.values_list('slug', flat=True)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        slugs = Tag.objects.filter(pk__in=pk_set).values_list(
+            'slug', flat=True
+        )
+    else:
+        return
+    invalidate_on_commit(
+        recipe_tag(instance.pk), *(slug_tag(slug) for slug in slugs)
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_user(sender, instance, **kwargs):
+    invalidate_on_commit(user_tag(instance.pk))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_catalog(sender, **kwargs):
+    invalidate_on_commit(CATALOG)
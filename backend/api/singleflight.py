@@ -0,0 +1,132 @@
+import math
+import os
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache as default_cache
+from django.core.cache.backends.filebased import FileBasedCache
+
+from .cache import (LOCK_TIMEOUT, LOCK_WAIT, POLL_INTERVAL,
+                    RESPONSE_CACHE_TIMEOUT, version_key)
+
+# Чем больше, тем раньше до истечения записи начинается ее пересчет.
+EARLY_REFRESH_BETA = 1.0
+
+
+class SingleFlight:
+    """
+    Кэш дорогих вычислений, в котором одно значение одновременно
+    считает один процесс. Запись хранит теги, как ответы в api.cache,
+    и устаревает при их инвалидации или по таймауту.
+
+    Незадолго до таймаута запись с вероятностью, растущей к концу
+    срока и со временем расчета, пересчитывается заранее (XFetch):
+    пересчет начинает один запрос, остальные получают текущую запись.
+    Если записи нет или она инвалидирована, остальные ждут результат
+    до LOCK_WAIT секунд, а потом считают сами.
+    """
+
+    def __init__(self, backend=None, beta=EARLY_REFRESH_BETA):
+        self.cache = backend or default_cache
+        self.beta = beta
+
+    def get_versions(self, tags):
+        keys = {version_key(tag): tag for tag in tags}
+        versions = self.cache.get_many(keys)
+        return {tag: versions.get(key, 0) for key, tag in keys.items()}
+
+    def is_fresh(self, entry):
+        return entry is not None and self.get_versions(
+            entry['versions']
+        ) == entry['versions']
+
+    def is_expiring(self, entry):
+        return time.time() - entry['delta'] * self.beta * math.log(
+            1 - random.random()
+        ) >= entry['expires']
+
+    def get_lock_file(self, lock):
+        path = self.cache._key_to_file(lock) + '.lock'
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def acquire(self, lock):
+        """
+        Берет блокировку. cache.add атомарен в памяти процесса и в Redis,
+        но не в файловом кэше: там блокировка - файл, созданный с O_EXCL.
+        """
+        if not isinstance(self.cache, FileBasedCache):
+            return self.cache.add(lock, 1, LOCK_TIMEOUT)
+        path = self.get_lock_file(lock)
+        try:
+            if time.time() - os.path.getmtime(path) > LOCK_TIMEOUT:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return False
+        return True
+
+    def release(self, lock):
+        if not isinstance(self.cache, FileBasedCache):
+            self.cache.delete(lock)
+            return
+        try:
+            os.remove(self.get_lock_file(lock))
+        except FileNotFoundError:
+            pass
+
+    def wait(self, key):
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(POLL_INTERVAL)
+            entry = self.cache.get(key)
+            if self.is_fresh(entry):
+                return entry
+        return None
+
+    def compute(self, key, compute, timeout):
+        started = time.time()
+        value, tags = compute()
+        versions = self.get_versions(tags)
+        if all(version < started for version in versions.values()):
+            self.cache.set(key, {
+                'value': value,
+                'versions': versions,
+                'delta': time.time() - started,
+                'expires': time.time() + timeout,
+            }, timeout)
+        return value
+
+    def get(self, key, compute, timeout=None):
+        """
+        Значение по ключу key. compute() возвращает пару (значение,
+        теги) и вызывается, только если значения нет в кэше или его
+        пора пересчитать.
+        """
+        if timeout is None:
+            timeout = getattr(
+                settings, 'RESPONSE_CACHE_TIMEOUT', RESPONSE_CACHE_TIMEOUT
+            )
+        entry = self.cache.get(key)
+        fresh = self.is_fresh(entry)
+        if fresh and not self.is_expiring(entry):
+            return entry['value']
+        lock = f'{key}:lock'
+        if not self.acquire(lock):
+            if fresh:
+                return entry['value']
+            entry = self.wait(key)
+            if entry is not None:
+                return entry['value']
+            return compute()[0]
+        try:
+            return self.compute(key, compute, timeout)
+        finally:
+            self.release(lock)
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,194 @@
+import base64
+import heapq
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import FilteredRelation, Q
+from django.utils import timezone
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Follow
+from .models import Tombstone
+
+SYNC_PAGE_SIZE = 200
+SYNC_TOMBSTONE_TTL = 30 * 24 * 60 * 60
+# Изменения моложе этого срока не отдаются: транзакция с более ранней
+# отметкой времени могла еще не закоммититься.
+SYNC_COMMIT_GRACE = 2
+
+
+TOMBSTONE_KINDS = {
+    Recipe: Tombstone.RECIPE,
+    Favorite: Tombstone.FAVORITE,
+    ShoppingCart: Tombstone.SHOPPING_CART,
+    Follow: Tombstone.FOLLOW,
+}
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class ExpiredToken(Exception):
+    pass
+
+
+def get_sections(user):
+    """
+    Потоки изменений пользователя: имя -> (queryset, поле времени,
+    поле со значением изменения). Потоки связей и deleted_* читаются
+    диапазоном по индексу с полем времени; recipes - рецепты из
+    избранного, покупок и подписок пользователя, измененные после
+    токена. Потоки deleted_* - записи об удалениях, удаленные рецепты
+    общие для всех пользователей. Рецепты автора, на которого
+    пользователь подписался после токена, приходят потоком
+    followed_recipes со временем подписки, даже если сами не менялись:
+    подписки читаются по индексу (user, created), их рецепты - по
+    индексу автора.
+    """
+    followed = Follow.objects.filter(user=user).values('author_id')
+    tombstones = Tombstone.objects.filter(user=user)
+    return {
+        'recipes': (
+            Recipe.objects.filter(
+                Q(pk__in=Favorite.objects.filter(user=user).values(
+                    'recipe_id'
+                ))
+                | Q(pk__in=ShoppingCart.objects.filter(user=user).values(
+                    'recipe_id'
+                ))
+                | Q(author_id__in=followed)
+            ),
+            'updated_at', 'id',
+        ),
+        'favorites': (
+            Favorite.objects.filter(user=user), 'date_added', 'recipe_id',
+        ),
+        'shopping_cart': (
+            ShoppingCart.objects.filter(user=user), 'date_added', 'recipe_id',
+        ),
+        'subscriptions': (
+            Follow.objects.filter(user=user), 'created', 'author_id',
+        ),
+        'deleted_recipes': (
+            Tombstone.objects.filter(kind=Tombstone.RECIPE, user=None),
+            'deleted', 'object_id',
+        ),
+        'deleted_favorites': (
+            tombstones.filter(kind=Tombstone.FAVORITE),
+            'deleted', 'object_id',
+        ),
+        'deleted_shopping_cart': (
+            tombstones.filter(kind=Tombstone.SHOPPING_CART),
+            'deleted', 'object_id',
+        ),
+        'deleted_subscriptions': (
+            tombstones.filter(kind=Tombstone.FOLLOW),
+            'deleted', 'object_id',
+        ),
+        # Последним, чтобы номера остальных потоков в старых токенах
+        # не сдвинулись.
+        'followed_recipes': (
+            Recipe.objects.annotate(follow=FilteredRelation(
+                'author__following',
+                condition=Q(author__following__user=user),
+            )),
+            'follow__created', 'id',
+        ),
+    }
+
+
+def encode_token(moment, section, pk):
+    payload = json.dumps([moment.isoformat(), section, pk])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_token(token):
+    """Разбирает токен в позицию (время, номер потока, pk)."""
+    try:
+        moment, section, pk = json.loads(
+            base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        )
+        moment = datetime.fromisoformat(moment)
+    except (TypeError, ValueError):
+        raise InvalidToken
+    if not isinstance(section, int) or not isinstance(pk, int):
+        raise InvalidToken
+    if timezone.is_naive(moment):
+        raise InvalidToken
+    ttl = getattr(settings, 'SYNC_TOMBSTONE_TTL', SYNC_TOMBSTONE_TTL)
+    if moment < timezone.now() - timedelta(seconds=ttl):
+        raise ExpiredToken
+    return moment, section, pk
+
+
+def after(position, index, field):
+    """Условие "строго после позиции" для потока с номером index."""
+    moment, section, pk = position
+    if index < section:
+        return Q(**{f'{field}__gt': moment})
+    if index > section:
+        return Q(**{f'{field}__gte': moment})
+    return Q(**{f'{field}__gt': moment}) | Q(
+        **{field: moment, 'pk__gt': pk}
+    )
+
+
+def get_changes(user, token=None, limit=SYNC_PAGE_SIZE):
+    """
+    Изменения пользователя после позиции из token, не больше limit.
+    Потоки сливаются по времени изменения, поэтому позиция - одна
+    тройка (время, номер потока, pk), а следующий токен продолжает
+    ровно с места, где закончилась страница.
+    Возвращает (значения по потокам, следующий токен, есть ли еще).
+    """
+    position = decode_token(token) if token else None
+    grace = getattr(settings, 'SYNC_COMMIT_GRACE', SYNC_COMMIT_GRACE)
+    horizon = timezone.now() - timedelta(seconds=grace)
+    sections = get_sections(user)
+    streams = []
+    for index, (queryset, field, value) in enumerate(sections.values()):
+        # Одним filter: условия на связь "многие" из разных filter
+        # дали бы отдельные JOIN.
+        condition = Q(**{f'{field}__lte': horizon})
+        if position is not None:
+            condition &= after(position, index, field)
+        queryset = queryset.filter(condition)
+        streams.append([
+            (moment, index, pk, value)
+            for moment, pk, value in queryset.order_by(
+                field, 'pk'
+            ).values_list(field, 'pk', value)[:limit + 1]
+        ])
+    rows = list(heapq.merge(*streams))
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    names = list(sections)
+    changes = {name: [] for name in names}
+    for _, index, _, value in rows:
+        changes[names[index]].append(value)
+    if has_more:
+        next_token = encode_token(*rows[-1][:3])
+    else:
+        next_token = encode_token(horizon, len(names), 0)
+    return changes, next_token, has_more
+
+
+def add_tombstone(model, object_id, user=None):
+    """
+    Записывает удаление рецепта (user=None) или связи пользователя
+    с рецептом или автором object_id.
+    """
+    return Tombstone.objects.create(
+        kind=TOMBSTONE_KINDS[model], object_id=object_id, user=user
+    )
+
+
+def purge_tombstones():
+    """Удаляет записи об удалениях старше SYNC_TOMBSTONE_TTL."""
+    ttl = getattr(settings, 'SYNC_TOMBSTONE_TTL', SYNC_TOMBSTONE_TTL)
+    deleted, _ = Tombstone.objects.filter(
+        deleted__lt=timezone.now() - timedelta(seconds=ttl)
+    ).delete()
+    return deleted
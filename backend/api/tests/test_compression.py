@@ -0,0 +1,87 @@
+import gzip
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from api.middleware import (COMPRESSORS, PREFERENCE, CompressionMiddleware,
+                            negotiate_encoding)
+
+LINES = [f'{index}. Мука 500 г.\n'.encode() for index in range(1, 2001)]
+
+
+class NegotiateEncodingTest(SimpleTestCase):
+    def test_weights(self):
+        best = next(coding for coding in PREFERENCE if coding in COMPRESSORS)
+        for header, coding in (
+            ('', None),
+            ('gzip', 'gzip'),
+            ('GZIP', 'gzip'),
+            ('gzip;q=0', None),
+            ('gzip;q=0.000', None),
+            ('gzip;q=0.2, br;q=0.8', 'br'),
+            ('br;q=0.2, gzip;q=0.8', 'gzip'),
+            ('*', best),
+            ('*;q=0', None),
+            ('*;q=0.5, gzip;q=1', 'gzip'),
+            ('*, gzip;q=0', best),
+            ('identity;q=0', None),
+            ('gzip;q=0.5, identity;q=0', 'gzip'),
+            ('deflate', None),
+            ('gzip;q=abc', None),
+        ):
+            with self.subTest(header=header):
+                self.assertEqual(negotiate_encoding(header), coding)
+
+
+@override_settings(COMPRESSION_MIN_SIZE=1024, COMPRESSION_BLOCK_SIZE=4096)
+class CompressionMiddlewareTest(SimpleTestCase):
+    def process(self, response, accept_encoding='gzip'):
+        request = RequestFactory().get(
+            '/', HTTP_ACCEPT_ENCODING=accept_encoding
+        )
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_small_response_is_not_compressed(self):
+        response = self.process(HttpResponse(b'x' * 1023))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_response_is_compressed(self):
+        content = b''.join(LINES)
+        original = HttpResponse(content)
+        original['ETag'] = '"abc"'
+        response = self.process(original)
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertEqual(
+            response['Content-Length'], str(len(response.content))
+        )
+        self.assertEqual(gzip.decompress(response.content), content)
+
+    def test_weak_etag_is_kept(self):
+        original = HttpResponse(b''.join(LINES))
+        original['ETag'] = 'W/"abc"'
+        self.assertEqual(self.process(original)['ETag'], 'W/"abc"')
+
+    def test_without_accept_encoding(self):
+        response = self.process(HttpResponse(b''.join(LINES)), '')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_encoded_response_is_left_alone(self):
+        original = HttpResponse(b'x' * 2048)
+        original['Content-Encoding'] = 'br'
+        response = self.process(original)
+        self.assertEqual(response.content, b'x' * 2048)
+        self.assertFalse(response.has_header('Vary'))
+
+    def test_stream_is_compressed_in_blocks(self):
+        response = self.process(StreamingHttpResponse(iter(LINES)))
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertFalse(response.has_header('Content-Length'))
+        chunks = list(response.streaming_content)
+        content = b''.join(LINES)
+        self.assertEqual(gzip.decompress(b''.join(chunks)), content)
+        self.assertLess(len(chunks), len(content) // 4096 + 3)
+        self.assertLess(len(b''.join(chunks)), len(content) / 4)
@@ -0,0 +1,108 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe, RecipeActivity, ShoppingCart
+from users.models import Follow
+
+User = get_user_model()
+
+THREADS = 8
+
+
+class ConcurrentToggleTest(TransactionTestCase):
+    """
+    Один и тот же запрос из нескольких потоков одновременно: ровно
+    один меняет данные, остальные получают 400, счетчики не двоятся.
+    """
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Потокам нужна общая база, не SQLite в памяти.')
+        self.user = User.objects.create(
+            username='reader', email='reader@example.com'
+        )
+        self.author = User.objects.create(
+            username='author', email='author@example.com'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Рецепт', text='Описание',
+            cooking_time=10, image='foodgram_backend/images/test.png',
+        )
+
+    def send_concurrently(self, method, url):
+        barrier = threading.Barrier(THREADS)
+        statuses = []
+
+        def worker():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                statuses.append(getattr(client, method)(url).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(statuses)
+
+    def assertOneSucceeded(self, statuses, code):
+        self.assertEqual(
+            statuses,
+            sorted([code] + [status.HTTP_400_BAD_REQUEST] * (THREADS - 1)),
+        )
+
+    def get_activity(self, field):
+        return sum(RecipeActivity.objects.filter(
+            recipe=self.recipe
+        ).values_list(field, flat=True))
+
+    def test_favorite(self):
+        url = reverse('api:recipe-favorite', args=[self.recipe.pk])
+        self.assertOneSucceeded(
+            self.send_concurrently('post', url), status.HTTP_201_CREATED
+        )
+        self.assertEqual(Favorite.objects.count(), 1)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorite_count, 1)
+        self.assertEqual(self.get_activity('favorites'), 1)
+        self.assertOneSucceeded(
+            self.send_concurrently('delete', url), status.HTTP_204_NO_CONTENT
+        )
+        self.assertEqual(Favorite.objects.count(), 0)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorite_count, 0)
+        self.assertEqual(self.get_activity('favorites'), 0)
+
+    def test_shopping_cart(self):
+        url = reverse('api:recipe-shopping-cart', args=[self.recipe.pk])
+        self.assertOneSucceeded(
+            self.send_concurrently('post', url), status.HTTP_201_CREATED
+        )
+        self.assertEqual(ShoppingCart.objects.count(), 1)
+        self.assertEqual(self.get_activity('shopping_carts'), 1)
+        self.assertOneSucceeded(
+            self.send_concurrently('delete', url), status.HTTP_204_NO_CONTENT
+        )
+        self.assertEqual(ShoppingCart.objects.count(), 0)
+        self.assertEqual(self.get_activity('shopping_carts'), 0)
+
+    def test_subscribe(self):
+        url = reverse('api:users-subscribe', args=[self.author.pk])
+        self.assertOneSucceeded(
+            self.send_concurrently('post', url), status.HTTP_201_CREATED
+        )
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertOneSucceeded(
+            self.send_concurrently('delete', url), status.HTTP_204_NO_CONTENT
+        )
+        self.assertEqual(Follow.objects.count(), 0)
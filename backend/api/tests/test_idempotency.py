@@ -0,0 +1,132 @@
+import threading
+from io import StringIO
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import (TestCase, TransactionTestCase,
+                         skipUnlessDBFeature)
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.models import IdempotencyKey
+from recipes.models import Favorite, Recipe
+
+User = get_user_model()
+
+THREADS = 8
+
+
+def create_recipe(author, name='Рецепт'):
+    return Recipe.objects.create(
+        author=author, name=name, text='Описание', cooking_time=10,
+        image='foodgram_backend/images/test.png',
+    )
+
+
+class IdempotentTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            username='reader', email='reader@example.com'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = create_recipe(self.user)
+
+    def favorite(self, key, recipe=None):
+        url = reverse('api:recipe-favorite', args=[(recipe or self.recipe).pk])
+        return self.client.post(url, HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay_returns_stored_response(self):
+        first = self.favorite('key')
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertNotIn('Idempotent-Replayed', first)
+        second = self.favorite('key')
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(Favorite.objects.count(), 1)
+
+    def test_same_key_for_other_request(self):
+        self.favorite('key')
+        other = create_recipe(self.user, 'Другой рецепт')
+        response = self.favorite('key', other)
+        self.assertEqual(
+            response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+        self.assertFalse(Favorite.objects.filter(recipe=other).exists())
+
+    def test_expired_key_runs_request_again(self):
+        self.favorite('key')
+        IdempotencyKey.objects.update(
+            created=timezone.now() - timedelta(days=2)
+        )
+        response = self.favorite('key')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertNotIn('Idempotent-Replayed', response)
+
+    def test_too_long_key_is_rejected(self):
+        response = self.favorite('k' * 256)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_purge_deletes_only_expired_keys(self):
+        self.favorite('old')
+        IdempotencyKey.objects.update(
+            created=timezone.now() - timedelta(days=2)
+        )
+        self.favorite('new', create_recipe(self.user, 'Другой рецепт'))
+        call_command('purge_idempotency_keys', stdout=StringIO())
+        self.assertQuerysetEqual(
+            IdempotencyKey.objects.values_list('key', flat=True), ['new']
+        )
+
+
+@skipUnlessDBFeature('has_select_for_update')
+class ConcurrentIdempotentTest(TransactionTestCase):
+    """
+    Запросы с одним ключом ждут блокировку записи ключа. В SQLite
+    SELECT FOR UPDATE нет, а повышение блокировки чтения до записи
+    в параллельных транзакциях сразу дает database is locked.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username='reader', email='reader@example.com'
+        )
+        self.recipe = create_recipe(self.user)
+
+    def test_one_request_runs_others_replay(self):
+        url = reverse('api:recipe-favorite', args=[self.recipe.pk])
+        barrier = threading.Barrier(THREADS)
+        responses = []
+
+        def worker():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                responses.append(
+                    client.post(url, HTTP_IDEMPOTENCY_KEY='key')
+                )
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(
+            [response.status_code for response in responses],
+            [status.HTTP_201_CREATED] * THREADS,
+        )
+        self.assertEqual(
+            sum('Idempotent-Replayed' in response for response in responses),
+            THREADS - 1,
+        )
+        self.assertEqual(Favorite.objects.count(), 1)
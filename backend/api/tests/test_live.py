@@ -0,0 +1,247 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.live import (EventStream, LocalBroker, RedisBroker, consume_ticket,
+                      get_broker, issue_ticket)
+from api.models import OutboxEvent
+from api.outbox import publish
+
+User = get_user_model()
+
+
+class TicketTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(
+            username='reader', email='reader@example.com'
+        )
+
+    def connect(self, query_string):
+        """Статус ответа потока; клиент отключается сразу."""
+        messages = []
+
+        async def receive():
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            messages.append(message)
+
+        async_to_sync(EventStream())(
+            {'type': 'http', 'headers': [], 'query_string': query_string},
+            receive, send,
+        )
+        return messages[0]['status']
+
+    def test_ticket_is_issued_to_authenticated_user(self):
+        client = APIClient()
+        self.assertEqual(client.post('/api/events/ticket/').status_code, 401)
+        client.force_authenticate(self.user)
+        response = client.post('/api/events/ticket/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(consume_ticket(response.data['ticket']), self.user.pk)
+
+    def test_ticket_is_used_once(self):
+        ticket = issue_ticket(self.user.pk)
+        self.assertEqual(self.connect(f'ticket={ticket}'.encode()), 200)
+        self.assertEqual(self.connect(f'ticket={ticket}'.encode()), 401)
+
+    def test_token_in_query_is_rejected(self):
+        token = Token.objects.create(user=self.user)
+        self.assertEqual(self.connect(f'token={token.key}'.encode()), 401)
+
+
+class Connection:
+    """Подключение к потоку, которое держится до close()."""
+
+    def __init__(self, app, token, last_event_id=None):
+        self.messages = []
+        self.closed = asyncio.Event()
+        headers = [(b'authorization', f'Token {token}'.encode())]
+        if last_event_id is not None:
+            headers.append((b'last-event-id', str(last_event_id).encode()))
+        self.task = asyncio.ensure_future(app(
+            {'type': 'http', 'headers': headers, 'query_string': b''},
+            self.receive, self.send,
+        ))
+
+    async def receive(self):
+        await self.closed.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        self.messages.append(message)
+
+    async def close(self):
+        self.closed.set()
+        await asyncio.wait_for(self.task, 1)
+
+    @property
+    def status(self):
+        return self.messages[0]['status']
+
+    @property
+    def body(self):
+        return b''.join(
+            message.get('body', b'') for message in self.messages[1:]
+        ).decode()
+
+
+@override_settings(LIVE_EVENTS_HEARTBEAT=0.01)
+class EventStreamTest(TestCase):
+    def setUp(self):
+        self.user, self.other = (
+            User.objects.create(username=name, email=f'{name}@example.com')
+            for name in ('reader', 'other')
+        )
+        self.token = Token.objects.create(user=self.user).key
+        self.other_token = Token.objects.create(user=self.other).key
+
+    def run_async(self, coroutine):
+        async_to_sync(coroutine)()
+
+    def test_heartbeat(self):
+        async def main():
+            connection = Connection(EventStream(), self.token)
+            await asyncio.sleep(0.05)
+            await connection.close()
+            self.assertEqual(connection.status, 200)
+            self.assertIn(': ping\n\n', connection.body)
+
+        self.run_async(main)
+
+    def test_resume_from_last_event_id(self):
+        seen = publish('favorite.added', user_id=self.user.pk, recipe_id=1)
+        publish('favorite.added', user_id=self.other.pk, recipe_id=1)
+        missed = publish(
+            'shoppingcart.added', user_id=self.user.pk, recipe_id=2
+        )
+        publish('recipe.created', recipe_id=3, author_id=self.user.pk)
+
+        async def main():
+            connection = Connection(EventStream(), self.token, seen.pk)
+            await asyncio.sleep(0.02)
+            await connection.close()
+            self.assertEqual(
+                [
+                    line for line in connection.body.split('\n')
+                    if line.startswith(('id:', 'event:'))
+                ],
+                [f'id: {missed.pk}', 'event: shoppingcart.added'],
+            )
+
+        self.run_async(main)
+
+    def test_reset_when_events_are_gone(self):
+        oldest = publish('favorite.added', user_id=self.user.pk).pk
+        OutboxEvent.objects.filter(pk=oldest).delete()
+        publish('favorite.added', user_id=self.user.pk)
+
+        async def main():
+            connection = Connection(EventStream(), self.token, oldest - 1)
+            await asyncio.sleep(0.02)
+            await connection.close()
+            self.assertIn('event: reset\n', connection.body)
+
+        self.run_async(main)
+
+    @override_settings(LIVE_EVENTS_MAX_USER_CONNECTIONS=1)
+    def test_connections_per_user(self):
+        async def main():
+            app = EventStream()
+            first = Connection(app, self.token)
+            await asyncio.sleep(0.02)
+            second = Connection(app, self.token)
+            other = Connection(app, self.other_token)
+            await asyncio.wait_for(second.task, 1)
+            self.assertEqual(second.status, 429)
+            await first.close()
+            third = Connection(app, self.token)
+            await asyncio.sleep(0.02)
+            await third.close()
+            await other.close()
+            self.assertEqual(
+                [first.status, other.status, third.status], [200] * 3
+            )
+            self.assertEqual(app.user_connections, {})
+
+        self.run_async(main)
+
+    @override_settings(LIVE_EVENTS_MAX_CONNECTIONS=1)
+    def test_connections_per_worker(self):
+        async def main():
+            app = EventStream()
+            first = Connection(app, self.token)
+            await asyncio.sleep(0.02)
+            second = Connection(app, self.other_token)
+            await asyncio.wait_for(second.task, 1)
+            await first.close()
+            self.assertEqual([first.status, second.status], [200, 503])
+
+        self.run_async(main)
+
+    def test_expired_stream_is_closed(self):
+        async def main():
+            connection = Connection(EventStream(), self.token)
+            await asyncio.sleep(0.02)
+            get_broker().expire_all()
+            await asyncio.wait_for(connection.task, 1)
+            self.assertFalse(connection.messages[-1].get('more_body'))
+
+        self.run_async(main)
+
+
+class RedisError(Exception):
+    pass
+
+
+class Stop(Exception):
+    pass
+
+
+class FakePubSub:
+    def __init__(self, messages):
+        self.messages = messages
+
+    def subscribe(self, channel):
+        if self.messages is None:
+            raise RedisError('connection refused')
+
+    def listen(self):
+        yield from self.messages
+        raise RedisError('connection lost')
+
+    def close(self):
+        pass
+
+
+class RedisListenerTest(SimpleTestCase):
+    def test_listener_reconnects(self):
+        broker = RedisBroker.__new__(RedisBroker)
+        LocalBroker.__init__(broker)
+        broker.errors = RedisError
+        broker.channel = 'live-events'
+        event = {'id': 1, 'user_id': 1, 'type': 'favorite.added'}
+        broker.redis = mock.Mock()
+        broker.redis.pubsub.side_effect = [
+            FakePubSub(None),
+            FakePubSub([{'data': json.dumps(event)}]),
+            FakePubSub(None),
+        ]
+        with mock.patch.object(LocalBroker, 'publish') as publish, \
+                mock.patch('api.live.time.sleep',
+                           side_effect=[None, None, Stop]) as sleep, \
+                self.assertLogs('api.live', 'WARNING') as logs:
+            with self.assertRaises(Stop):
+                broker.listen()
+        publish.assert_called_once_with(event)
+        # После удачного подключения пауза начинается заново.
+        self.assertEqual(
+            [call.args[0] for call in sleep.call_args_list], [1, 1, 2]
+        )
+        self.assertEqual(len(logs.records), 3)
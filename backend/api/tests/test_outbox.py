@@ -0,0 +1,119 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.handlers import check_shared_cache
+from api.models import OutboxCheckpoint, OutboxEvent
+from api.outbox import consume, purge
+
+
+class ConsumeTest(TestCase):
+    def setUp(self):
+        self.delivered = []
+        patcher = mock.patch(
+            'api.outbox.get_handlers',
+            return_value=[lambda event: self.delivered.append(event.pk)],
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_events(self, count):
+        return [
+            OutboxEvent.objects.create(event_type='test', payload={}).pk
+            for _ in range(count)
+        ]
+
+    def test_late_commit_behind_checkpoint_is_delivered(self):
+        first, late, last = self.create_events(3)
+        # Транзакция события late еще не закоммитилась.
+        OutboxEvent.objects.filter(pk=late).delete()
+        self.assertEqual(consume(), 2)
+        checkpoint = OutboxCheckpoint.objects.get()
+        self.assertEqual(checkpoint.last_event_id, last)
+        self.assertEqual(list(checkpoint.gaps), [str(late)])
+        OutboxEvent.objects.create(pk=late, event_type='test', payload={})
+        self.assertEqual(consume(), 1)
+        self.assertEqual(self.delivered, [first, last, late])
+        self.assertEqual(OutboxCheckpoint.objects.get().gaps, {})
+        self.assertEqual(consume(), 0)
+
+    @override_settings(OUTBOX_GAP_TIMEOUT=0)
+    def test_gaps_of_rolled_back_transactions_expire(self):
+        first, rolled_back, last = self.create_events(3)
+        OutboxEvent.objects.filter(pk=rolled_back).delete()
+        self.assertEqual(consume(), 2)
+        self.assertEqual(OutboxCheckpoint.objects.get().gaps, {})
+
+    def test_failed_handler_keeps_position(self):
+        first, second = self.create_events(2)
+        with mock.patch(
+            'api.outbox.get_handlers', return_value=[self.fail_on(second)]
+        ):
+            with self.assertRaises(RuntimeError):
+                consume()
+        self.assertEqual(OutboxCheckpoint.objects.get().last_event_id, first)
+        self.assertEqual(consume(), 1)
+        self.assertEqual(self.delivered, [second])
+
+    def test_new_consumer_starts_at_oldest_event(self):
+        purged, first, second = self.create_events(3)
+        OutboxEvent.objects.filter(pk=purged).delete()
+        self.assertEqual(consume(), 2)
+        checkpoint = OutboxCheckpoint.objects.get()
+        self.assertEqual(checkpoint.last_event_id, second)
+        self.assertEqual(checkpoint.gaps, {})
+
+    @override_settings(OUTBOX_MAX_GAPS=3)
+    def test_tracked_gaps_are_capped(self):
+        first, = self.create_events(1)
+        self.assertEqual(consume(), 1)
+        far = first + 100000
+        OutboxEvent.objects.create(pk=far, event_type='test', payload={})
+        self.assertEqual(consume(), 1)
+        self.assertEqual(
+            sorted(map(int, OutboxCheckpoint.objects.get().gaps)),
+            [far - 3, far - 2, far - 1],
+        )
+
+    def fail_on(self, pk):
+        def func(event):
+            if event.pk == pk:
+                raise RuntimeError
+        return func
+
+
+class PurgeTest(TestCase):
+    def test_keeps_undelivered_pending_and_recent_events(self):
+        events = [
+            OutboxEvent.objects.create(event_type='test', payload={})
+            for _ in range(4)
+        ]
+        OutboxEvent.objects.filter(pk__in=[
+            event.pk for event in events[:3]
+        ]).update(created=timezone.now() - timedelta(days=2))
+        self.assertEqual(purge(), 0)
+        OutboxCheckpoint.objects.create(
+            consumer='default', last_event_id=events[3].pk,
+            gaps={str(events[1].pk): 0},
+        )
+        self.assertEqual(purge(), 2)
+        self.assertQuerysetEqual(
+            OutboxEvent.objects.values_list('pk', flat=True),
+            [events[1].pk, events[3].pk],
+        )
+
+
+class SharedCacheCheckTest(TestCase):
+    def test_process_local_cache_is_an_error(self):
+        for backend, errors in (
+            ('django.core.cache.backends.locmem.LocMemCache', ['api.E001']),
+            ('django.core.cache.backends.redis.RedisCache', []),
+        ):
+            with self.subTest(backend=backend), override_settings(
+                CACHES={'default': {'BACKEND': backend}}
+            ):
+                self.assertEqual(
+                    [error.id for error in check_shared_cache(None)], errors
+                )
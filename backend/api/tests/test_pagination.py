@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.pagination import get_count
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+@override_settings(COUNT_ESTIMATE_THRESHOLD=3)
+class GetCountTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(
+            username='author', email='author@example.com'
+        )
+        for index in range(5):
+            Recipe.objects.create(
+                author=self.author, name=f'Рецепт {index}', text='Текст',
+                cooking_time=index + 1, image='recipes/images/recipe.png',
+            )
+
+    def estimate(self, value):
+        return mock.patch(
+            'api.pagination.estimate_count', return_value=value
+        )
+
+    def test_small_queryset_is_counted_without_estimate(self):
+        with self.estimate(1000) as estimate:
+            self.assertEqual(
+                get_count(Recipe.objects.filter(cooking_time__lte=3)),
+                (3, False),
+            )
+        estimate.assert_not_called()
+
+    def test_large_queryset_is_estimated(self):
+        with self.estimate(1000) as estimate:
+            self.assertEqual(get_count(Recipe.objects.all()), (1000, True))
+        estimate.assert_called_once()
+
+    def test_estimate_is_not_below_counted_rows(self):
+        with self.estimate(1):
+            self.assertEqual(get_count(Recipe.objects.all()), (4, True))
+
+    def test_exact_count_without_estimate(self):
+        with self.estimate(None):
+            self.assertEqual(get_count(Recipe.objects.all()), (5, False))
+
+    def test_result_is_cached_with_flag(self):
+        for value, expected in ((None, (5, False)), (1000, (1000, True))):
+            cache.clear()
+            with self.subTest(estimate=value):
+                with self.estimate(value):
+                    get_count(Recipe.objects.all())
+                with self.estimate(value) as estimate:
+                    with self.assertNumQueries(0):
+                        self.assertEqual(
+                            get_count(Recipe.objects.all()), expected
+                        )
+                estimate.assert_not_called()
+
+    def test_response_has_flag(self):
+        client = APIClient()
+        with self.estimate(1000):
+            response = client.get('/api/recipes/?limit=2')
+        self.assertEqual(response.data['count'], 1000)
+        self.assertTrue(response.data['count_approximate'])
+        self.assertIsNotNone(response.data['next'])
+        client.force_authenticate(self.author)
+        with self.estimate(1000):
+            response = client.get('/api/recipes/?is_favorited=1')
+        self.assertEqual(response.data['count'], 0)
+        self.assertFalse(response.data['count_approximate'])
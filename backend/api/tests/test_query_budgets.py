@@ -0,0 +1,27 @@
+from django.test import TestCase
+
+from api.checks.budgets import (find_problems, format_queries,
+                                get_missing_routes, measure_routes,
+                                read_budgets)
+
+
+class QueryBudgetsTest(TestCase):
+    """
+    Число SQL-запросов каждого маршрута API не зависит от объема
+    данных и размера страницы и не больше бюджета из
+    api/query_budgets.json. Бюджеты обновляет
+    manage.py check_query_budgets --update.
+    """
+
+    def test_every_route_has_budget(self):
+        self.assertEqual(get_missing_routes(), [])
+
+    def test_routes_within_budget(self):
+        budgets = read_budgets()
+        for key, runs in measure_routes().items():
+            with self.subTest(route=key):
+                problems, worst, sql = find_problems(runs, budgets.get(key))
+                self.assertFalse(
+                    problems,
+                    f'{"; ".join(problems)}\n{format_queries(worst, sql)}'
+                )
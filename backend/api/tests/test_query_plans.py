@@ -0,0 +1,25 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from api.checks.budgets import SIZES, seed
+from api.checks.plans import check_plans
+
+
+@skipUnless(
+    connection.vendor == 'postgresql', 'Планы проверяются в PostgreSQL.'
+)
+class QueryPlansTest(TestCase):
+    """Основные запросы эндпоинтов читают таблицы по индексам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed(*SIZES['large'])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def test_plans_use_indexes(self):
+        for name, (problems, plan) in check_plans().items():
+            with self.subTest(query=name):
+                self.assertFalse(problems, plan)
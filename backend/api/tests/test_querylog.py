@@ -0,0 +1,136 @@
+import tempfile
+import threading
+from collections import Counter
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from api.querylog import (MAX_ORIGINS, QueryStats, fingerprint, merge,
+                          new_entry, read_entries, write_entries)
+
+THREADS = 8
+QUERIES = 200
+
+
+class FingerprintTest(SimpleTestCase):
+    def test_values_are_replaced(self):
+        for sql, expected in (
+            (
+                'SELECT * FROM "t" WHERE "name" = \'it\'\'s\' AND "id" = 42',
+                'SELECT * FROM "t" WHERE "name" = ? AND "id" = ?',
+            ),
+            (
+                'SELECT "t1"."id" FROM "t1" WHERE "x" IN (1, 2, 3) LIMIT 21',
+                'SELECT "t1"."id" FROM "t1" WHERE "x" IN (...) LIMIT ?',
+            ),
+            (
+                'SELECT * FROM t WHERE id IN (%s, %s,\n  %s)',
+                'SELECT * FROM t WHERE id IN (...)',
+            ),
+            (
+                'INSERT INTO "t" ("a", "b") VALUES (%s, %s), (%s, %s)',
+                'INSERT INTO "t" ("a", "b") VALUES (...)',
+            ),
+            (
+                'SELECT -1.5, t2.col FROM t2 WHERE id = $1',
+                'SELECT ?, t2.col FROM t2 WHERE id = ?',
+            ),
+        ):
+            with self.subTest(sql=sql):
+                self.assertEqual(fingerprint(sql), expected)
+
+    def test_lists_of_any_length_match(self):
+        self.assertEqual(
+            fingerprint('SELECT 1 FROM t WHERE id IN (%s)'),
+            fingerprint('SELECT 1 FROM t WHERE id IN (%s, %s, %s, %s)'),
+        )
+
+
+class MergeTest(SimpleTestCase):
+    def entry(self, count, total, maximum, views):
+        entry = new_entry()
+        entry.update(count=count, total=total, max=maximum)
+        entry['views'].update(views)
+        return entry
+
+    def test_counters_are_added(self):
+        target = {'a': self.entry(1, 2.0, 2.0, {'list': 1})}
+        merge(target, {
+            'a': self.entry(2, 3.0, 1.5, {'list': 1, 'detail': 1}),
+            'b': self.entry(1, 1.0, 1.0, {}),
+        })
+        self.assertEqual(target['a']['count'], 3)
+        self.assertEqual(target['a']['total'], 5.0)
+        self.assertEqual(target['a']['max'], 2.0)
+        self.assertEqual(target['a']['views'], Counter(list=2, detail=1))
+        self.assertEqual(target['b']['count'], 1)
+
+    def test_origins_are_trimmed(self):
+        target = {}
+        merge(target, {'a': self.entry(
+            1, 1.0, 1.0,
+            {f'view-{index}': index for index in range(MAX_ORIGINS + 5)},
+        )})
+        views = target['a']['views']
+        self.assertEqual(len(views), MAX_ORIGINS)
+        self.assertNotIn('view-0', views)
+
+
+class QueryLogFileTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'query_log.json'
+        settings = override_settings(QUERY_LOG_FILE=self.path)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def run_threads(self, worker):
+        threads = [
+            threading.Thread(target=worker, args=(index,))
+            for index in range(THREADS)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def assert_logged(self, keys):
+        entries = read_entries(self.path)
+        self.assertEqual(
+            {key: entry['count'] for key, entry in entries.items()},
+            dict.fromkeys(keys, QUERIES * THREADS // len(keys)),
+        )
+
+    def test_concurrent_add_and_flush(self):
+        stats = QueryStats()
+
+        def worker(index):
+            for number in range(QUERIES):
+                stats.add(
+                    f'SELECT {number} FROM t{number % 2}', 1.0,
+                    'recipe-list', None,
+                )
+                if number % 50 == index:
+                    stats.flush()
+
+        self.run_threads(worker)
+        stats.flush()
+        self.assert_logged(['SELECT ? FROM t0', 'SELECT ? FROM t1'])
+
+    @override_settings(QUERY_LOG_FLUSH_INTERVAL=0)
+    def test_every_add_flushes(self):
+        self.run_threads(lambda index: [
+            QueryStats().add('SELECT 1', 1.0, None, None)
+            for _ in range(QUERIES)
+        ])
+        self.assert_logged(['SELECT ?'])
+
+    def test_reset_removes_log(self):
+        write_entries({'SELECT ?': new_entry() | {'count': 1}})
+        output = StringIO()
+        call_command('slow_queries', reset=True, stdout=output)
+        self.assertIn('SELECT ?', output.getvalue())
+        self.assertFalse(self.path.exists())
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+
+class RecipeWriteTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(
+            username='author', email='author@example.com'
+        )
+        self.tags = [
+            Tag.objects.create(
+                name=f'Тег {index}', slug=f'tag-{index}', color='#000000'
+            )
+            for index in range(2)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(
+                name=f'Мука {index}', measurement_unit='г'
+            )
+            for index in range(2)
+        ]
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Суп', text='Текст', cooking_time=10,
+            image='recipes/images/recipe.png',
+        )
+        self.recipe.tags.add(self.tags[0])
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def patch(self, tags, ingredients):
+        return self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/', {
+                'tags': tags,
+                'ingredients': [
+                    {'id': pk, 'amount': 2} for pk in ingredients
+                ],
+                'name': 'Рагу', 'text': 'Текст', 'cooking_time': 5,
+            }, format='json',
+        )
+
+    def test_tags_and_ingredients_are_saved(self):
+        tags = [tag.pk for tag in self.tags]
+        ingredients = [ingredient.pk for ingredient in self.ingredients]
+        response = self.patch(tags, ingredients)
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(
+            [tag['id'] for tag in response.data['tags']], tags
+        )
+        self.assertEqual(
+            [item['id'] for item in response.data['ingredients']],
+            ingredients,
+        )
+
+    def test_invalid_ids_are_rejected(self):
+        tag, ingredient = self.tags[0].pk, self.ingredients[0].pk
+        for field, tags, ingredients in (
+            ('tags', [tag, 999], [ingredient]),
+            ('tags', [tag, tag], [ingredient]),
+            ('tags', [], [ingredient]),
+            ('ingredients', [tag], [ingredient, 999]),
+            ('ingredients', [tag], [ingredient, ingredient]),
+        ):
+            with self.subTest(tags=tags, ingredients=ingredients):
+                response = self.patch(tags, ingredients)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.data)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Суп')
@@ -0,0 +1,50 @@
+import datetime
+import decimal
+import uuid
+
+from django.test import SimpleTestCase
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import ORJSONRenderer
+
+DATA = {
+    'aware': timezone.now(),
+    'utc': datetime.datetime(
+        2020, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc
+    ),
+    'naive': datetime.datetime(2020, 1, 2, 3, 4, 5, 123456),
+    'date': datetime.date(2020, 1, 2),
+    'time': datetime.time(1, 2, 3, 4567),
+    'decimal': decimal.Decimal('1.10'),
+    'uuid': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+    'text': 'Рецепт "борща" \\ </script>    🍲',
+    'numbers': [0, -1, 32000, 1.5, None, True, False],
+    'nested': {'list': [{'a': 1}], 'empty': {}},
+    1: 'non-string key',
+}
+
+
+class ORJSONRendererTest(SimpleTestCase):
+    def assertRendersLikeDRF(self, data, media_type=None, context=None):
+        self.assertEqual(
+            ORJSONRenderer().render(data, media_type, context),
+            JSONRenderer().render(data, media_type, context),
+        )
+
+    def test_same_bytes_as_drf(self):
+        self.assertRendersLikeDRF(DATA)
+
+    def test_each_type_separately(self):
+        for key, value in DATA.items():
+            with self.subTest(key=key):
+                self.assertRendersLikeDRF({key: value})
+
+    def test_indent_from_renderer_context(self):
+        self.assertRendersLikeDRF(DATA, context={'indent': 4})
+
+    def test_indent_from_media_type(self):
+        self.assertRendersLikeDRF(DATA, 'application/json; indent=2')
+
+    def test_none(self):
+        self.assertEqual(ORJSONRenderer().render(None), b'')
@@ -0,0 +1,21 @@
+import random
+
+from django.db import transaction
+from django.test import TestCase
+
+from api.checks.representation import check_parity
+
+RUNS = 10
+
+
+class CompiledRepresentationTest(TestCase):
+    """
+    Скомпилированное чтение сериализаторов дает тот же JSON, что и
+    штатный путь DRF, на случайных данных и наборах полей.
+    """
+
+    def test_same_json_as_drf(self):
+        for seed in range(RUNS):
+            with self.subTest(seed=seed), transaction.atomic():
+                check_parity(random.Random(seed))
+                transaction.set_rollback(True)
@@ -0,0 +1,118 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+
+from api.cache import (ALL_RECIPES, author_tag, get_versions, invalidate,
+                       is_fresh, recipe_tag, slug_tag, store)
+from recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+
+class VersionsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_invalidate_bumps_only_given_tags(self):
+        self.assertEqual(
+            get_versions([ALL_RECIPES, recipe_tag(1)]),
+            {ALL_RECIPES: 0, recipe_tag(1): 0},
+        )
+        invalidate(recipe_tag(1))
+        versions = get_versions([ALL_RECIPES, recipe_tag(1)])
+        self.assertEqual(versions[ALL_RECIPES], 0)
+        self.assertGreater(versions[recipe_tag(1)], 0)
+
+    def test_entry_is_stale_after_invalidation(self):
+        store('entry', Response({'id': 1}), [recipe_tag(1)], time.time())
+        self.assertTrue(is_fresh(cache.get('entry')))
+        invalidate(recipe_tag(2))
+        self.assertTrue(is_fresh(cache.get('entry')))
+        invalidate(recipe_tag(1))
+        self.assertFalse(is_fresh(cache.get('entry')))
+
+    def test_response_built_before_invalidation_is_not_stored(self):
+        started = time.time()
+        invalidate(recipe_tag(1))
+        store('entry', Response({'id': 1}), [recipe_tag(1)], started)
+        self.assertIsNone(cache.get('entry'))
+
+
+class CacheAnonymousTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.author = User.objects.create(
+            username='author', email='author@example.com'
+        )
+        self.lunch = Tag.objects.create(
+            name='Обед', slug='lunch', color='#000000'
+        )
+        self.dinner = Tag.objects.create(
+            name='Ужин', slug='dinner', color='#ffffff'
+        )
+        self.soup = self.create_recipe('Суп', self.lunch)
+        self.salad = self.create_recipe('Салат', self.dinner)
+
+    def create_recipe(self, name, tag):
+        recipe = Recipe.objects.create(
+            author=self.author, name=name, text='Текст', cooking_time=10,
+            image='recipes/images/recipe.png',
+        )
+        recipe.tags.add(tag)
+        return recipe
+
+    def get(self, query):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get(f'/api/recipes/?{query}')
+        return response['X-Cache'], [
+            recipe['id'] for recipe in response.data['results']
+        ]
+
+    def test_replay_and_parameter_order(self):
+        self.assertEqual(self.get('limit=6&tags=lunch')[0], 'MISS')
+        self.assertEqual(self.get('tags=lunch&limit=6')[0], 'HIT')
+
+    def test_authenticated_requests_are_not_cached(self):
+        self.client.force_authenticate(self.author)
+        response = self.client.get('/api/recipes/')
+        self.assertNotIn('X-Cache', response)
+
+    def test_new_recipe_invalidates_list(self):
+        self.get('limit=6')
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = self.create_recipe('Рагу', self.dinner)
+        state, ids = self.get('limit=6')
+        self.assertEqual(state, 'MISS')
+        self.assertIn(recipe.pk, ids)
+
+    def test_author_and_tags_filter_sees_new_tag(self):
+        query = f'author={self.author.pk}&tags=lunch'
+        self.assertEqual(self.get(query), ('MISS', [self.soup.pk]))
+        self.assertEqual(self.get(query)[0], 'HIT')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salad.tags.add(self.lunch)
+        state, ids = self.get(query)
+        self.assertEqual(state, 'MISS')
+        self.assertCountEqual(ids, [self.soup.pk, self.salad.pk])
+
+    def test_entry_is_tagged_with_both_filters(self):
+        with mock.patch('api.decorators.response_cache.store') as store:
+            self.get(f'author={self.author.pk}&tags=lunch&tags=dinner')
+        tags = store.call_args.args[2]
+        self.assertTrue({
+            author_tag(str(self.author.pk)),
+            slug_tag('lunch'), slug_tag('dinner'),
+        } <= tags)
+        self.assertNotIn(ALL_RECIPES, tags)
+
+    def test_deleted_recipe_invalidates_list(self):
+        self.get('tags=dinner')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salad.delete()
+        self.assertEqual(self.get('tags=dinner'), ('MISS', []))
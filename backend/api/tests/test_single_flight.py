@@ -0,0 +1,35 @@
+import tempfile
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import SimpleTestCase
+
+from api.checks.single_flight import run_scenarios
+from api.singleflight import SingleFlight
+
+THREADS = 16
+
+
+class SingleFlightTest(SimpleTestCase):
+    """
+    Одновременные запросы холодного, инвалидированного и истекающего
+    ключа: значение считает ровно один поток.
+    """
+
+    def assertComputedOnce(self, flight):
+        scenarios, stored = run_scenarios(flight, THREADS)
+        for scenario, results, expected in scenarios:
+            with self.subTest(scenario=scenario):
+                self.assertEqual(results, expected)
+        self.assertEqual(stored, 3)
+
+    def test_locmem(self):
+        self.assertComputedOnce(SingleFlight(LocMemCache(
+            'single-flight-test', {}
+        )))
+
+    def test_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertComputedOnce(SingleFlight(
+                FileBasedCache(directory, {})
+            ))
@@ -0,0 +1,101 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.sync import InvalidToken, decode_token, encode_token, get_changes
+from recipes.models import Recipe
+from users.models import Follow
+
+User = get_user_model()
+
+
+def make_token(moment, section=0, pk=0):
+    payload = json.dumps([moment, section, pk]).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+class DecodeTokenTest(TestCase):
+    def test_round_trip(self):
+        moment = timezone.now()
+        self.assertEqual(
+            decode_token(encode_token(moment, 1, 2)), (moment, 1, 2)
+        )
+
+    def test_invalid_moments(self):
+        naive = timezone.now().replace(tzinfo=None).isoformat()
+        for moment in (naive, 'вчера', 42, None):
+            with self.subTest(moment=moment):
+                with self.assertRaises(InvalidToken):
+                    decode_token(make_token(moment))
+
+
+@override_settings(SYNC_COMMIT_GRACE=0)
+class GetChangesTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create(
+            username='author', email='author@example.com'
+        )
+        self.reader = User.objects.create(
+            username='reader', email='reader@example.com'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.author, name='Суп', text='Текст', cooking_time=10,
+            image='recipes/images/soup.png',
+        )
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+    def test_recipes_of_followed_author_after_token(self):
+        changes, token, _ = get_changes(self.reader)
+        self.assertEqual(changes['recipes'], [])
+        Follow.objects.create(user=self.reader, author=self.author)
+        changes, token, _ = get_changes(self.reader, token)
+        self.assertEqual(changes['recipes'], [])
+        self.assertEqual(changes['followed_recipes'], [self.recipe.pk])
+        self.assertEqual(changes['subscriptions'], [self.author.pk])
+        changes, _, _ = get_changes(self.reader, token)
+        self.assertEqual(changes['followed_recipes'], [])
+
+    def test_follows_of_other_users_are_ignored(self):
+        other = User.objects.create(
+            username='other', email='other@example.com'
+        )
+        _, token, _ = get_changes(self.reader)
+        Follow.objects.create(user=other, author=self.author)
+        changes, _, _ = get_changes(self.reader, token)
+        self.assertEqual(changes['followed_recipes'], [])
+
+    def test_paging_inside_followed_recipes(self):
+        _, token, _ = get_changes(self.reader)
+        second = Recipe.objects.create(
+            author=self.author, name='Каша', text='Текст', cooking_time=5,
+            image='recipes/images/porridge.png',
+        )
+        Recipe.objects.filter(pk=second.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+        pages = []
+        has_more = True
+        while has_more:
+            changes, token, has_more = get_changes(self.reader, token, 1)
+            pages.append(changes['followed_recipes'])
+        self.assertEqual(
+            [pk for page in pages for pk in page],
+            [self.recipe.pk, second.pk],
+        )
+
+    def test_naive_token_is_bad_request(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        naive = timezone.now().replace(tzinfo=None).isoformat()
+        response = client.get(
+            '/api/sync/', {'since': make_token(naive)}
+        )
+        self.assertEqual(response.status_code, 400)
@@ -1,7 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CustomUserViewSet, IngredientsVewSet, RecipeViewSet,
+from .views import (BootstrapViewSet, CustomUserViewSet, EventTicketViewSet,
+                    IngredientsVewSet, RecipeViewSet, SyncViewSet,
                     TagsViewSet)
 
 app_name = 'api'
@@ -11,6 +12,9 @@ router.register('tags', TagsViewSet)
 router.register('recipes', RecipeViewSet)
 router.register('users', CustomUserViewSet, basename='users')
 router.register('ingredients', IngredientsVewSet)
+router.register('sync', SyncViewSet, basename='sync')
+router.register('bootstrap', BootstrapViewSet, basename='bootstrap')
+router.register('events/ticket', EventTicketViewSet, basename='event-ticket')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -0,0 +1,67 @@
+from django.db import connections, models, router
+
+
+def insert_or_ignore(model, **values):
+    """
+    Добавляет запись одним запросом INSERT ... ON CONFLICT DO NOTHING.
+    Возвращает True, если запись добавлена, и False, если такая
+    запись уже есть.
+    """
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+    obj = model(**values)
+    columns = []
+    params = []
+    for field in model._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        columns.append(quote_name(field.column))
+        params.append(field.get_db_prep_save(
+            field.pre_save(obj, add=True), connection
+        ))
+    sql = (
+        f'INSERT INTO {quote_name(model._meta.db_table)} '
+        f'({", ".join(columns)}) VALUES ({", ".join(["%s"] * len(params))}) '
+        f'ON CONFLICT DO NOTHING '
+        f'RETURNING {quote_name(model._meta.pk.column)}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchone() is not None
+
+
+def delete_returning(model, returning, **filters):
+    """
+    Удаляет записи одним запросом DELETE ... RETURNING.
+    filters - равенства по полям модели, возвращает список значений
+    поля returning у удаленных записей.
+    """
+    connection = connections[router.db_for_write(model)]
+    quote_name = connection.ops.quote_name
+    conditions = []
+    params = []
+    for name, value in filters.items():
+        field = model._meta.get_field(name)
+        if isinstance(value, models.Model):
+            value = value.pk
+        conditions.append(f'{quote_name(field.column)} = %s')
+        params.append(field.get_db_prep_value(value, connection))
+    field = model._meta.get_field(returning)
+    sql = (
+        f'DELETE FROM {quote_name(model._meta.db_table)} '
+        f'WHERE {" AND ".join(conditions)} '
+        f'RETURNING {quote_name(field.column)}'
+    )
+    column = field.get_col(model._meta.db_table)
+    converters = (
+        connection.ops.get_db_converters(column)
+        + field.get_db_converters(connection)
+    )
+    values = []
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        for (value,) in cursor.fetchall():
+            for converter in converters:
+                value = converter(value, column, connection)
+            values.append(value)
+    return values
@@ -1,111 +1,361 @@
-from django.http.response import HttpResponse
+from urllib.parse import urlencode
+
+from django.http.response import Http404, HttpResponse, StreamingHttpResponse
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (Count, Exists, OuterRef, Prefetch, Value,
+                              prefetch_related_objects)
 from django.db.models.aggregates import Sum
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 
 from recipes.models import (Favorite, Ingredient, Recipe,
                             RecipeIngredient, ShoppingCart, Tag)
+from recipes.ndjson import IMAGE_MODES, IMAGES_REF, export_lines
+from recipes.trending import (DEFAULT_WINDOW, WINDOWS, get_trending_ids,
+                              record_activity, update_favorite_count)
+from users.models import Follow
+from .cache import (ALL_RECIPES, CATALOG, COOKING_TIME, POPULARITY,
+                    author_tag, cart_tag, follows_tag, get_cache_key,
+                    get_versions, invalidate_on_commit, recipe_tag, slug_tag,
+                    user_tag)
+from .decorators import cache_anonymous, idempotent
 from .filters import IngredientFilter, RecipeFilter
-from .pagination import CustomPageNumberPagination
+from .live import issue_ticket
+from .mixins import SparseFieldsMixin
+from .outbox import (FOLLOW_ADDED, FOLLOW_REMOVED, RECIPE_DELETED, publish,
+                     relation_event)
+from .pagination import (ApproximateCountPagination,
+                         CustomPageNumberPagination, get_count)
 from .permissions import IsAuthorOrReadOnly
-from .serializers import (CreateSubscribeSerializer,
+from .utils import delete_returning, insert_or_ignore
+from .serializers import (CompoundRecipeListSerializer, CustomUserSerializer,
                           IngredientSerializer, RecipeListSerializer,
                           RecipeSerializer, ShortRecipeSerializer,
                           SubscriptionSerializer, TagSerializer,)
+from .singleflight import single_flight
+from .sync import ExpiredToken, InvalidToken, add_tombstone, get_changes
 
 
 User = get_user_model()
 
 
+def annotate_subscribed(queryset, user):
+    """Аннотирует пользователей признаком is_subscribed для user."""
+    if user.is_anonymous:
+        return queryset.annotate(is_subscribed=Value(False))
+    return queryset.annotate(is_subscribed=Exists(
+        Follow.objects.filter(user=OuterRef('pk'), author=user)
+    ))
+
+
+def get_recipe_prefetches(user, fields):
+    """Связи рецептов, нужные RecipeListSerializer для полей fields."""
+    prefetches = []
+    if 'author' in fields:
+        prefetches.append(Prefetch(
+            'author', queryset=annotate_subscribed(User.objects, user)
+        ))
+    if 'tags' in fields:
+        prefetches.append('tags')
+    if 'ingredients' in fields:
+        prefetches.append(Prefetch(
+            'recipe_ingredients',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        ))
+    return prefetches
+
+
+def prepare_recipes(queryset, user, fields, prefetch=True):
+    """
+    Загружает для RecipeListSerializer только поля fields и все связи
+    и признаки для user постоянным числом запросов. С prefetch=False
+    связи не подгружаются, их можно загрузить для нескольких выборок
+    сразу через get_recipe_prefetches.
+    """
+    queryset = queryset.only(
+        'id', 'pub_date', 'author',
+        *(fields & {
+            'name', 'image', 'image_width', 'image_height',
+            'image_placeholder', 'text', 'cooking_time',
+        })
+    )
+    if prefetch:
+        queryset = queryset.prefetch_related(
+            *get_recipe_prefetches(user, fields)
+        )
+    for name, related in (
+        ('is_favorited', Favorite),
+        ('is_in_shopping_cart', ShoppingCart),
+    ):
+        if name not in fields:
+            continue
+        if user.is_anonymous:
+            queryset = queryset.annotate(**{name: Value(False)})
+            continue
+        queryset = queryset.annotate(**{name: Exists(
+            related.objects.filter(user=user, recipe=OuterRef('pk'))
+        )})
+    return queryset
+
+
 class TagsViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
-    pagination_class = CustomPageNumberPagination
+    pagination_class = ApproximateCountPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in permissions.SAFE_METHODS:
+            return queryset
+        return prepare_recipes(
+            queryset, self.request.user,
+            self.get_sparse_fields(RecipeListSerializer.Meta.fields)
+        )
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            publish(
+                RECIPE_DELETED,
+                recipe_id=instance.pk, author_id=instance.author_id
+            )
+            instance.delete()
+
+    def is_compound(self):
+        return (
+            self.action == 'list'
+            and self.request.query_params.get('compound') in ('1', 'true')
+        )
+
     def get_serializer_class(self):
         if self.request.method in permissions.SAFE_METHODS:
+            if self.is_compound():
+                return CompoundRecipeListSerializer
             return RecipeListSerializer
         return RecipeSerializer
 
+    def get_included(self, recipes):
+        """Авторы и теги страницы рецептов, каждый по одному разу."""
+        fields = self.get_sparse_fields(RecipeListSerializer.Meta.fields)
+        included = {}
+        if 'author' in fields:
+            authors = {recipe.author_id: recipe.author for recipe in recipes}
+            included['users'] = CustomUserSerializer(
+                authors.values(), many=True,
+                context=self.get_serializer_context()
+            ).data
+        if 'tags' in fields:
+            tags = {
+                tag.pk: tag for recipe in recipes for tag in recipe.tags.all()
+            }
+            included['tags'] = TagSerializer(tags.values(), many=True).data
+        return included
+
+    def get_cache_tags(self):
+        """Теги записи кэша ответа для cache_anonymous."""
+        if self.action == 'retrieve':
+            recipes = [self.object]
+            tags = set()
+        else:
+            recipes = self.paginator.page.object_list
+            params = self.request.query_params
+            # Рецепт автора входит в список ?author=&tags=, когда
+            # получает тег: запись помечается тегами обоих фильтров.
+            tags = {slug_tag(slug) for slug in params.getlist('tags')}
+            if params.get('author'):
+                tags.add(author_tag(params['author']))
+            if not tags:
+                tags = {ALL_RECIPES}
+            if params.get('ordering') == 'fastest' or (
+                params.get('cooking_time_min')
+                or params.get('cooking_time_max')
+            ):
+                tags.add(COOKING_TIME)
+            if params.get('ordering') == 'popular':
+                tags.add(POPULARITY)
+        tags.add(CATALOG)
+        for recipe in recipes:
+            tags.add(recipe_tag(recipe.pk))
+            tags.add(user_tag(recipe.author_id))
+        return tags
+
+    def get_shared_detail(self):
+        """
+        Рецепт без признаков избранного, списка покупок и подписки,
+        общий для всех пользователей, и теги для кэша.
+        """
+        self.object = get_object_or_404(
+            prepare_recipes(
+                Recipe.objects.all(), AnonymousUser(),
+                self.get_sparse_fields(RecipeListSerializer.Meta.fields)
+            ),
+            pk=self.kwargs['pk'],
+        )
+        return self.get_serializer(self.object).data, self.get_cache_tags()
+
+    def get_viewer_flags(self):
+        """Признаки рецепта для пользователя запроса или None."""
+        user = self.request.user
+        fields = self.get_sparse_fields(RecipeListSerializer.Meta.fields)
+        annotations = {
+            name: Exists(related.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            ))
+            for name, related in (
+                ('is_favorited', Favorite),
+                ('is_in_shopping_cart', ShoppingCart),
+            )
+            if name in fields
+        }
+        if 'author' in fields:
+            annotations['is_subscribed'] = Exists(Follow.objects.filter(
+                user=OuterRef('author'), author=user
+            ))
+        return Recipe.objects.filter(pk=self.kwargs['pk']).values(
+            'pk', **annotations
+        ).first()
+
+    @cache_anonymous
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Общая часть рецепта считается один раз для всех пользователей
+        через single_flight, признаки пользователя - одним запросом.
+        """
+        if request.user.is_anonymous or set(request.query_params) - {
+            self.fields_param, self.omit_param
+        }:
+            self.object = self.get_object()
+            return Response(self.get_serializer(self.object).data)
+        flags = self.get_viewer_flags()
+        if flags is None:
+            raise Http404
+        data = dict(single_flight.get(
+            f'recipe-detail:{get_cache_key(request)}',
+            self.get_shared_detail,
+        ))
+        for name in ('is_favorited', 'is_in_shopping_cart'):
+            if name in flags:
+                data[name] = flags[name]
+        if 'is_subscribed' in flags and data.get('author') is not None:
+            data['author'] = {
+                **data['author'], 'is_subscribed': flags['is_subscribed']
+            }
+        return Response(data)
+
+    @cache_anonymous
+    def list(self, request, *args, **kwargs):
+        if not self.is_compound():
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        recipes = list(queryset) if page is None else page
+        serializer = self.get_serializer(recipes, many=True)
+        if page is None:
+            response = Response({'results': serializer.data})
+        else:
+            response = self.get_paginated_response(serializer.data)
+        response.data['included'] = self.get_included(recipes)
+        return response
+
+    @staticmethod
+    def add_to(model, request, pk):
+        recipe = Recipe.objects.filter(id=pk).first()
+        if recipe is None:
+            return Response(
+                {'errors': 'Такого рецепта не существует.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        with transaction.atomic():
+            added = insert_or_ignore(model, user=request.user, recipe=recipe)
+            if added and model is ShoppingCart:
+                invalidate_on_commit(cart_tag(request.user.pk))
+            if added and model is Favorite:
+                update_favorite_count(recipe.pk, 1)
+                invalidate_on_commit(POPULARITY)
+            if added:
+                record_activity(model, recipe.pk, timezone.now())
+                publish(
+                    relation_event(model, 'added'),
+                    user_id=request.user.pk, recipe_id=recipe.pk
+                )
+        if not added:
+            return Response(
+                {'errors': 'Рецепт уже добавлен.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        serializer = ShortRecipeSerializer(recipe)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @staticmethod
+    def remove_from(model, request, pk):
+        with transaction.atomic():
+            deleted = delete_returning(
+                model, 'date_added', user=request.user, recipe=pk
+            )
+            if deleted and model is ShoppingCart:
+                invalidate_on_commit(cart_tag(request.user.pk))
+            if deleted and model is Favorite:
+                update_favorite_count(pk, -len(deleted))
+                invalidate_on_commit(POPULARITY)
+            for date_added in deleted:
+                record_activity(model, pk, date_added, delta=-1)
+                add_tombstone(model, int(pk), user=request.user)
+                publish(
+                    relation_event(model, 'removed'),
+                    user_id=request.user.pk, recipe_id=int(pk)
+                )
+        if deleted:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(Recipe, pk=pk)
+        return Response(
+            {'errors': 'Нет такого рецепта.'},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
     @action(
         detail=True,
         methods=['post', 'delete'],
         permission_classes=(IsAuthorOrReadOnly,)
     )
+    @idempotent
     def favorite(self, request, pk):
         if request.method == 'POST':
-            if request.user.favorite.filter(recipe__id=pk).exists():
-                return Response(
-                    {'errors': 'Рецепт уже добавлен.'},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            if not Recipe.objects.filter(id=pk).exists():
-                return Response(
-                    {'errors': 'Такого рецепта не существует.'},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            recipe = get_object_or_404(Recipe, id=pk)
-            Favorite.objects.create(user=request.user, recipe=recipe)
-            serializer = ShortRecipeSerializer(recipe)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        elif request.method == 'DELETE':
-            recipe = get_object_or_404(Recipe, pk=pk)
-            obj = obj = request.user.favorite.filter(recipe=recipe)
-            if obj.exists():
-                obj.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            return Response(
-                {'errors': 'Нет такого рецепта.'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            return self.add_to(Favorite, request, pk)
+        return self.remove_from(Favorite, request, pk)
 
     @action(
         detail=True,
         methods=['post', 'delete'],
         permission_classes=(IsAuthorOrReadOnly,)
     )
+    @idempotent
     def shopping_cart(self, request, pk):
         if request.method == 'POST':
-            if request.user.shopping_cart.filter(recipe__id=pk).exists():
-                return Response(
-                    {'errors': 'Рецепт уже добавлен.'},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            if not Recipe.objects.filter(id=pk).exists():
-                return Response(
-                    {'errors': 'Такого рецепта не существует.'},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-            recipe = get_object_or_404(Recipe, id=pk)
-            ShoppingCart.objects.create(user=request.user, recipe=recipe)
-            serializer = ShortRecipeSerializer(recipe)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        elif request.method == 'DELETE':
-            recipe = get_object_or_404(Recipe, pk=pk)
-            obj = request.user.shopping_cart.filter(recipe=recipe)
-            if obj.exists():
-                obj.delete()
-                return Response(status=status.HTTP_204_NO_CONTENT)
-            return Response(
-                {'errors': 'Нет такого рецепта.'},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+            return self.add_to(ShoppingCart, request, pk)
+        return self.remove_from(ShoppingCart, request, pk)
 
     @action(
         detail=False,
@@ -113,36 +363,93 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def download_shopping_cart(self, request):
-        recipes = (
-            RecipeIngredient.objects.filter(
-                recipe__shopping_cart__user=request.user
+        ingredients = single_flight.get(
+            f'shopping-cart:{request.user.pk}',
+            self.get_shopping_cart_ingredients,
+        )
+        if ingredients is None:
+            return HttpResponse(
+                'В списке покупок нет ни одного рецепта.',
+                content_type='text/plain'
             )
+        response = StreamingHttpResponse(
+            self.shopping_cart_lines(ingredients),
+            content_type='text/plain'
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="shopping_cart.txt"'
+        )
+        return response
+
+    def get_shopping_cart_ingredients(self):
+        """
+        Суммы ингредиентов списка покупок: кортежи (название, сумма,
+        единица измерения) или None для пустого списка, и теги для
+        кэша: список покупок, рецепты в нем и справочники. Текст
+        собирается из них построчно при отдаче ответа.
+        """
+        user = self.request.user
+        recipe_ids = list(ShoppingCart.objects.filter(
+            user=user
+        ).values_list('recipe_id', flat=True))
+        tags = [cart_tag(user.pk), CATALOG, *map(recipe_tag, recipe_ids)]
+        if not recipe_ids:
+            return None, tags
+        ingredients = (
+            RecipeIngredient.objects.filter(recipe__in=recipe_ids)
             .values('ingredient__name', 'ingredient__measurement_unit')
             .annotate(sum_total=Sum('amount'))
+            .values_list(
+                'ingredient__name', 'sum_total',
+                'ingredient__measurement_unit'
+            )
         )
-        if recipes:
-            shopping_cart_text = 'Список покупок:\n'
-            for index, ingredient in enumerate(recipes, start=1):
-                text = (
-                    f'{index}. '
-                    f'{ingredient["ingredient__name"]} '
-                    f'{ingredient["sum_total"]} '
-                    f'{ingredient["ingredient__measurement_unit"]}.'
-                )
-                shopping_cart_text += text + '\n'
+        return list(ingredients.iterator()), tags
 
-            response = HttpResponse(
-                shopping_cart_text,
-                content_type='text/plain'
+    @staticmethod
+    def shopping_cart_lines(ingredients):
+        yield 'Список покупок:\n'
+        for index, (name, total, unit) in enumerate(ingredients, start=1):
+            yield f'{index}. {name} {total} {unit}.\n'
+
+    @action(
+        detail=False,
+        methods=['get'],
+    )
+    def trending(self, request):
+        window = request.query_params.get('window', DEFAULT_WINDOW)
+        if window not in WINDOWS:
+            return Response(
+                {'errors': 'Допустимые окна: ' + ', '.join(WINDOWS)},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            response['Content-Disposition'] = (
-                'attachment; filename="shopping_cart.txt"'
+        ids = get_trending_ids(window)
+        recipes = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True
+        )
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=(IsAdminUser,)
+    )
+    def export(self, request):
+        images = request.query_params.get('images', IMAGES_REF)
+        if images not in IMAGE_MODES:
+            return Response(
+                {'errors': 'Неверный формат изображений.'},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            return response
-        return HttpResponse(
-            'В списке покупок нет ни одного рецепта.',
-            content_type='text/plain'
+        response = StreamingHttpResponse(
+            export_lines(images=images),
+            content_type='application/x-ndjson'
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="recipes.ndjson"'
         )
+        return response
 
 
 class IngredientsVewSet(viewsets.ReadOnlyModelViewSet):
@@ -152,10 +459,39 @@ class IngredientsVewSet(viewsets.ReadOnlyModelViewSet):
     filterset_class = IngredientFilter
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(SparseFieldsMixin, UserViewSet):
     queryset = User.objects.all()
     pagination_class = CustomPageNumberPagination
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if (
+            self.request.method not in permissions.SAFE_METHODS
+            or self.action not in ('list', 'retrieve', 'subscriptions')
+        ):
+            return queryset
+        fields = self.get_sparse_fields(
+            self.get_serializer_class().Meta.fields
+        )
+        queryset = queryset.only('id', *(fields & {
+            'username', 'first_name', 'last_name', 'email'
+        }))
+        user = self.request.user
+        if 'is_subscribed' in fields:
+            queryset = annotate_subscribed(queryset, user)
+        if 'recipes' in fields:
+            queryset = queryset.prefetch_related(Prefetch(
+                'recipes',
+                queryset=Recipe.objects.only(
+                    'id', 'author', 'name', 'image', 'image_width',
+                    'image_height', 'image_placeholder', 'cooking_time',
+                    'pub_date'
+                )
+            ))
+        elif 'recipes_count' in fields:
+            queryset = queryset.annotate(recipes_count=Count('recipes'))
+        return queryset
+
     @action(
         detail=False,
         methods=('get',),
@@ -163,13 +499,59 @@ class CustomUserViewSet(UserViewSet):
         serializer_class=SubscriptionSerializer,
     )
     def subscriptions(self, request):
+        return Response(single_flight.get(
+            f'subscriptions:{request.user.pk}:{get_cache_key(request)}',
+            self.get_subscriptions_page,
+        ))
+
+    def get_subscriptions_page(self):
+        """
+        Страница подписок и теги для кэша: подписки пользователя,
+        авторы на странице, их подписки и рецепты.
+        """
         user = self.request.user
         user_subscriptions = user.follower.all()
         authors = user_subscriptions.values_list('author_id', flat=True)
-        queryset = User.objects.filter(pk__in=authors)
+        queryset = self.get_queryset().filter(pk__in=authors)
         paginated_queryset = self.paginate_queryset(queryset)
         serializer = self.get_serializer(paginated_queryset, many=True)
-        return self.get_paginated_response(serializer.data)
+        fields = self.get_sparse_fields(SubscriptionSerializer.Meta.fields)
+        tags = {follows_tag(user.pk)}
+        for author in paginated_queryset:
+            tags |= {
+                user_tag(author.pk), author_tag(author.pk),
+                follows_tag(author.pk),
+            }
+            if 'recipes' in fields:
+                tags.update(
+                    recipe_tag(recipe.pk) for recipe in author.recipes.all()
+                )
+        return self.get_paginated_response(serializer.data).data, tags
+
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(permissions.IsAuthenticated,),
+        serializer_class=CustomUserSerializer,
+    )
+    def suggestions(self, request):
+        """
+        Авторы, которых стоит предложить пользователю, из таблицы
+        build_suggestions: один запрос по индексу (user, rank) без
+        авторов, на которых пользователь уже подписался.
+        """
+        user = request.user
+        fields = self.get_sparse_fields(CustomUserSerializer.Meta.fields)
+        queryset = annotate_subscribed(
+            User.objects.filter(suggested_to__user=user).filter(~Exists(
+                Follow.objects.filter(user=user, author=OuterRef('pk'))
+            )).only('id', *(fields & {
+                'username', 'first_name', 'last_name', 'email'
+            })),
+            user,
+        ).order_by('suggested_to__rank')
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
 
     @action(
         detail=True,
@@ -177,23 +559,37 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=(permissions.IsAuthenticated,),
         serializer_class=SubscriptionSerializer,
     )
+    @idempotent
     def subscribe(self, request, id=None):
         user = self.request.user
-        author = get_object_or_404(User, pk=id)
         if self.request.method == 'POST':
-            serializer = CreateSubscribeSerializer(
-                data={'author': author.id, 'user': user.id},
-                context={'request': request})
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
+            author = get_object_or_404(User, pk=id)
+            if user == author:
+                return Response(
+                    {'errors': 'Нельзя подписаться на себя.'},
+                    status=status.HTTP_400_BAD_REQUEST)
+            with transaction.atomic():
+                added = insert_or_ignore(Follow, user=user, author=author)
+                if added:
+                    invalidate_on_commit(follows_tag(user.pk))
+                    publish(FOLLOW_ADDED, user_id=user.pk, author_id=author.pk)
+            if not added:
+                return Response(
+                    {'errors': 'Вы уже подписаны'},
+                    status=status.HTTP_400_BAD_REQUEST)
             serializer = SubscriptionSerializer(
                 author, context={'request': request}
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
-        subscription = user.follower.filter(author=id)
-        if subscription.exists():
-            subscription.delete()
+        with transaction.atomic():
+            deleted = delete_returning(Follow, 'id', user=user, author=id)
+            if deleted:
+                invalidate_on_commit(follows_tag(user.pk))
+                add_tombstone(Follow, int(id), user=user)
+                publish(FOLLOW_REMOVED, user_id=user.pk, author_id=int(id))
+        if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
+        get_object_or_404(User, pk=id)
         return Response(
             {'error': 'Нет подписки для удаления.'},
             status=status.HTTP_400_BAD_REQUEST)
@@ -206,3 +602,170 @@ class CustomUserViewSet(UserViewSet):
     def me(self, request):
         serializer = self.get_serializer(request.user)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class EventTicketViewSet(viewsets.ViewSet):
+    """Одноразовый билет для подключения к /api/events/?ticket=."""
+    permission_classes = (IsAuthenticated,)
+
+    def create(self, request):
+        return Response(
+            {'ticket': issue_ticket(request.user.pk)},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class SyncViewSet(viewsets.ViewSet):
+    """
+    Изменения избранного, списка покупок и подписок пользователя
+    после токена ?since=. Без токена отдается полное состояние.
+    Клиент применяет сначала удаления, затем добавления, и повторяет
+    запрос с токеном next, пока has_more истинно.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def list(self, request):
+        try:
+            changes, next_token, has_more = get_changes(
+                request.user, request.query_params.get('since')
+            )
+        except InvalidToken:
+            return Response(
+                {'errors': 'Неверный токен синхронизации.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        except ExpiredToken:
+            return Response(
+                {'errors': 'Токен устарел, нужна полная синхронизация.'},
+                status=status.HTTP_410_GONE,
+            )
+        recipes = prepare_recipes(
+            Recipe.objects.filter(pk__in={
+                *changes['recipes'],
+                *changes['followed_recipes'],
+                *changes['favorites'],
+                *changes['shopping_cart'],
+            }),
+            request.user, set(RecipeListSerializer.Meta.fields),
+        )
+        return Response({
+            'recipes': RecipeListSerializer(
+                recipes, many=True, context={'request': request}
+            ).data,
+            'favorites': changes['favorites'],
+            'shopping_cart': changes['shopping_cart'],
+            'subscriptions': changes['subscriptions'],
+            'deleted': {
+                'recipes': changes['deleted_recipes'],
+                'favorites': changes['deleted_favorites'],
+                'shopping_cart': changes['deleted_shopping_cart'],
+                'subscriptions': changes['deleted_subscriptions'],
+            },
+            'next': next_token,
+            'has_more': has_more,
+        })
+
+
+class BootstrapViewSet(viewsets.ViewSet):
+    """
+    Все данные для старта приложения одним запросом: текущий
+    пользователь, теги, первые страницы рецептов, избранного и списка
+    покупок. ?sections=me,tags задает нужные разделы, ?limit= -
+    размер страниц. Связи рецептов всех разделов загружаются общими
+    запросами.
+    """
+    sections = ('me', 'tags', 'recipes', 'favorites', 'shopping_cart')
+    private_sections = ('me', 'favorites', 'shopping_cart')
+    # Раздел рецептов -> параметры фильтра того же списка в /api/recipes/.
+    recipe_sections = {
+        'recipes': {},
+        'favorites': {'is_favorited': 1},
+        'shopping_cart': {'is_in_shopping_cart': 1},
+    }
+
+    def get_sections(self):
+        value = self.request.query_params.get('sections', '')
+        requested = {name.strip() for name in value.split(',') if name.strip()}
+        return [
+            name for name in self.sections
+            if (not requested or name in requested) and (
+                self.request.user.is_authenticated
+                or name not in self.private_sections
+            )
+        ]
+
+    def get_recipe_queryset(self, section):
+        user = self.request.user
+        queryset = Recipe.objects.all()
+        if section == 'favorites':
+            queryset = queryset.filter(
+                pk__in=user.favorite.values('recipe_id')
+            )
+        elif section == 'shopping_cart':
+            queryset = queryset.filter(
+                pk__in=user.shopping_cart.values('recipe_id')
+            )
+        return prepare_recipes(
+            queryset, user, set(RecipeListSerializer.Meta.fields),
+            prefetch=False,
+        )
+
+    def get_tags(self):
+        key = f'bootstrap:tags:{get_versions([CATALOG])[CATALOG]}'
+        return cache.get_or_set(
+            key, lambda: TagSerializer(Tag.objects.all(), many=True).data
+        )
+
+    def get_cache_tags(self):
+        tags = {ALL_RECIPES, CATALOG}
+        for recipe in self.recipes:
+            tags.add(recipe_tag(recipe.pk))
+            tags.add(user_tag(recipe.author_id))
+        return tags
+
+    @cache_anonymous
+    def list(self, request):
+        sections = self.get_sections()
+        data = {}
+        if 'me' in sections:
+            data['me'] = CustomUserSerializer(
+                request.user, context={'request': request}
+            ).data
+        if 'tags' in sections:
+            data['tags'] = self.get_tags()
+        page_size = CustomPageNumberPagination().get_page_size(request)
+        pages = {}
+        for section in sections:
+            if section not in self.recipe_sections:
+                continue
+            queryset = self.get_recipe_queryset(section)
+            if self.recipe_sections[section]:
+                count = queryset.count(), False
+            else:
+                count = get_count(queryset)
+            pages[section] = (count, list(queryset[:page_size]))
+        self.recipes = [
+            recipe for _, recipes in pages.values() for recipe in recipes
+        ]
+        prefetch_related_objects(self.recipes, *get_recipe_prefetches(
+            request.user, set(RecipeListSerializer.Meta.fields)
+        ))
+        recipes_url = request.build_absolute_uri(reverse('api:recipe-list'))
+        for section, ((count, approximate), recipes) in pages.items():
+            next_url = None
+            if count > page_size:
+                next_url = f'{recipes_url}?' + urlencode({
+                    **self.recipe_sections[section],
+                    'page': 2,
+                    'limit': page_size,
+                })
+            data[section] = {
+                'count': count,
+                'next': next_url,
+                'previous': None,
+                'results': RecipeListSerializer(
+                    recipes, many=True, context={'request': request}
+                ).data,
+                'count_approximate': approximate,
+            }
+        return Response(data)
@@ -32,10 +32,13 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.middleware.ProfilingMiddleware',
+    'api.middleware.QueryLogMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -81,6 +84,15 @@ DATABASES = {
     }
 }
 """
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -113,6 +125,9 @@ STATIC_ROOT = BASE_DIR / 'collected_static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+SNAPSHOT_ROOT = MEDIA_ROOT / 'snapshots'
+SNAPSHOT_VERSIONS = 5
+
 
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
@@ -120,8 +135,22 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.TokenAuthentication",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
+COMPRESSION_MIN_SIZE = 1024
+
+COUNT_CACHE_TIMEOUT = 60
+COUNT_ESTIMATE_THRESHOLD = 10000
+
 DJOSER = {
     "SERIALIZERS": {
         "user_create": "api.serializers.CustomUserCreateSerializer",
@@ -137,3 +166,31 @@ DJOSER = {
 }
 
 CSRF_TRUSTED_ORIGINS = ['https://apkfoodgram.zapto.org']
+
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+TRENDING_CACHE_TIMEOUT = 5 * 60
+
+RESPONSE_CACHE_TIMEOUT = 10 * 60
+
+SYNC_TOMBSTONE_TTL = 30 * 24 * 60 * 60
+
+# С Redis события доходят до подключений всех воркеров, без него -
+# только до подключений воркера, который записал событие.
+LIVE_EVENTS_REDIS_URL = os.getenv('REDIS_URL')
+LIVE_EVENTS_BROKER = (
+    'api.live.RedisBroker' if LIVE_EVENTS_REDIS_URL
+    else 'api.live.LocalBroker'
+)
+LIVE_EVENTS_HEARTBEAT = 15
+LIVE_EVENTS_MAX_CONNECTIONS = 500
+LIVE_EVENTS_MAX_USER_CONNECTIONS = 5
+
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', 0))
+PROFILING_ROOT = BASE_DIR / 'profiles'
+PROFILING_MAX_PROFILES = 50
+
+QUERY_LOG_ENABLED = os.getenv('QUERY_LOG_ENABLED', 'False') == 'True'
+QUERY_LOG_FILE = BASE_DIR / 'query_log.json'
+QUERY_LOG_FLUSH_INTERVAL = 60
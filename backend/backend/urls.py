@@ -3,8 +3,11 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from api.admin import profile_urls
+
 urlpatterns = [
     path('api/', include('api.urls')),
+    path('admin/profiles/', include(profile_urls)),
     path('admin/', admin.site.urls),
 ]
 
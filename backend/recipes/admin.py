@@ -1,4 +1,6 @@
 from django.contrib import admin
+
+from .admin_filters import AuthorFilter, RecipeFilter, UserFilter
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                      ShoppingCart, Tag)
 
@@ -18,19 +20,20 @@ class RecipeAdmin(admin.ModelAdmin):
     search_fields = (
         'name',
         'author__username',
-        'tags',
     )
     list_filter = (
-        'name',
-        'author__username',
+        AuthorFilter,
         'tags',
     )
+    list_select_related = ('author',)
+    autocomplete_fields = ('author', 'tags')
+    show_full_result_count = False
     inlines = (RecipeIngredientAdmin,)
     empty_value_display = 'пусто'
 
-    @admin.display(description='В избранном')
+    @admin.display(description='В избранном', ordering='favorite_count')
     def get_favorite_count(self, obj):
-        return obj.favourite.count()
+        return obj.favorite_count
 
 
 @admin.register(Tag)
@@ -45,7 +48,10 @@ class TagAdmin(admin.ModelAdmin):
 class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('id', 'user', 'recipe')
     search_fields = ('user__username', 'recipe__name')
-    list_filter = ('user__username', 'recipe__name')
+    list_filter = (UserFilter, RecipeFilter)
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
     empty_value_display = 'пусто'
 
 
@@ -77,8 +83,8 @@ class ShoppingCartAdmin(admin.ModelAdmin):
         'user__username',
         'recipe__name',
     )
-    list_filter = (
-        'user__username',
-        'recipe__name',
-    )
+    list_filter = (UserFilter, RecipeFilter)
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
     empty_value_display = 'пусто'
@@ -0,0 +1,44 @@
+from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    Фильтр с полем ввода вместо списка значений.
+    Не строит список всех значений поля, поэтому не читает всю таблицу.
+    """
+    template = 'admin/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            'query_parts': [
+                (name, value) for name, value in changelist.params.items()
+                if name not in (self.parameter_name, PAGE_VAR)
+            ],
+        }
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.parameter_name: self.value()})
+        return queryset
+
+
+class AuthorFilter(InputFilter):
+    title = 'автору (логин)'
+    parameter_name = 'author__username'
+
+
+class UserFilter(InputFilter):
+    title = 'пользователю (логин)'
+    parameter_name = 'user__username'
+
+
+class RecipeFilter(InputFilter):
+    title = 'рецепту (название)'
+    parameter_name = 'recipe__name'
@@ -0,0 +1,72 @@
+import base64
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 40
+PLACEHOLDER_BACKGROUND = 'white'
+EXIF_ORIENTATION = 0x0112
+# Значения Orientation, при которых изображение повернуто на 90°:
+# ширина и высота на экране меняются местами.
+ROTATED = (5, 6, 7, 8)
+
+
+def flatten(image):
+    """
+    RGB-копия изображения. Прозрачные области заливаются белым,
+    а не черным, как при простом convert('RGB').
+    """
+    if image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    ):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, PLACEHOLDER_BACKGROUND)
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def get_image_meta(file):
+    """
+    Размеры изображения и превью-заглушка: data URI JPEG не больше
+    PLACEHOLDER_SIZE пикселей по большей стороне, несколько сотен байт.
+    Клиент растягивает его с размытием, пока грузится изображение.
+    Размеры и заглушка учитывают поворот из EXIF, как его показывает
+    браузер. Возвращает (ширина, высота, заглушка).
+    """
+    with Image.open(file) as image:
+        width, height = image.size
+        if image.getexif().get(EXIF_ORIENTATION) in ROTATED:
+            width, height = height, width
+        image.draft('RGB', (PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+        thumbnail = flatten(ImageOps.exif_transpose(image))
+    thumbnail.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    buffer = BytesIO()
+    thumbnail.save(buffer, 'JPEG', quality=PLACEHOLDER_QUALITY)
+    return width, height, 'data:image/jpeg;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+def set_image_meta(recipe):
+    """
+    Заполняет размеры и заглушку изображения рецепта. Новый файл
+    возвращается в начало, чтобы его можно было сохранить, уже
+    сохраненный читается из хранилища и закрывается.
+    Если изображение не читается, поля остаются пустыми.
+    """
+    file = recipe.image
+    if not file:
+        return
+    try:
+        file.seek(0)
+        meta = get_image_meta(file)
+    except (OSError, ValueError):
+        meta = None, None, ''
+    finally:
+        if file._committed:
+            file.close()
+        elif not file.closed:
+            file.seek(0)
+    recipe.image_width, recipe.image_height, recipe.image_placeholder = meta
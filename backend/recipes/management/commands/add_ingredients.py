@@ -1,5 +1,6 @@
 import json
 from django.core.management import BaseCommand
+from django.db import transaction
 from recipes.models import Ingredient
 
 JSON_FILE_PATH = './data/ingredients.json'
@@ -17,6 +18,7 @@ class Command(BaseCommand):
     def load_ingredients_data(self):
         with open(JSON_FILE_PATH, 'r', encoding='utf-8') as json_file:
             data = json.load(json_file)
+        with transaction.atomic():
             for item in data:
                 Ingredient.objects.get_or_create(
                     name=item['name'],
@@ -0,0 +1,44 @@
+from django.core.management import BaseCommand
+
+from recipes.images import set_image_meta
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = """
+        Computes image dimensions and the inline placeholder for recipes
+        that do not have them yet. Each stored file is read once: recipes
+        sharing an image are updated together, without touching
+        updated_at.
+        """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute for every recipe, not only missing ones.',
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(image_placeholder='')
+        names = recipes.order_by('image').values_list(
+            'image', flat=True
+        ).distinct()
+        updated = failed = 0
+        for name in names.iterator():
+            recipe = Recipe(image=name)
+            set_image_meta(recipe)
+            if not recipe.image_placeholder:
+                failed += 1
+                self.stderr.write(f'Cannot read image {name}.')
+                continue
+            updated += recipes.filter(image=name).update(
+                image_width=recipe.image_width,
+                image_height=recipe.image_height,
+                image_placeholder=recipe.image_placeholder,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{updated} recipes were updated, {failed} images failed.'
+        ))
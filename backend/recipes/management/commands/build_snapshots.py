@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+
+from recipes.snapshots import build_snapshots
+
+
+class Command(BaseCommand):
+    help = """
+        Renders static JSON snapshots of tags and ingredients
+        (with .gz and .br copies) for the gateway to serve directly.
+        Snapshots are also rebuilt automatically on Tag and Ingredient
+        changes.
+        """
+
+    def handle(self, *args, **options):
+        manifest = build_snapshots()
+        self.stdout.write(self.style.SUCCESS(
+            'Snapshots were built: ' + ', '.join(manifest.values())
+        ))
@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management import BaseCommand
+
+from recipes.ndjson import CHUNK_SIZE, IMAGE_MODES, IMAGES_REF, export_lines
+
+
+class Command(BaseCommand):
+    help = """
+        Exports recipes to a newline-delimited JSON file.
+        Recipes are read with a server-side cursor, so memory usage
+        does not depend on the number of recipes.
+        """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', default='-',
+            help='Output file, "-" for stdout.'
+        )
+        parser.add_argument(
+            '--images', choices=IMAGE_MODES, default=IMAGES_REF,
+            help='Export images as storage references or base64 data.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=CHUNK_SIZE,
+            help='Number of recipes fetched from the database at once.'
+        )
+
+    def handle(self, *args, **options):
+        lines = export_lines(
+            images=options['images'], chunk_size=options['chunk_size']
+        )
+        if options['output'] == '-':
+            sys.stdout.writelines(lines)
+            return
+        count = 0
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            for line in lines:
+                output.write(line)
+                count += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'{count} recipes were exported.')
+        )
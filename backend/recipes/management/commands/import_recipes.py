@@ -0,0 +1,57 @@
+from django.core.exceptions import ValidationError
+from django.core.management import BaseCommand, CommandError
+
+from recipes.ndjson import CHUNK_SIZE, import_batch, parse_line
+
+
+class Command(BaseCommand):
+    help = """
+        Imports recipes from a newline-delimited JSON file
+        made by export_recipes.
+        Every batch is saved in its own transaction. If something goes
+        wrong, the command reports the offset to resume from with
+        --offset.
+        """
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='NDJSON file to import.')
+        parser.add_argument(
+            '--offset', type=int, default=0,
+            help='Number of lines to skip from the start of the file.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=CHUNK_SIZE,
+            help='Number of recipes saved in one transaction.'
+        )
+
+    def save_batch(self, batch, offset):
+        try:
+            return import_batch(batch)
+        except ValidationError as error:
+            raise CommandError(
+                f'{error.message} Resume with --offset {offset}.'
+            )
+
+    def handle(self, *args, **options):
+        offset = options['offset']
+        imported = 0
+        batch = []
+        with open(options['file'], 'r', encoding='utf-8') as source:
+            for line_number, line in enumerate(source, start=1):
+                if line_number <= options['offset'] or not line.strip():
+                    continue
+                try:
+                    batch.append((line_number, parse_line(line, line_number)))
+                except ValidationError as error:
+                    raise CommandError(
+                        f'{error.message} Resume with --offset {offset}.'
+                    )
+                if len(batch) >= options['batch_size']:
+                    imported += self.save_batch(batch, offset)
+                    offset = line_number
+                    batch = []
+        if batch:
+            imported += self.save_batch(batch, offset)
+        self.stdout.write(
+            self.style.SUCCESS(f'{imported} recipes were imported.')
+        )
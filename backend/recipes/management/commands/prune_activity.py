@@ -0,0 +1,15 @@
+from django.core.management import BaseCommand
+
+from recipes.trending import prune_activity
+
+
+class Command(BaseCommand):
+    help = """
+        Deletes hourly favorite and shopping cart counters older than
+        the longest trending window. Run it periodically, e.g. daily.
+        """
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(
+            f'{prune_activity()} hourly buckets were pruned.'
+        ))
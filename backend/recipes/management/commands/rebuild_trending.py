@@ -0,0 +1,21 @@
+from django.core.management import BaseCommand
+
+from api.cache import POPULARITY, invalidate
+from recipes.trending import rebuild_activity, recount_favorites
+
+
+class Command(BaseCommand):
+    help = """
+        Rebuilds hourly favorite and shopping cart counters used by
+        /api/recipes/trending/ from the current favorites and carts,
+        and the favorite counters used by ?ordering=popular.
+        """
+
+    def handle(self, *args, **options):
+        count = rebuild_activity()
+        recipes = recount_favorites()
+        invalidate(POPULARITY)
+        self.stdout.write(self.style.SUCCESS(
+            f'{count} hourly buckets were rebuilt, '
+            f'{recipes} favorite counters were recounted.'
+        ))
@@ -0,0 +1,32 @@
+# Generated by Django 4.1.4 on 2026-10-19 09:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                db_index=True,
+                upload_to="foodgram_backend/images/",
+                verbose_name="Изображение",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="tag",
+            name="slug",
+            field=models.SlugField(
+                help_text="Введите слаг тега",
+                max_length=100,
+                unique=True,
+                verbose_name="Уникальный слаг",
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.1.4 on 2026-10-19 09:38
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0002_alter_recipe_image_alter_tag_slug"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="shoppingcart",
+            name="date_added",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name="дата создания",
+            ),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name="RecipeActivity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("hour", models.DateTimeField(db_index=True, verbose_name="Час")),
+                (
+                    "favorites",
+                    models.IntegerField(
+                        default=0, verbose_name="Добавлений в избранное"
+                    ),
+                ),
+                (
+                    "shopping_carts",
+                    models.IntegerField(
+                        default=0, verbose_name="Добавлений в список покупок"
+                    ),
+                ),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="activity",
+                        to="recipes.recipe",
+                        verbose_name="Рецепт",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Активность по рецепту",
+                "verbose_name_plural": "Активность по рецептам",
+                "ordering": ("-hour",),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="recipeactivity",
+            constraint=models.UniqueConstraint(
+                fields=("recipe", "hour"), name="unique_recipe_hour"
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.1.4 on 2026-10-19 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0003_recipe_activity"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="favorite",
+            index=models.Index(
+                fields=["recipe", "user"], name="favorite_recipe_user_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["-pub_date"], name="recipe_pub_date_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["author", "-pub_date"], name="recipe_author_pub_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipeingredient",
+            index=models.Index(
+                fields=["recipe", "ingredient"],
+                include=("amount",),
+                name="recipe_ingredient_amount_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="shoppingcart",
+            index=models.Index(fields=["recipe", "user"], name="cart_recipe_user_idx"),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.1.4 on 2026-10-19 09:51
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def set_updated_at(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Recipe.objects.update(updated_at=F("pub_date"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True, db_index=True, verbose_name="Дата изменения"
+            ),
+        ),
+        migrations.RunPython(set_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="favorite",
+            index=models.Index(
+                fields=["user", "date_added"], name="favorite_user_added_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["author", "updated_at"], name="recipe_author_updated_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="shoppingcart",
+            index=models.Index(
+                fields=["user", "date_added"], name="cart_user_added_idx"
+            ),
+        ),
+    ]
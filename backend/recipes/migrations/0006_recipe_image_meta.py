@@ -0,0 +1,37 @@
+# Generated by Django 4.1.4 on 2026-10-19 09:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_recipe_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="image_height",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Высота изображения"
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="image_placeholder",
+            field=models.TextField(
+                blank=True,
+                editable=False,
+                help_text="Data URI уменьшенной копии для показа до загрузки.",
+                verbose_name="Превью изображения",
+            ),
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="image_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Ширина изображения"
+            ),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 4.1.4 on 2026-10-19 10:09
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def set_favorite_count(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Favorite = apps.get_model("recipes", "Favorite")
+    Recipe.objects.update(
+        favorite_count=Coalesce(
+            Subquery(
+                Favorite.objects.filter(recipe=OuterRef("pk"))
+                .order_by()
+                .values("recipe")
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0,
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0006_recipe_image_meta"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="recipe",
+            name="recipe_pub_date_idx",
+        ),
+        migrations.AddField(
+            model_name="recipe",
+            name="favorite_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="В избранном"
+            ),
+        ),
+        migrations.RunPython(set_favorite_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["-pub_date", "-id"], name="recipe_newest_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["cooking_time", "-pub_date", "-id"], name="recipe_fastest_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(
+                fields=["-favorite_count", "-pub_date", "-id"],
+                name="recipe_popular_idx",
+            ),
+        ),
+    ]
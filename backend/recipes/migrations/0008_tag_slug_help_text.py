@@ -0,0 +1,23 @@
+# Generated by Django 4.1.4 on 2026-10-19 10:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_recipe_orderings"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="tag",
+            name="slug",
+            field=models.SlugField(
+                help_text="Введите слаг тега",
+                max_length=100,
+                unique=True,
+                verbose_name="Уникальный слаг",
+            ),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.1.4 on 2026-10-19 10:23
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_references(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    ImageBlob = apps.get_model("recipes", "ImageBlob")
+    rows = (
+        Recipe.objects.exclude(image="")
+        .order_by()
+        .values("image")
+        .annotate(total=Count("pk"))
+    )
+    ImageBlob.objects.bulk_create(
+        (
+            ImageBlob(name=row["image"], reference_count=row["total"])
+            for row in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0008_tag_slug_help_text"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageBlob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(max_length=100, unique=True, verbose_name="Файл"),
+                ),
+                (
+                    "reference_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Число ссылок"),
+                ),
+            ],
+            options={
+                "verbose_name": "Файл изображения",
+                "verbose_name_plural": "Файлы изображений",
+            },
+        ),
+        migrations.RunPython(count_references, migrations.RunPython.noop),
+    ]
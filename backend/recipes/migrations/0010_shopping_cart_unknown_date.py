@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+from django.db import migrations
+from django.db.migrations.recorder import MigrationRecorder
+
+# Дата добавления в список покупок, которая неизвестна: строки,
+# созданные до появления поля.
+UNKNOWN_DATE_ADDED = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+
+def mark_unknown_dates(apps, schema_editor):
+    """
+    0003_recipe_activity заполнила date_added существующих строк
+    временем миграции, и rebuild_trending считал их добавленными в этот
+    час. Такие строки созданы не позже применения 0003.
+    """
+    ShoppingCart = apps.get_model("recipes", "ShoppingCart")
+    applied = (
+        MigrationRecorder(schema_editor.connection)
+        .migration_qs.filter(app="recipes", name="0003_recipe_activity")
+        .values_list("applied", flat=True)
+        .first()
+    )
+    if applied is not None:
+        ShoppingCart.objects.filter(date_added__lte=applied).update(
+            date_added=UNKNOWN_DATE_ADDED
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0009_image_blob"),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_unknown_dates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.1.4 on 2026-10-19 10:50
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0010_shopping_cart_unknown_date"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                db_index=True,
+                storage=recipes.storage.get_image_storage,
+                upload_to="foodgram_backend/images/",
+                verbose_name="Изображение",
+            ),
+        ),
+    ]
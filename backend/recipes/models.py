@@ -3,6 +3,8 @@ from django.core.validators import (
     MinValueValidator, MaxValueValidator, RegexValidator)
 from django.db import models
 
+from .storage import get_image_storage
+
 User = get_user_model()
 
 
@@ -92,6 +94,26 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name='Изображение',
         upload_to='foodgram_backend/images/',
+        storage=get_image_storage,
+        db_index=True,
+    )
+    image_width = models.PositiveIntegerField(
+        'Ширина изображения',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота изображения',
+        null=True,
+        blank=True,
+        editable=False,
+    )
+    image_placeholder = models.TextField(
+        'Превью изображения',
+        blank=True,
+        editable=False,
+        help_text='Data URI уменьшенной копии для показа до загрузки.',
     )
     text = models.TextField(
         verbose_name='Описание',
@@ -124,11 +146,44 @@ class Recipe(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True,
+    )
+    favorite_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        # Индексы сортировок ?ordering=, последние поля - -pub_date и -id,
+        # чтобы порядок был полным и годился для пагинации по ключу.
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='recipe_newest_idx'
+            ),
+            models.Index(
+                fields=['cooking_time', '-pub_date', '-id'],
+                name='recipe_fastest_idx'
+            ),
+            models.Index(
+                fields=['-favorite_count', '-pub_date', '-id'],
+                name='recipe_popular_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'updated_at'],
+                name='recipe_author_updated_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -168,6 +223,13 @@ class RecipeIngredient(models.Model):
                 name='unique_recipe_ingredient_pair',
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'ingredient'],
+                include=['amount'],
+                name='recipe_ingredient_amount_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.ingredient.name} - {self.amount}"
@@ -200,6 +262,14 @@ class Favorite(models.Model):
                 fields=['user', 'recipe'], name='unique_favorite'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'], name='favorite_recipe_user_idx'
+            ),
+            models.Index(
+                fields=['user', 'date_added'], name='favorite_user_added_idx'
+            ),
+        ]
 
     def __str__(self):
         return (f'{self.user.username} добавил '
@@ -219,6 +289,10 @@ class ShoppingCart(models.Model):
         related_name='shopping_cart',
         verbose_name='Рецепт',
     )
+    date_added = models.DateTimeField(
+        verbose_name='дата создания',
+        auto_now_add=True
+    )
 
     class Meta:
         verbose_name = 'Список покупок'
@@ -229,7 +303,73 @@ class ShoppingCart(models.Model):
                 fields=['user', 'recipe'], name='unique_shopping_cart'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['recipe', 'user'], name='cart_recipe_user_idx'
+            ),
+            models.Index(
+                fields=['user', 'date_added'], name='cart_user_added_idx'
+            ),
+        ]
 
     def __str__(self):
         return (f'{self.user.username} добавил '
                 f'{self.recipe.name} в список покупок.')
+
+
+class RecipeActivity(models.Model):
+    """Число добавлений рецепта в избранное и покупки за час."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='activity',
+        verbose_name='Рецепт',
+    )
+    hour = models.DateTimeField(
+        'Час',
+        db_index=True,
+    )
+    favorites = models.IntegerField(
+        'Добавлений в избранное',
+        default=0,
+    )
+    shopping_carts = models.IntegerField(
+        'Добавлений в список покупок',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Активность по рецепту'
+        verbose_name_plural = 'Активность по рецептам'
+        ordering = ('-hour',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'hour'], name='unique_recipe_hour'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} {self.hour:%Y-%m-%d %H}:00'
+
+
+class ImageBlob(models.Model):
+    """
+    Число рецептов, которые ссылаются на файл изображения. Файл
+    удаляется, когда счетчик падает до нуля.
+    """
+    name = models.CharField(
+        'Файл',
+        max_length=100,
+        unique=True,
+    )
+    reference_count = models.PositiveIntegerField(
+        'Число ссылок',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Файл изображения'
+        verbose_name_plural = 'Файлы изображений'
+
+    def __str__(self):
+        return f'{self.name} ({self.reference_count})'
@@ -0,0 +1,312 @@
+import base64
+import binascii
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from api.cache import (ALL_RECIPES, COOKING_TIME, author_tag,
+                       invalidate_on_commit, slug_tag)
+from api.outbox import RECIPE_CREATED, publish
+
+from .images import set_image_meta
+from .models import (MAX_NUMBERS, MIN_NUMBERS, Ingredient, Recipe,
+                     RecipeIngredient, Tag)
+from .storage import delete_unused_image, retain_image
+
+User = get_user_model()
+
+CHUNK_SIZE = 500
+IMAGES_REF = 'ref'
+IMAGES_BASE64 = 'base64'
+IMAGE_MODES = (IMAGES_REF, IMAGES_BASE64)
+REQUIRED_KEYS = (
+    'author', 'name', 'text', 'cooking_time', 'tags', 'ingredients', 'image'
+)
+INGREDIENT_KEYS = ('name', 'measurement_unit', 'amount')
+
+
+def export_queryset():
+    """Рецепты со всеми связями, нужными для выгрузки."""
+    return (
+        Recipe.objects.select_related('author')
+        .prefetch_related('tags', 'recipe_ingredients__ingredient')
+        .order_by('pk')
+    )
+
+
+def recipe_to_dict(recipe, images=IMAGES_REF):
+    """Представление рецепта для одной строки NDJSON."""
+    image = {'name': recipe.image.name}
+    if images == IMAGES_BASE64 and recipe.image:
+        with recipe.image.open('rb') as image_file:
+            image['data'] = base64.b64encode(image_file.read()).decode()
+    return {
+        'id': recipe.pk,
+        'author': recipe.author.email,
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'pub_date': recipe.pub_date.isoformat(),
+        'tags': [tag.slug for tag in recipe.tags.all()],
+        'ingredients': [
+            {
+                'name': item.ingredient.name,
+                'measurement_unit': item.ingredient.measurement_unit,
+                'amount': item.amount,
+            }
+            for item in recipe.recipe_ingredients.all()
+        ],
+        'image': image,
+    }
+
+
+def export_lines(queryset=None, images=IMAGES_REF, chunk_size=CHUNK_SIZE):
+    """
+    Генератор строк NDJSON.
+    Рецепты читаются серверным курсором порциями по chunk_size,
+    связи подгружаются для каждой порции отдельно.
+    """
+    if queryset is None:
+        queryset = export_queryset()
+    for recipe in queryset.iterator(chunk_size=chunk_size):
+        yield json.dumps(
+            recipe_to_dict(recipe, images), ensure_ascii=False
+        ) + '\n'
+
+
+def is_number(value):
+    """Целое из диапазона модели; bool в JSON - не число."""
+    return (
+        isinstance(value, int) and not isinstance(value, bool)
+        and MIN_NUMBERS <= value <= MAX_NUMBERS
+    )
+
+
+def is_text(value):
+    return isinstance(value, str) and bool(value)
+
+
+def parse_line(line, line_number):
+    """
+    Разбирает и проверяет одну строку выгрузки: после проверки
+    запись можно сохранять, не проверяя типы и ключи.
+    """
+    try:
+        record = json.loads(line)
+    except ValueError as error:
+        raise ValidationError(f'Строка {line_number}: {error}')
+    if not isinstance(record, dict):
+        raise ValidationError(f'Строка {line_number}: ожидается объект.')
+    missing = [key for key in REQUIRED_KEYS if key not in record]
+    if missing:
+        raise ValidationError(
+            f'Строка {line_number}: нет полей {", ".join(missing)}.'
+        )
+    if not all(
+        is_text(record[key]) for key in ('author', 'name', 'text')
+    ):
+        raise ValidationError(
+            f'Строка {line_number}: author, name и text должны быть '
+            'непустыми строками.'
+        )
+    if not is_number(record['cooking_time']):
+        raise ValidationError(
+            f'Строка {line_number}: неверное время приготовления.'
+        )
+    if not (
+        isinstance(record['tags'], list)
+        and isinstance(record['ingredients'], list)
+    ):
+        raise ValidationError(
+            f'Строка {line_number}: tags и ingredients должны быть списками.'
+        )
+    if not record['tags'] or not record['ingredients']:
+        raise ValidationError(
+            f'Строка {line_number}: нужны теги и ингредиенты.'
+        )
+    if not all(is_text(slug) for slug in record['tags']):
+        raise ValidationError(
+            f'Строка {line_number}: теги должны быть строками.'
+        )
+    for item in record['ingredients']:
+        if not isinstance(item, dict) or any(
+            key not in item for key in INGREDIENT_KEYS
+        ):
+            raise ValidationError(
+                f'Строка {line_number}: у ингредиента должны быть поля '
+                f'{", ".join(INGREDIENT_KEYS)}.'
+            )
+        if not is_text(item['name']) or not is_text(
+            item['measurement_unit']
+        ):
+            raise ValidationError(
+                f'Строка {line_number}: неверное название или единица '
+                'измерения ингредиента.'
+            )
+        if not is_number(item['amount']):
+            raise ValidationError(
+                f'Строка {line_number}: неверное количество ингредиента.'
+            )
+    pairs = {
+        (item['name'], item['measurement_unit'])
+        for item in record['ingredients']
+    }
+    if len(pairs) != len(record['ingredients']):
+        raise ValidationError(
+            f'Строка {line_number}: ингредиенты должны быть уникальными.'
+        )
+    if 'pub_date' in record:
+        pub_date = (
+            parse_datetime(record['pub_date'])
+            if isinstance(record['pub_date'], str) else None
+        )
+        if pub_date is None or pub_date.tzinfo is None:
+            raise ValidationError(
+                f'Строка {line_number}: pub_date должна быть датой ISO 8601 '
+                'с часовым поясом.'
+            )
+        record['pub_date'] = pub_date
+    image = record['image']
+    if not isinstance(image, dict) or not all(
+        isinstance(image.get(key, ''), str) for key in ('name', 'data')
+    ):
+        raise ValidationError(
+            f'Строка {line_number}: image должен быть объектом '
+            'со строками name и data.'
+        )
+    if not image.get('name') and not image.get('data'):
+        raise ValidationError(f'Строка {line_number}: нет изображения.')
+    if image.get('data'):
+        try:
+            image['data'] = base64.b64decode(image['data'], validate=True)
+        except binascii.Error:
+            raise ValidationError(
+                f'Строка {line_number}: изображение не в base64.'
+            )
+    return record
+
+
+def _image_value(image):
+    if image.get('data'):
+        name = image.get('name', '').rsplit('/', 1)[-1] or 'image.png'
+        return ContentFile(image['data'], name=name)
+    return image['name']
+
+
+def import_batch(batch):
+    """
+    Сохраняет порцию проверенных записей одной транзакцией.
+    batch - список пар (номер строки, запись).
+    Файлы изображений пишутся в хранилище при вставке рецептов;
+    если транзакция откатилась, записанные файлы удаляются.
+    """
+    authors = {
+        user.email: user for user in User.objects.filter(
+            email__in={record['author'] for _, record in batch}
+        )
+    }
+    tags = {
+        tag.slug: tag for tag in Tag.objects.filter(
+            slug__in={
+                slug for _, record in batch for slug in record['tags']
+            }
+        )
+    }
+    ingredient_names = {
+        item['name'] for _, record in batch for item in record['ingredients']
+    }
+    ingredients = {
+        (ingredient.name, ingredient.measurement_unit): ingredient
+        for ingredient in Ingredient.objects.filter(
+            name__in=ingredient_names
+        )
+    }
+    recipes = []
+    for line_number, record in batch:
+        if record['author'] not in authors:
+            raise ValidationError(
+                f'Строка {line_number}: автор {record["author"]} не найден.'
+            )
+        unknown_tags = set(record['tags']) - tags.keys()
+        if unknown_tags:
+            raise ValidationError(
+                f'Строка {line_number}: теги {", ".join(unknown_tags)} '
+                'не найдены.'
+            )
+        for item in record['ingredients']:
+            if (item['name'], item['measurement_unit']) not in ingredients:
+                raise ValidationError(
+                    f'Строка {line_number}: ингредиент {item["name"]} '
+                    'не найден.'
+                )
+        recipes.append(Recipe(
+            author=authors[record['author']],
+            name=record['name'],
+            text=record['text'],
+            cooking_time=record['cooking_time'],
+            image=_image_value(record['image']),
+        ))
+        set_image_meta(recipes[-1])
+    uploads = [recipe for recipe in recipes if not recipe.image._committed]
+    try:
+        save_batch(recipes, batch, tags, ingredients)
+    except BaseException:
+        for recipe in uploads:
+            if recipe.image._committed:
+                delete_unused_image(recipe.image.name)
+        raise
+    return len(recipes)
+
+
+def save_batch(recipes, batch, tags, ingredients):
+    """
+    bulk_create не вызывает сигналы, поэтому события outbox и сброс
+    кэша списков делаются здесь, как при создании рецепта через API.
+    """
+    with transaction.atomic():
+        for recipe in recipes:
+            if recipe.image._committed:
+                retain_image(recipe.image.name)
+        Recipe.objects.bulk_create(recipes)
+        # pub_date - auto_now_add, bulk_create ставит текущее время;
+        # дата из выгрузки возвращается отдельным UPDATE.
+        dated = []
+        for recipe, (_, record) in zip(recipes, batch):
+            if 'pub_date' in record:
+                recipe.pub_date = record['pub_date']
+                dated.append(recipe)
+        Recipe.objects.bulk_update(dated, ['pub_date'])
+        recipe_tags = []
+        recipe_ingredients = []
+        for recipe, (_, record) in zip(recipes, batch):
+            recipe_tags.extend(
+                Recipe.tags.through(recipe=recipe, tag=tags[slug])
+                for slug in set(record['tags'])
+            )
+            recipe_ingredients.extend(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient=ingredients[
+                        (item['name'], item['measurement_unit'])
+                    ],
+                    amount=item['amount'],
+                )
+                for item in record['ingredients']
+            )
+        Recipe.tags.through.objects.bulk_create(recipe_tags)
+        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        for recipe in recipes:
+            publish(
+                RECIPE_CREATED, recipe_id=recipe.pk,
+                author_id=recipe.author_id
+            )
+        invalidate_on_commit(
+            ALL_RECIPES, COOKING_TIME,
+            *{author_tag(recipe.author_id) for recipe in recipes},
+            *{slug_tag(slug) for _, record in batch
+              for slug in record['tags']},
+        )
@@ -0,0 +1,59 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from api.cache import POPULARITY, invalidate_on_commit
+
+from .images import set_image_meta
+from .models import Favorite, Ingredient, Recipe, Tag
+from .snapshots import schedule_snapshots
+from .storage import release_image
+from .trending import update_favorite_count
+
+
+@receiver(pre_save, sender=Recipe)
+def release_replaced_image(sender, instance, **kwargs):
+    if instance.pk is None:
+        return
+    old_image = (
+        Recipe.objects.filter(pk=instance.pk)
+        .values_list('image', flat=True).first()
+    )
+    if old_image and old_image != instance.image.name:
+        release_image(old_image)
+
+
+@receiver(pre_save, sender=Recipe)
+def fill_image_meta(sender, instance, **kwargs):
+    """Размеры и заглушка считаются один раз, при загрузке файла."""
+    if instance.image and not instance.image._committed:
+        set_image_meta(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def release_deleted_image(sender, instance, **kwargs):
+    release_image(instance.image.name)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def rebuild_snapshots(sender, **kwargs):
+    schedule_snapshots()
+
+
+@receiver(post_save, sender=Favorite)
+def count_added_favorite(sender, instance, created, **kwargs):
+    """API добавляет и удаляет избранное без сигналов и считает сам."""
+    if created:
+        update_favorite_count(instance.recipe_id, 1)
+        invalidate_on_commit(POPULARITY)
+
+
+@receiver(post_delete, sender=Favorite)
+def count_deleted_favorite(sender, instance, origin=None, **kwargs):
+    """Избранное удаляемого рецепта не пересчитывается."""
+    if isinstance(origin, Recipe) or getattr(origin, 'model', None) is Recipe:
+        return
+    update_favorite_count(instance.recipe_id, -1)
+    invalidate_on_commit(POPULARITY)
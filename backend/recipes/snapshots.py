@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Сколько последних версий снимка хранится. Версионные файлы отдаются
+# с Cache-Control: immutable, и клиент со старым манифестом еще
+# какое-то время запрашивает прежние версии.
+SNAPSHOT_VERSIONS = 5
+SNAPSHOT_SUFFIXES = ('', '.gz', '.br')
+
+
+def get_snapshot_root():
+    return Path(getattr(
+        settings, 'SNAPSHOT_ROOT', Path(settings.MEDIA_ROOT) / 'snapshots'
+    ))
+
+
+def get_snapshots():
+    """Снимки в формате ответа API: имя файла -> данные."""
+    from api.serializers import IngredientSerializer, TagSerializer
+
+    from .models import Ingredient, Tag
+
+    return {
+        'tags': TagSerializer(Tag.objects.all(), many=True).data,
+        'ingredients': IngredientSerializer(
+            Ingredient.objects.all(), many=True
+        ).data,
+    }
+
+
+def write_atomic(path, content):
+    fd, temp_path = tempfile.mkstemp(dir=path.parent)
+    with os.fdopen(fd, 'wb') as temp_file:
+        temp_file.write(content)
+    os.chmod(temp_path, 0o644)
+    os.replace(temp_path, path)
+
+
+def prune_versions(root, name, keep):
+    """Удаляет версии снимка name, кроме keep последних записанных."""
+    versions = sorted(
+        root.glob(f'{name}.*.json'),
+        key=lambda path: path.stat().st_mtime, reverse=True,
+    )
+    for old in versions[keep:]:
+        for suffix in SNAPSHOT_SUFFIXES:
+            old.with_name(old.name + suffix).unlink(missing_ok=True)
+
+
+def write_snapshot(root, name, content):
+    """
+    Пишет снимок под версионным именем name.<хеш>.json и под постоянным
+    name.json вместе с заранее сжатыми копиями .gz и .br.
+    Из прежних версий остаются SNAPSHOT_VERSIONS последних.
+    Возвращает версионное имя.
+    """
+    version = hashlib.sha256(content).hexdigest()[:12]
+    versioned = f'{name}.{version}.json'
+    variants = {'': content, '.gz': gzip.compress(content, 9)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(content, quality=11)
+    for filename in (versioned, f'{name}.json'):
+        for suffix, data in variants.items():
+            write_atomic(root / (filename + suffix), data)
+    prune_versions(root, name, getattr(
+        settings, 'SNAPSHOT_VERSIONS', SNAPSHOT_VERSIONS
+    ))
+    return versioned
+
+
+def build_snapshots():
+    """Строит снимки тегов и ингредиентов и манифест с их версиями."""
+    from api.renderers import ORJSONRenderer
+
+    root = get_snapshot_root()
+    root.mkdir(parents=True, exist_ok=True)
+    renderer = ORJSONRenderer()
+    manifest = {
+        name: write_snapshot(root, name, renderer.render(data))
+        for name, data in get_snapshots().items()
+    }
+    write_atomic(root / 'manifest.json', renderer.render(manifest))
+    return manifest
+
+
+def schedule_snapshots():
+    """Перестраивает снимки после коммита, не чаще раза на транзакцию."""
+    connection = transaction.get_connection()
+    if any(
+        callback[1] is build_snapshots
+        for callback in connection.run_on_commit
+    ):
+        return
+    transaction.on_commit(build_snapshots)
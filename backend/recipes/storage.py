@@ -0,0 +1,117 @@
+import hashlib
+import os
+from functools import partial
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+from django.core.files.utils import validate_file_name
+from django.db import connections, router, transaction
+from django.db.models import F
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, в котором имя файла - хеш его содержимого.
+    Одинаковые файлы сохраняются один раз, а содержимое файла
+    под конкретным именем никогда не меняется.
+
+    Каждое сохранение - одна ссылка на файл в ImageBlob. Ссылка
+    добавляется до проверки, есть ли файл: строка счетчика остается
+    заблокированной до конца транзакции, и delete_unused_image
+    не удалит файл, который в этой транзакции решили не записывать.
+    Это хранилище только изображений рецептов (Recipe.image), другие
+    файлы сохраняются в default_storage под своими именами.
+    """
+    def get_hashed_name(self, name, content):
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        if content.seekable():
+            content.seek(0)
+        digest = sha256.hexdigest()
+        directory = os.path.dirname(name)
+        ext = os.path.splitext(name)[1].lower()
+        return os.path.join(directory, digest[:2], digest + ext)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_hashed_name(name, content)
+        retain_image(name)
+        if not self.exists(name):
+            name = self._save(name, content)
+        validate_file_name(name, allow_relative_path=True)
+        return name
+
+
+image_storage = ContentAddressedStorage()
+
+
+def get_image_storage():
+    return image_storage
+
+
+def change_references(name, delta):
+    """
+    Прибавляет delta к счетчику ссылок на файл одним запросом
+    INSERT ... ON CONFLICT DO UPDATE и блокирует строку счетчика
+    до конца транзакции. С delta=0 только блокирует.
+    """
+    from .models import ImageBlob
+
+    connection = connections[router.db_for_write(ImageBlob)]
+    quote_name = connection.ops.quote_name
+    table = quote_name(ImageBlob._meta.db_table)
+    name_column = quote_name(ImageBlob._meta.get_field('name').column)
+    count_column = quote_name(
+        ImageBlob._meta.get_field('reference_count').column
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({name_column}, {count_column}) '
+            f'VALUES (%s, %s) ON CONFLICT ({name_column}) '
+            f'DO UPDATE SET {count_column} = '
+            f'{table}.{count_column} + EXCLUDED.{count_column}',
+            [name, delta],
+        )
+
+
+def retain_image(name):
+    """Добавляет ссылку на файл; нужна, если имя присваивается рецепту."""
+    if name:
+        change_references(name, 1)
+
+
+def release_image(name):
+    """
+    Убирает ссылку на файл в текущей транзакции, а после коммита
+    удаляет файл, если ссылок не осталось.
+    """
+    from .models import ImageBlob
+
+    if not name:
+        return
+    ImageBlob.objects.filter(name=name, reference_count__gt=0).update(
+        reference_count=F('reference_count') - 1
+    )
+    transaction.on_commit(partial(delete_unused_image, name))
+
+
+def delete_unused_image(name):
+    """
+    Удаляет файл и его счетчик, если ссылок нет. Строка счетчика
+    блокируется: файл, на который ссылка добавляется в незавершенной
+    транзакции, дождется ее конца и останется.
+    """
+    from .models import ImageBlob
+
+    if not name:
+        return
+    with transaction.atomic(using=router.db_for_write(ImageBlob)):
+        change_references(name, 0)
+        blob = ImageBlob.objects.get(name=name)
+        if blob.reference_count == 0:
+            image_storage.delete(name)
+            blob.delete()
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from recipes.models import Favorite, Recipe, ShoppingCart, Tag
+
+User = get_user_model()
+
+# Размеры данных: (пользователей, рецептов у каждого).
+SIZES = ((2, 2), (6, 5))
+CHANGELISTS = (
+    ('admin:recipes_recipe_changelist', ''),
+    ('admin:recipes_recipe_changelist', 'author__username=user0'),
+    ('admin:recipes_favorite_changelist', ''),
+    ('admin:recipes_favorite_changelist', 'user__username=user0'),
+    ('admin:recipes_favorite_changelist', 'recipe__name=Рецепт 0'),
+    ('admin:recipes_shoppingcart_changelist', ''),
+    ('admin:recipes_shoppingcart_changelist', 'user__username=user0'),
+    ('admin:recipes_shoppingcart_changelist', 'recipe__name=Рецепт 0'),
+)
+
+
+class ChangelistQueriesTest(TestCase):
+    """Число запросов списков в админке не зависит от объема данных."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin'
+        )
+        cls.tags = Tag.objects.bulk_create(
+            Tag(name=f'Тег {i}', slug=f'tag-{i}') for i in range(3)
+        )
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def seed(self, users_count, recipes_count):
+        users = User.objects.bulk_create(
+            User(username=f'user{i}', email=f'user{i}@example.com')
+            for i in range(User.objects.count(), users_count)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=user, name=f'Рецепт {i}', text='Описание',
+                cooking_time=1, image='foodgram_backend/images/admin.png',
+            )
+            for user in users for i in range(recipes_count)
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tag)
+            for recipe in recipes for tag in self.tags
+        )
+        for model in (Favorite, ShoppingCart):
+            model.objects.bulk_create(
+                model(user=user, recipe=recipe)
+                for user in users for recipe in recipes
+            )
+
+    def get(self, name, query):
+        response = self.client.get(f'{reverse(name)}?{query}')
+        self.assertEqual(response.status_code, 200)
+
+    def test_query_count_does_not_grow(self):
+        small, large = SIZES
+        self.seed(*small)
+        counts = []
+        for name, query in CHANGELISTS:
+            with CaptureQueriesContext(connection) as queries:
+                self.get(name, query)
+            counts.append(len(queries))
+        self.seed(*large)
+        for (name, query), count in zip(CHANGELISTS, counts):
+            with self.subTest(changelist=name, query=query):
+                with self.assertNumQueries(count):
+                    self.get(name, query)
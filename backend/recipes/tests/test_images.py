@@ -0,0 +1,122 @@
+import base64
+import tempfile
+from io import BytesIO, StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+
+from recipes.images import EXIF_ORIENTATION, get_image_meta, set_image_meta
+from recipes.models import Recipe
+from recipes.storage import image_storage
+
+User = get_user_model()
+
+
+def make_image(mode='RGB', size=(40, 20), color='red', format='PNG',
+               **options):
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, format, **options)
+    buffer.seek(0)
+    return buffer
+
+
+def open_placeholder(placeholder):
+    prefix = 'data:image/jpeg;base64,'
+    return Image.open(BytesIO(base64.b64decode(placeholder[len(prefix):])))
+
+
+class ImageMetaTest(SimpleTestCase):
+    def test_size_and_placeholder(self):
+        width, height, placeholder = get_image_meta(make_image())
+        self.assertEqual((width, height), (40, 20))
+        with open_placeholder(placeholder) as image:
+            self.assertEqual(image.size, (16, 8))
+            red, green, blue = image.getpixel((8, 4))
+            self.assertGreater(red, 200)
+            self.assertLess(green, 60)
+
+    def test_exif_rotation(self):
+        exif = Image.Exif()
+        exif[EXIF_ORIENTATION] = 6
+        width, height, placeholder = get_image_meta(
+            make_image(format='JPEG', exif=exif)
+        )
+        self.assertEqual((width, height), (20, 40))
+        with open_placeholder(placeholder) as image:
+            self.assertEqual(image.size, (8, 16))
+
+    def test_transparency_is_white(self):
+        palette = Image.new('P', (40, 20), 0)
+        palette.putpalette([0, 0, 0])
+        palette_file = BytesIO()
+        palette.save(palette_file, 'PNG', transparency=0)
+        palette_file.seek(0)
+        for name, file in (
+            ('RGBA', make_image('RGBA', color=(0, 0, 0, 0))),
+            ('P', palette_file),
+        ):
+            with self.subTest(mode=name):
+                *_, placeholder = get_image_meta(file)
+                with open_placeholder(placeholder) as image:
+                    self.assertGreater(min(image.getpixel((8, 4))), 240)
+
+    def test_unreadable_image(self):
+        recipe = Recipe(image=ContentFile(b'not an image', name='bad.png'))
+        set_image_meta(recipe)
+        self.assertEqual(
+            (recipe.image_width, recipe.image_height,
+             recipe.image_placeholder),
+            (None, None, ''),
+        )
+        self.assertEqual(recipe.image.read(), b'not an image')
+
+
+class BackfillImageMetaTest(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(MEDIA_ROOT=media.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.author = User.objects.create(
+            username='author', email='author@example.com'
+        )
+        name = image_storage.save(
+            'foodgram_backend/images/recipe.png', make_image()
+        )
+        self.shared = [self.create_recipe(name) for _ in range(2)]
+        self.missing = self.create_recipe(
+            'foodgram_backend/images/missing.png'
+        )
+
+    def create_recipe(self, image):
+        recipe = Recipe.objects.create(
+            author=self.author, name='Суп', text='Текст', cooking_time=10,
+            image=image,
+        )
+        Recipe.objects.filter(pk=recipe.pk).update(
+            image_width=None, image_height=None, image_placeholder=''
+        )
+        recipe.refresh_from_db()
+        return recipe
+
+    def test_missing_meta_is_filled(self):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('backfill_image_meta', stdout=stdout, stderr=stderr)
+        self.assertIn('2 recipes were updated, 1 images failed', (
+            stdout.getvalue()
+        ))
+        self.assertIn('missing.png', stderr.getvalue())
+        for recipe in self.shared:
+            updated_at = recipe.updated_at
+            recipe.refresh_from_db()
+            self.assertEqual(
+                (recipe.image_width, recipe.image_height), (40, 20)
+            )
+            self.assertTrue(recipe.image_placeholder)
+            self.assertEqual(recipe.updated_at, updated_at)
+        self.missing.refresh_from_db()
+        self.assertEqual(self.missing.image_placeholder, '')
@@ -0,0 +1,76 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from api.cache import (ALL_RECIPES, COOKING_TIME, author_tag, get_versions,
+                       slug_tag)
+from api.models import OutboxEvent
+from api.outbox import RECIPE_CREATED
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.ndjson import import_batch, parse_line
+
+User = get_user_model()
+
+PUB_DATE = '2021-05-04T12:30:00+00:00'
+
+
+class ImportBatchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create(
+            username='author', email='author@example.com'
+        )
+        Tag.objects.create(name='Обед', slug='lunch', color='#000000')
+        Ingredient.objects.create(name='Мука', measurement_unit='г')
+
+    def record(self, **fields):
+        return {
+            'author': self.author.email, 'name': 'Суп', 'text': 'Текст',
+            'cooking_time': 10, 'tags': ['lunch'],
+            'ingredients': [
+                {'name': 'Мука', 'measurement_unit': 'г', 'amount': 500}
+            ],
+            'image': {'name': 'foodgram_backend/images/recipe.png'},
+            **fields,
+        }
+
+    def import_records(self, *records):
+        batch = [
+            (line_number, parse_line(json.dumps(record), line_number))
+            for line_number, record in enumerate(records, start=1)
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            return import_batch(batch)
+
+    def test_pub_date_is_restored(self):
+        self.import_records(
+            self.record(pub_date=PUB_DATE), self.record(name='Рагу')
+        )
+        dated = Recipe.objects.get(name='Суп')
+        self.assertEqual(dated.pub_date.isoformat(), PUB_DATE)
+        self.assertGreater(Recipe.objects.get(name='Рагу').pub_date.year, 2021)
+
+    def test_invalid_pub_date_is_rejected(self):
+        for pub_date in ('вчера', '2021-05-04T12:30:00', 1620131400):
+            with self.subTest(pub_date=pub_date):
+                with self.assertRaises(ValidationError):
+                    parse_line(
+                        json.dumps(self.record(pub_date=pub_date)), 1
+                    )
+
+    def test_events_are_published_and_lists_invalidated(self):
+        tags = [
+            ALL_RECIPES, COOKING_TIME, author_tag(self.author.pk),
+            slug_tag('lunch'),
+        ]
+        self.assertEqual(set(get_versions(tags).values()), {0})
+        self.import_records(self.record(), self.record(name='Рагу'))
+        self.assertCountEqual(
+            OutboxEvent.objects.filter(event_type=RECIPE_CREATED)
+            .values_list('payload__recipe_id', flat=True),
+            Recipe.objects.values_list('pk', flat=True),
+        )
+        self.assertNotIn(0, get_versions(tags).values())
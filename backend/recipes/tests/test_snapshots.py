@@ -0,0 +1,47 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+
+from recipes.models import Tag
+from recipes.snapshots import build_snapshots
+
+
+class BuildSnapshotsTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        settings = override_settings(
+            SNAPSHOT_ROOT=self.root, SNAPSHOT_VERSIONS=2
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def build(self, index):
+        Tag.objects.create(
+            name=f'Тег {index}', slug=f'tag-{index}', color='#000000'
+        )
+        version = build_snapshots()['tags']
+        # Порядок версий задает время записи, а не имя файла.
+        for path in self.root.glob(f'{version}*'):
+            os.utime(path, (index, index))
+        return version
+
+    def test_recent_versions_are_kept(self):
+        versions = [self.build(index) for index in range(1, 5)]
+        self.assertEqual(len(set(versions)), 4)
+        for version in versions[:2]:
+            self.assertFalse((self.root / version).exists())
+            self.assertFalse((self.root / f'{version}.gz').exists())
+        for version in versions[2:]:
+            self.assertTrue((self.root / version).exists())
+            self.assertTrue((self.root / f'{version}.gz').exists())
+        manifest = json.loads((self.root / 'manifest.json').read_text())
+        self.assertEqual(manifest['tags'], versions[-1])
+        self.assertEqual(
+            (self.root / 'tags.json').read_bytes(),
+            (self.root / versions[-1]).read_bytes(),
+        )
@@ -0,0 +1,46 @@
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.models import Favorite, Recipe, RecipeActivity, ShoppingCart
+from recipes.trending import get_trending_ids, rebuild_activity
+
+User = get_user_model()
+
+
+class RebuildActivityTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(
+            username='reader', email='reader@example.com'
+        )
+        self.recipes = [
+            Recipe.objects.create(
+                author=self.user, name=f'Рецепт {index}', text='Текст',
+                cooking_time=10, image='recipes/images/recipe.png',
+            )
+            for index in range(2)
+        ]
+
+    def test_unknown_cart_dates_are_not_activity(self):
+        old, new = self.recipes
+        ShoppingCart.objects.create(user=self.user, recipe=old)
+        ShoppingCart.objects.filter(recipe=old).update(
+            date_added=datetime(2000, 1, 1, tzinfo=timezone.utc)
+        )
+        ShoppingCart.objects.create(user=self.user, recipe=new)
+        self.assertEqual(rebuild_activity(), 1)
+        self.assertEqual(
+            list(RecipeActivity.objects.values_list('recipe_id', flat=True)),
+            [new.pk],
+        )
+
+    def test_rebuild_clears_cached_rankings(self):
+        self.assertEqual(get_trending_ids('7d'), [])
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        RecipeActivity.objects.all().delete()
+        self.assertEqual(get_trending_ids('7d'), [])
+        rebuild_activity()
+        self.assertEqual(get_trending_ids('7d'), [self.recipes[0].pk])
@@ -0,0 +1,189 @@
+import heapq
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router, transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from .models import Favorite, Recipe, RecipeActivity, ShoppingCart
+
+WINDOWS = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+}
+DEFAULT_WINDOW = '7d'
+MAX_WINDOW = max(WINDOWS.values())
+TRENDING_SIZE = 30
+TRENDING_CACHE_TIMEOUT = 5 * 60
+# Вес одного добавления в избранное и в список покупок.
+WEIGHTS = {
+    'favorites': 1.0,
+    'shopping_carts': 0.5,
+}
+ACTIVITY_FIELDS = {
+    Favorite: 'favorites',
+    ShoppingCart: 'shopping_carts',
+}
+
+
+def truncate_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def record_activity(model, recipe_id, moment, delta=1):
+    """
+    Прибавляет delta к часовому счетчику рецепта одним запросом
+    INSERT ... ON CONFLICT DO UPDATE.
+    """
+    field = ACTIVITY_FIELDS[model]
+    connection = connections[router.db_for_write(RecipeActivity)]
+    quote_name = connection.ops.quote_name
+    table = quote_name(RecipeActivity._meta.db_table)
+    recipe_field = RecipeActivity._meta.get_field('recipe')
+    hour_field = RecipeActivity._meta.get_field('hour')
+    recipe, hour, favorites, shopping_carts, column = (
+        quote_name(RecipeActivity._meta.get_field(name).column)
+        for name in ('recipe', 'hour', 'favorites', 'shopping_carts', field)
+    )
+    values = {'favorites': 0, 'shopping_carts': 0, field: delta}
+    sql = (
+        f'INSERT INTO {table} ({recipe}, {hour}, {favorites}, '
+        f'{shopping_carts}) VALUES (%s, %s, %s, %s) '
+        f'ON CONFLICT ({recipe}, {hour}) '
+        f'DO UPDATE SET {column} = {table}.{column} + EXCLUDED.{column}'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [
+            recipe_field.get_db_prep_value(recipe_id, connection),
+            hour_field.get_db_prep_save(truncate_hour(moment), connection),
+            values['favorites'],
+            values['shopping_carts'],
+        ])
+
+
+def update_favorite_count(recipe_id, delta):
+    """
+    Меняет счетчик избранного рецепта одним запросом UPDATE. Счетчик
+    не уходит ниже нуля, даже если разошелся с таблицей избранного
+    до пересчета rebuild_trending.
+    """
+    Recipe.objects.filter(pk=recipe_id).update(
+        favorite_count=Greatest(F('favorite_count') + delta, 0)
+    )
+
+
+def recount_favorites():
+    """Пересчитывает счетчики избранного всех рецептов."""
+    return Recipe.objects.update(favorite_count=Coalesce(
+        Subquery(
+            Favorite.objects.filter(recipe=OuterRef('pk'))
+            .order_by().values('recipe')
+            .annotate(total=Count('pk')).values('total')
+        ),
+        0,
+    ))
+
+
+def lock_activity(connection):
+    """
+    Блокирует запись счетчиков до конца транзакции. Читать их
+    можно: до коммита читатели видят прежние счетчики. В SQLite
+    записи и так идут по одной.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    table = connection.ops.quote_name(RecipeActivity._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE')
+
+
+def rebuild_activity():
+    """
+    Пересчитывает часовые счетчики по текущему избранному и покупкам
+    одной транзакцией. record_activity на время пересчета ждет
+    блокировку и прибавляет свое изменение уже к новым счетчикам.
+    Строки списка покупок с неизвестной датой (2000-01-01, миграция
+    0010) старше любого окна и не учитываются. После пересчета
+    закешированные топы сбрасываются.
+    """
+    using = router.db_for_write(RecipeActivity)
+    with transaction.atomic(using=using):
+        lock_activity(connections[using])
+        since = truncate_hour(timezone.now() - MAX_WINDOW)
+        buckets = defaultdict(lambda: {'favorites': 0, 'shopping_carts': 0})
+        for model, field in ACTIVITY_FIELDS.items():
+            rows = (
+                model.objects.filter(date_added__gte=since)
+                .annotate(hour=TruncHour('date_added'))
+                .values('recipe_id', 'hour')
+                .annotate(total=Count('id'))
+                .order_by()
+            )
+            for row in rows.iterator():
+                buckets[row['recipe_id'], row['hour']][field] = row['total']
+        RecipeActivity.objects.all().delete()
+        RecipeActivity.objects.bulk_create(
+            (
+                RecipeActivity(recipe_id=recipe_id, hour=hour, **counters)
+                for (recipe_id, hour), counters in buckets.items()
+            ),
+            batch_size=1000,
+        )
+    clear_trending_cache()
+    return len(buckets)
+
+
+def prune_activity():
+    """Удаляет счетчики старше самого длинного окна."""
+    deleted, _ = RecipeActivity.objects.filter(
+        hour__lt=truncate_hour(timezone.now() - MAX_WINDOW)
+    ).delete()
+    return deleted
+
+
+def top_recipe_ids(window, size=TRENDING_SIZE):
+    """
+    Рецепты с наибольшей активностью за окно.
+    Вклад каждого часа затухает с периодом полураспада в четверть окна.
+    """
+    period = WINDOWS[window]
+    now = timezone.now()
+    half_life = period.total_seconds() / 4
+    scores = defaultdict(float)
+    rows = RecipeActivity.objects.filter(hour__gte=now - period).values_list(
+        'recipe_id', 'hour', 'favorites', 'shopping_carts'
+    )
+    for recipe_id, hour, favorites, shopping_carts in rows.iterator():
+        decay = 0.5 ** ((now - hour).total_seconds() / half_life)
+        scores[recipe_id] += decay * (
+            favorites * WEIGHTS['favorites']
+            + shopping_carts * WEIGHTS['shopping_carts']
+        )
+    return heapq.nlargest(
+        size,
+        (recipe_id for recipe_id, score in scores.items() if score > 0),
+        key=scores.get,
+    )
+
+
+def trending_key(window):
+    return f'recipes:trending:{window}'
+
+
+def clear_trending_cache():
+    cache.delete_many([trending_key(window) for window in WINDOWS])
+
+
+def get_trending_ids(window):
+    """Закешированный топ рецептов за окно."""
+    return cache.get_or_set(
+        trending_key(window),
+        lambda: top_recipe_ids(window),
+        getattr(settings, 'TRENDING_CACHE_TIMEOUT', TRENDING_CACHE_TIMEOUT),
+    )
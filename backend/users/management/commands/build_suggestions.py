@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from users.suggestions import build_suggestions
+
+
+class Command(BaseCommand):
+    help = """
+        Rebuilds "authors you may like" for /api/users/suggestions/ from
+        the follow graph and favorites. Meant to run periodically, e.g.
+        nightly from cron.
+        """
+
+    def handle(self, *args, **options):
+        count = build_suggestions()
+        self.stdout.write(
+            self.style.SUCCESS(f'{count} suggestions were built.')
+        )
@@ -0,0 +1,33 @@
+# Generated by Django 4.1.4 on 2026-10-19 09:40
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model("users", "Follow")
+    keep = (
+        Follow.objects.values("user", "author")
+        .annotate(min_id=Min("id"))
+        .values_list("min_id", flat=True)
+    )
+    Follow.objects.exclude(id__in=list(keep)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_follows, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name="follow",
+            constraint=models.UniqueConstraint(
+                fields=("user", "author"), name="unique_follow"
+            ),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.1.4 on 2026-10-19 09:51
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="follow",
+            name="created",
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name="Дата подписки",
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name="follow",
+            index=models.Index(
+                fields=["user", "created"], name="follow_user_created_idx"
+            ),
+        ),
+    ]
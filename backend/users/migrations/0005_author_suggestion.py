@@ -0,0 +1,60 @@
+# Generated by Django 4.1.4 on 2026-10-19 10:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_follow_created"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuthorSuggestion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField(verbose_name="Место")),
+                ("score", models.FloatField(verbose_name="Вес")),
+                (
+                    "author",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="suggested_to",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Автор",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="author_suggestions",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="Пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Рекомендация автора",
+                "verbose_name_plural": "Рекомендации авторов",
+                "ordering": ("user", "rank"),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="authorsuggestion",
+            constraint=models.UniqueConstraint(
+                fields=("user", "rank"), name="unique_suggestion_rank"
+            ),
+        ),
+    ]
@@ -57,11 +57,62 @@ class Follow(models.Model):
         related_name='following',
         verbose_name='Автор'
     )
+    created = models.DateTimeField(
+        'Дата подписки',
+        auto_now_add=True,
+    )
 
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
         ordering = ('-pk',)
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+            models.Index(
+                fields=['user', 'created'], name='follow_user_created_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user.username} подписан на {self.author.username}'
+
+
+class AuthorSuggestion(models.Model):
+    """
+    Автор, которого стоит предложить пользователю.
+    Таблица целиком пересобирается командой build_suggestions.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='author_suggestions',
+        verbose_name='Пользователь'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='suggested_to',
+        verbose_name='Автор'
+    )
+    rank = models.PositiveSmallIntegerField('Место')
+    score = models.FloatField('Вес')
+
+    class Meta:
+        verbose_name = 'Рекомендация автора'
+        verbose_name_plural = 'Рекомендации авторов'
+        ordering = ('user', 'rank')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'rank'], name='unique_suggestion_rank'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user_id}: {self.author_id} ({self.rank})'
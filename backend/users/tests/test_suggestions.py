@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe
+from users.models import AuthorSuggestion, Follow
+from users.suggestions import Adjacency, Graph, build_suggestions
+
+User = get_user_model()
+
+
+class AdjacencyTest(SimpleTestCase):
+    def test_rows_are_grouped(self):
+        adjacency = Adjacency([2, 0, 2, 1], [5, 6, 7, 8], 4)
+        self.assertEqual(
+            [list(adjacency[row]) for row in range(4)],
+            [[6], [8], [5, 7], []],
+        )
+        self.assertEqual(
+            [adjacency.degree(row) for row in range(4)], [1, 1, 2, 0]
+        )
+
+
+class SuggestionsTest(TestCase):
+    """
+    me подписан на x, a - на x, y, z, b - на x, y и на me. Рецепт
+    в избранном у me и c, c подписан на w. Общий автор x популярнее
+    общего рецепта, но вес подписки вдвое больше: y предлагают a и b,
+    z - только a, w - c.
+    """
+
+    def setUp(self):
+        self.users = {
+            name: User.objects.create(
+                username=name, email=f'{name}@example.com'
+            )
+            for name in ('me', 'a', 'b', 'c', 'x', 'y', 'z', 'w')
+        }
+        for user, authors in (
+            ('me', 'x'), ('a', 'xyz'), ('b', ['x', 'y', 'me']), ('c', 'w'),
+        ):
+            for author in authors:
+                self.follow(user, author)
+        recipe = Recipe.objects.create(
+            author=self.users['w'], name='Суп', text='Текст',
+            cooking_time=10, image='recipes/images/recipe.png',
+        )
+        for user in ('me', 'c'):
+            Favorite.objects.create(user=self.users[user], recipe=recipe)
+
+    def follow(self, user, author):
+        Follow.objects.create(user=self.users[user], author=self.users[author])
+
+    def ranked(self, graph, items):
+        """Имена и округленные веса в порядке выдачи."""
+        return [
+            (
+                User.objects.get(pk=graph.user_ids[index]).username,
+                round(score, 3),
+            )
+            for index, score in items
+        ]
+
+    def test_similar_users_and_ranking(self):
+        graph = Graph()
+        me = list(graph.user_ids).index(self.users['me'].pk)
+        similar = self.ranked(graph, graph.similar_users(me))
+        self.assertCountEqual(similar[:2], [('a', 0.5), ('b', 0.5)])
+        self.assertEqual(similar[2:], [('c', 0.315)])
+        self.assertEqual(
+            self.ranked(graph, graph.suggest(me)),
+            [('y', 1.0), ('z', 0.5), ('w', 0.315)],
+        )
+
+    def test_build_and_view(self):
+        self.assertEqual(build_suggestions(), AuthorSuggestion.objects.count())
+        self.assertFalse(
+            AuthorSuggestion.objects.filter(user=self.users['x']).exists()
+        )
+        self.assertEqual(
+            list(AuthorSuggestion.objects.filter(
+                user=self.users['me']
+            ).order_by('rank').values_list('author__username', 'rank')),
+            [('y', 1), ('z', 2), ('w', 3)],
+        )
+        client = APIClient()
+        self.assertEqual(
+            client.get('/api/users/suggestions/').status_code, 401
+        )
+        client.force_authenticate(self.users['me'])
+        self.follow('me', 'y')
+        response = client.get('/api/users/suggestions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [user['username'] for user in response.data], ['z', 'w']
+        )
+        self.assertFalse(response.data[0]['is_subscribed'])